@@ -1,20 +1,40 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends
+from fastapi.security import HTTPAuthorizationCredentials
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_current_active_user, get_db
+
+from app.api.deps import (
+    ConditionalGet,
+    credentials,
+    get_current_active_user,
+    get_db,
+    limit_login,
+    limit_register,
+)
 from app.models.user import User
-from app.schemas.auth import(
-    LoginRequest, 
+from app.schemas.auth import (
+    LoginRequest,
+    LogoutRequest,
     RefreshTokenRequest,
     RegisterRequest,
     RegisterResponse,
     TokenResponse,
 )
 from app.schemas.user import User as UserSchema
+from app.schemas.user import user_serializer
 from app.services.auth import AuthService
+from app.utils.etag import make_etag
+from app.utils.responses import PrevalidatedJSONResponse
 
 router = APIRouter()
 
-@router.post("/register", response_model=RegisterResponse)
+@router.post(
+    "/register",
+    response_model=RegisterResponse,
+    dependencies=[Depends(limit_register)],
+)
 async def register(
     register_data: RegisterRequest,
     db: AsyncSession = Depends(get_db)
@@ -22,7 +42,11 @@ async def register(
     auth_service = AuthService(db=db)
     return await auth_service.register(register_data)
 
-@router.post("/login", response_model=TokenResponse)
+@router.post(
+    "/login",
+    response_model=TokenResponse,
+    dependencies=[Depends(limit_login)],
+)
 async def login(
     login_data: LoginRequest,
     db: AsyncSession = Depends(get_db)
@@ -40,14 +64,24 @@ async def refresh_token(
 
 @router.post("/logout")
 async def logout(
+    logout_data: Optional[LogoutRequest] = None,
     current_user: User = Depends(get_current_active_user),
+    token: HTTPAuthorizationCredentials = Depends(credentials),
     db: AsyncSession = Depends(get_db),
 ) -> dict:
     auth_service = AuthService(db)
-    return await auth_service.logout(current_user)
+    return await auth_service.logout(
+        current_user,
+        token.credentials,
+        logout_data.refresh_token if logout_data else None,
+    )
 
-@router.get("/me")
+@router.get("/me", response_model=UserSchema)
 async def read_users_me(
-    current_user: User = Depends(get_current_active_user)
-) -> UserSchema:
-    return current_user
+    current_user: User = Depends(get_current_active_user),
+    conditional: ConditionalGet = Depends(),
+) -> PrevalidatedJSONResponse:
+    conditional.check(make_etag(current_user.id, current_user.updated_at))
+    return PrevalidatedJSONResponse(
+        user_serializer.dumps(current_user), headers=conditional.headers
+    )
@@ -1,17 +1,25 @@
-from typing import AsyncGenerator
 from datetime import UTC, datetime, timedelta
-from fastapi import Depends
+from typing import AsyncGenerator, Dict
+
+from fastapi import Depends, Request, Response
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.utils.jwt import verify_token
+
 from app.db.session import AsyncSessionLocal
 from app.exceptions.exception import (
+    NotModifiedError,
     NotSuperuserError,
     UserIsInactiveError,
     UserNotFoundError,
 )
 from app.models.user import User
+from app.schemas.auth import LoginRequest, RegisterRequest
+from app.services.principal_cache import principal_cache
+from app.services.rate_limit import credential_rate_limit
 from app.services.user import UserService
+from app.utils.etag import etag_matches
+from app.utils.jwt import verify_token
 
 credentials = HTTPBearer()
 
@@ -31,8 +39,12 @@ async def get_current_user(
     """Get current user from token."""
 
     user_id = verify_token(token=token.credentials, token_type="access")
+    # Route the request for read-your-writes before anything is read.
+    session.info["subject"] = user_id
     user_service = UserService(session)
-    user = await user_service.get_by_id(user_id)
+    user = await principal_cache.get_or_load(
+        user_id, lambda: user_service.get_by_id(user_id)
+    )
     if not user:
         raise UserNotFoundError
     return user
@@ -51,3 +63,46 @@ async def get_current_active_superuser(
         raise NotSuperuserError
     return current_user
 
+async def limit_login(request: Request, login_data: LoginRequest) -> None:
+    """Rate limit login by client IP and email, before any password check."""
+    client_ip = request.client.host if request.client else None
+    await credential_rate_limit.check("login", client_ip, str(login_data.email))
+
+async def limit_register(request: Request, register_data: RegisterRequest) -> None:
+    """Rate limit registration by client IP and email, before hashing."""
+    client_ip = request.client.host if request.client else None
+    await credential_rate_limit.check(
+        "register", client_ip, str(register_data.email)
+    )
+
+class ConditionalGet:
+    """Conditional GET with strong ETags, used as a dependency.
+
+    The route computes the ETag of the resource, from a cached copy if one
+    is at hand, and calls check before building the body. If the client
+    sent a matching If-None-Match, check raises NotModifiedError and the
+    client gets a 304 without a body. Routes returning their own Response
+    pass ``headers`` to it, for the others the headers are set on the
+    response FastAPI builds.
+    """
+
+    # Clients may keep the user data but must revalidate it on every use.
+    CACHE_CONTROL = "private, no-cache"
+
+    def __init__(self, request: Request, response: Response) -> None:
+        """Initialize from the request's If-None-Match header."""
+        self.if_none_match = request.headers.get("if-none-match")
+        self.response = response
+        self.headers: Dict[str, str] = {}
+
+    def check(self, etag: str) -> None:
+        """Set the ETag of the response, ending the request if it matches.
+
+        Raises:
+            NotModifiedError: If the client's copy has the same ETag
+
+        """
+        self.headers = {"ETag": etag, "Cache-Control": self.CACHE_CONTROL}
+        self.response.headers.update(self.headers)
+        if etag_matches(self.if_none_match, etag):
+            raise NotModifiedError(headers=self.headers)
@@ -1,9 +1,18 @@
 from fastapi import APIRouter
+from app.exceptions.exception import ServiceUnavailableError
 from app.schemas.health import HealthCheckSchema
+from app.services.warmup import warmup
 
 router = APIRouter()
 
 @router.get("",response_model=HealthCheckSchema)
 async def get() -> HealthCheckSchema:
     """Health check endpoint."""
-    return HealthCheckSchema(status='healthy')
\ No newline at end of file
+    return HealthCheckSchema(status="healthy")
+
+@router.get("/ready", response_model=HealthCheckSchema)
+async def ready() -> HealthCheckSchema:
+    """Readiness endpoint, 503 until the worker finished warming up."""
+    if not warmup.ready:
+        raise ServiceUnavailableError(message="Warming up.")
+    return HealthCheckSchema(status="ready")
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.common.config import settings
+from app.common.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    MultiProcessStore,
+    generate_latest,
+)
+
+router = APIRouter()
+
+metrics_store = (
+    MultiProcessStore(settings.METRICS_MULTIPROC_DIR)
+    if settings.METRICS_MULTIPROC_DIR
+    else None
+)
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Metrics in the Prometheus text format."""
+    families = metrics_store.collect() if metrics_store else REGISTRY.collect()
+    return Response(generate_latest(families), media_type=CONTENT_TYPE)
@@ -1,16 +1,50 @@
-from typing import Any
-from fastapi import APIRouter, Depends, status
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.deps import get_current_active_user, get_current_active_superuser, get_db
-from app.exceptions.exception import UserNotFoundError
+
+from app.api.deps import (
+    ConditionalGet,
+    get_current_active_superuser,
+    get_current_active_user,
+    get_db,
+)
+from app.exceptions.exception import BadRequestError, UserNotFoundError
 from app.models.user import User
-from app.schemas.common import PaginationParams
+from app.schemas.common import (
+    CursorPaginationParams,
+    CursorPaginationResponse,
+)
 from app.schemas.user import User as UserSchema
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import (
+    UserBatchRequest,
+    UserBatchResponse,
+    UserCreate,
+    UserUpdate,
+    user_serializer,
+)
+from app.services.principal_cache import principal_cache
 from app.services.user import UserService
+from app.services.user_export import UserExportService
+from app.services.user_import import CSV, NDJSON, UserImportService
+from app.utils.etag import make_etag
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.responses import (
+    DuplexStreamingResponse,
+    PrevalidatedJSONResponse,
+    dumps,
+)
 
 router = APIRouter()
 
+IMPORT_FORMATS = {
+    "application/x-ndjson": NDJSON,
+    "application/jsonl": NDJSON,
+    "text/csv": CSV,
+}
+
 @router.post(
     "",
     response_model=UserSchema,
@@ -23,20 +57,133 @@ async def create_user(
     user_in: UserCreate,
     db: AsyncSession = Depends(get_db),
     _current_user: User = Depends(get_current_active_superuser),
-) -> UserSchema:
+) -> PrevalidatedJSONResponse:
+    user_service = UserService(db)
+    user = await user_service.create(user_in)
+    return PrevalidatedJSONResponse(
+        user_serializer.dumps(user), status_code=status.HTTP_201_CREATED
+    )
+
+@router.post(
+    "/import",
+    summary="Import users",
+    description="Create users from an NDJSON or CSV body, streaming back one "
+    "NDJSON result per row. Only superuser can import users.",
+    response_class=DuplexStreamingResponse,
+)
+async def import_users(
+    request: Request,
+    _current_user: User = Depends(get_current_active_superuser),
+) -> DuplexStreamingResponse:
+    """Create the users of the request body, streaming a result per record."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    fmt = IMPORT_FORMATS.get(content_type.lower())
+    if fmt is None:
+        raise BadRequestError(
+            message="Content type must be application/x-ndjson or text/csv."
+        )
+    import_service = UserImportService()
+    return DuplexStreamingResponse(
+        import_service.run(request.stream(), fmt),
+        media_type="application/x-ndjson",
+    )
+
+@router.get(
+    "/export",
+    summary="Export users",
+    description="Stream all users as NDJSON or CSV, optionally only some "
+    "columns. Only superuser can export users.",
+    response_class=StreamingResponse,
+)
+async def export_users(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),  # noqa: A002
+    fields: Optional[str] = Query(
+        None, description="Comma separated columns, all columns if omitted"
+    ),
+    _current_user: User = Depends(get_current_active_superuser),
+) -> StreamingResponse:
+    """Stream every user in the requested format."""
+    columns = UserExportService.parse_fields(fields)
+    export_service = UserExportService()
+    return StreamingResponse(
+        export_service.run(format, columns),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
+@router.get(
+    "",
+    response_model=CursorPaginationResponse[UserSchema],
+    summary="List users",
+    description="List users ordered by id, one page per cursor. "
+    "Only superuser can list users.",
+)
+async def list_users(
+    params: CursorPaginationParams = Query(),
+    db: AsyncSession = Depends(get_db),
+    _current_user: User = Depends(get_current_active_superuser),
+) -> PrevalidatedJSONResponse:
+    """List the page of users after the cursor."""
+    after_id = None
+    if params.cursor:
+        after_id = decode_cursor(params.cursor).get("id")
+        # bool is an int subclass, a forged {"id": true} is no id.
+        if type(after_id) is not int:
+            raise BadRequestError(message="Invalid cursor.")
+
+    user_service = UserService(db)
+    users, has_more = await user_service.get_page(after_id, params.limit)
+    total = None
+    if params.total != "none":
+        total = await user_service.count(estimated=params.total == "estimated")
+
+    page = CursorPaginationResponse[UserSchema](
+        items=[],
+        next_cursor=encode_cursor({"id": users[-1].id}) if has_more else None,
+        limit=params.limit,
+        has_more=has_more,
+        total=total,
+    ).model_dump()
+    page["items"] = user_serializer.to_list(users)
+    return PrevalidatedJSONResponse(dumps(page))
+
+@router.post(
+    "/batch",
+    response_model=UserBatchResponse,
+    summary="Get users by ids",
+    description="Get the users with the given ids in one query, in request "
+    "order. IDs no user has are listed in missing. "
+    "Only superuser can look up users.",
+)
+async def read_users_batch(
+    batch_in: UserBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    _current_user: User = Depends(get_current_active_superuser),
+) -> PrevalidatedJSONResponse:
+    """Read the users of the given ids, in one query."""
+    user_ids = list(dict.fromkeys(batch_in.ids))
     user_service = UserService(db)
-    return await user_service.create(user_in)
+    users = await user_service.loader.load_many(user_ids)
+    batch = UserBatchResponse(items=[], missing=[]).model_dump()
+    batch["items"] = user_serializer.to_list(user for user in users if user)
+    batch["missing"] = [i for i, user in zip(user_ids, users) if user is None]
+    return PrevalidatedJSONResponse(dumps(batch))
 
 @router.get(
     "/me",
     response_model=UserSchema,
     summary="Get current user info",
-    description="Get infomation about currently logged in user.",
+    description="Get infomation about currently logged in user. "
+    "Answers 304 if If-None-Match has the current ETag.",
 )
 async def read_user_me(
     current_user: User = Depends(get_current_active_user),
-) -> UserSchema:
-    return current_user
+    conditional: ConditionalGet = Depends(),
+) -> PrevalidatedJSONResponse:
+    conditional.check(make_etag(current_user.id, current_user.updated_at))
+    return PrevalidatedJSONResponse(
+        user_serializer.dumps(current_user), headers=conditional.headers
+    )
 
 
 @router.patch(
@@ -49,25 +196,36 @@ async def update_user_me(
     user_in: UserUpdate,
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db),
-) -> UserSchema:
+) -> PrevalidatedJSONResponse:
     user_service = UserService(db)
-    return await user_service.update(current_user.id, user_in)
+    user = await user_service.update(current_user.id, user_in)
+    return PrevalidatedJSONResponse(user_serializer.dumps(user))
 
 @router.get(
     "/{user_id}",
     response_model=UserSchema,
     summary="Get user by id",
     description="Get user information by id. "
-    "Only superuser can access other users' info.",
+    "Only superuser can access other users' info. "
+    "Answers 304 if If-None-Match has the current ETag.",
 )
 async def read_user_by_id(
     user_id: int,
     db: AsyncSession = Depends(get_db),
     _current_user: User = Depends(get_current_active_superuser),
-) -> UserSchema:
-    
+    conditional: ConditionalGet = Depends(),
+) -> PrevalidatedJSONResponse:
+    if conditional.if_none_match:
+        # A cached copy is enough to tell the client's copy is current.
+        cached = await principal_cache.get(user_id)
+        if cached is not None:
+            conditional.check(make_etag(cached.id, cached.updated_at))
+
     user_service = UserService(db)
     user = await user_service.get_by_id(user_id)
     if not user:
         raise UserNotFoundError
-    return user
\ No newline at end of file
+    conditional.check(make_etag(user.id, user.updated_at))
+    return PrevalidatedJSONResponse(
+        user_serializer.dumps(user), headers=conditional.headers
+    )
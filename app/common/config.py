@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Literal, Optional
 from pydantic import Field, SecretStr
 from pydantic_settings import BaseSettings
 
@@ -24,12 +24,148 @@ class Settings(BaseSettings):
         604800, # 7 days
         description="Refresh token expiration in seconds",
     )
+    TOKEN_CACHE_SIZE: int = Field(
+        10000, description="Verified tokens kept in memory, 0 disables the cache"
+    )
+    TOKEN_REVOCATION_BUCKET_SECONDS: int = Field(
+        300, description="Span of token expiry times whose revocations are "
+        "kept and dropped together"
+    )
+
+    # Password hashing
+    PASSWORD_HASH_WORKERS: int = Field(
+        0, description="Password hashing worker processes, 0 means one per CPU"
+    )
+    PASSWORD_HASH_MAX_QUEUE: int = Field(
+        64, description="Password hashing jobs allowed to wait for a free worker"
+    )
+
+    # User import
+    USER_IMPORT_BATCH_SIZE: int = Field(
+        500, description="Imported users hashed and inserted together"
+    )
+    USER_IMPORT_MAX_LINE_BYTES: int = Field(
+        64 * 1024, description="Longest accepted line of an import body"
+    )
+
+    USER_EXPORT_BATCH_SIZE: int = Field(
+        1000, description="Exported users fetched and serialized together"
+    )
+    USER_BATCH_MAX_IDS: int = Field(
+        100, description="Most user ids one batch lookup may ask for"
+    )
 
     DATABASE_URL: str = Field("postgresql://postgres:123456@db:5432/postgres")
     ASYNC_DATABASE_URL: str = Field(
         "postgresql+asyncpg://postgres:123456@db:5432/postgres"
     )
 
+    ASYNC_DATABASE_REPLICA_URLS: List[str] = Field(
+        [], description="Read replica URLs, reads are spread over them"
+    )
+    DB_REPLICA_MAX_LAG_SECONDS: float = Field(
+        5.0, description="Replication lag beyond which a replica is ejected"
+    )
+    DB_REPLICA_CHECK_INTERVAL: float = Field(
+        5.0, description="Seconds between replica health checks"
+    )
+    DB_READ_YOUR_WRITES_SECONDS: float = Field(
+        5.0, description="Seconds a user reads from the primary after a write"
+    )
+
+    # Database pool
+    DB_PROFILE: Literal["default", "pgbouncer"] = Field(
+        "default",
+        description="pgbouncer disables prepared statement caching and leaves "
+        "pooling to PgBouncer in transaction mode",
+    )
+    DB_POOL_SIZE: int = Field(5, description="Connections kept open in the pool")
+    DB_MAX_OVERFLOW: int = Field(
+        10, description="Connections opened beyond the pool size under load"
+    )
+    DB_POOL_TIMEOUT: float = Field(
+        30.0, description="Seconds to wait for a connection before giving up"
+    )
+    DB_POOL_RECYCLE: int = Field(
+        1800, description="Seconds after which a connection is replaced, -1 never"
+    )
+    DB_POOL_PRE_PING: Literal["always", "idle", "never"] = Field(
+        "idle",
+        description="Ping connections on every checkout, only after they sat "
+        "idle, or never",
+    )
+    DB_POOL_PRE_PING_IDLE_SECONDS: float = Field(
+        30.0, description="Idle time after which a connection is pinged"
+    )
+    DB_STATEMENT_CACHE_SIZE: int = Field(
+        100, description="Prepared statements cached per asyncpg connection"
+    )
+    DB_SLOW_QUERY_SECONDS: float = Field(
+        0.5, description="Statements taking this long are logged, 0 disables"
+    )
+
+    # Redis
+    REDIS_URL: Optional[str] = Field(
+        None, description="Redis URL for shared caches, unset to run without Redis"
+    )
+
+    # Rate limiting of the endpoints that hash a password
+    RATE_LIMIT_ENABLED: bool = Field(True, description="Rate limit login and register")
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = Field(
+        "memory",
+        description="memory limits each worker, redis limits the whole cluster "
+        "and falls back to memory while Redis is unavailable",
+    )
+    RATE_LIMIT_PER_IP: Dict[str, str] = Field(
+        {"login": "30/minute", "register": "10/minute"},
+        description="Requests per client IP, by endpoint, e.g. 30/minute",
+    )
+    RATE_LIMIT_PER_EMAIL: Dict[str, str] = Field(
+        {"login": "10/minute", "register": "5/minute"},
+        description="Requests per target email, by endpoint",
+    )
+    RATE_LIMIT_GLOBAL: str = Field(
+        "20/second", description="Login and register requests of all clients"
+    )
+
+    # Principal cache
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(
+        60, description="Seconds an authenticated user is cached, 0 disables"
+    )
+    PRINCIPAL_CACHE_SIZE: int = Field(
+        10000, description="Authenticated users kept in the in-process cache"
+    )
+
+    # Metrics
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(
+        None,
+        description="Directory the worker processes share their metrics "
+        "through, emptied before start; unset for a single process",
+    )
+    METRICS_SNAPSHOT_INTERVAL: float = Field(
+        5.0, description="Seconds between metrics snapshots of a worker"
+    )
+
+    # Startup
+    WARMUP_ENABLED: bool = Field(
+        True, description="Warm up before reporting ready, else ready at once"
+    )
+    WARMUP_CONNECTIONS: int = Field(
+        5, description="Connections opened per engine during warm-up, capped "
+        "at the pool size"
+    )
+    WARMUP_TIMEOUT_SECONDS: float = Field(
+        30.0, description="Seconds warm-up may take before the worker is ready"
+    )
+    STARTUP_IMPORT_BUDGET_SECONDS: float = Field(
+        1.5, description="Longest acceptable import time of app.main"
+    )
+    STARTUP_FIRST_RESPONSE_BUDGET_SECONDS: float = Field(
+        2.5,
+        description="Longest acceptable time from importing app.main to the "
+        "first response, lifespan startup included",
+    )
+
     # Logging
     LOG_LEVEL: str = Field('INFO', description="Logging level")
     LOG_FORMAT: str = Field(
@@ -39,6 +175,55 @@ class Settings(BaseSettings):
         "<level>{message}</level>",
         description="Logging format",
     )
+    LOG_FILE: str = Field("logs/app.log", description="Log file path")
+    LOG_FILE_ROTATION_BYTES: int = Field(
+        500 * 1024 * 1024, description="Size at which the log file is rotated"
+    )
+    LOG_FILE_RETENTION_DAYS: int = Field(10, description="Days rotated logs are kept")
+    LOG_QUEUE_SIZE: int = Field(
+        10000, description="Log records queued for the background writer"
+    )
+    LOG_OVERFLOW_POLICY: Literal["drop", "block"] = Field(
+        "drop",
+        description="When the log queue is full, drop records below ERROR or "
+        "block the caller",
+    )
+    LOG_BATCH_SIZE: int = Field(512, description="Log records written per batch")
+    LOG_FLUSH_INTERVAL: float = Field(
+        0.5, description="Seconds a log record may wait before being written"
+    )
+    ACCESS_LOG_HEADERS: List[str] = Field(
+        ["user-agent"], description="Request headers included in the access log"
+    )
+    ACCESS_LOG_SAMPLE_RATES: Dict[str, float] = Field(
+        {}, description="Fraction of requests logged per path prefix, e.g. "
+        '{"/api/v1/health": 0.01}; unmatched paths are always logged'
+    )
+    REQUEST_ID_HEADER: str = Field(
+        "X-Request-ID", description="Header carrying the upstream request id"
+    )
+    COMPRESSION_ENABLED: bool = Field(
+        True, description="Compress responses with gzip or brotli"
+    )
+    COMPRESSION_MINIMUM_SIZE: int = Field(
+        1024, description="Smallest response body in bytes that is compressed"
+    )
+    COMPRESSION_GZIP_LEVEL: int = Field(
+        5, ge=1, le=9, description="gzip level, 1 fastest to 9 smallest"
+    )
+    COMPRESSION_BROTLI_QUALITY: int = Field(
+        4, ge=0, le=11, description="brotli quality, 0 fastest to 11 smallest"
+    )
+    COMPRESSION_CONTENT_TYPES: List[str] = Field(
+        [
+            "application/json",
+            "application/x-ndjson",
+            "application/javascript",
+            "text/",
+        ],
+        description="Content types compressed, an entry ending in / matches "
+        "every subtype",
+    )
 
     class Config:
         """Configuration for environment variables and case sensitivity."""
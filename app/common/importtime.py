@@ -0,0 +1,194 @@
+"""Startup report: how long the app takes to import and to serve a first request.
+
+Run with: python -m app.common.importtime [--repeat 3] [--top 25] [--check]
+
+Every measurement runs in a fresh interpreter. The import time and the
+time to the first response, lifespan startup included, are the best of
+--repeat runs. The modules that took longest to import come from
+``python -X importtime``. --check exits with status 1 if a time is over
+its budget in the settings.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from app.common.config import BASE_DIR, settings
+
+# Imports app.main, runs the lifespan startup and sends one request through
+# the ASGI app, writing the timings to the file named by argv[1].
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def first_response():
+    application = app.main.app
+    messages = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": sys.argv[2],
+        "raw_path": sys.argv[2].encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"startup")], "client": ("127.0.0.1", 1),
+        "server": ("startup", 80),
+    }
+    async with application.router.lifespan_context(application):
+        await application(scope, receive, send)
+        responded = time.perf_counter()
+    status = messages[0]["status"]
+    if status != 200:
+        raise SystemExit(f"GET {sys.argv[2]} returned {status}")
+    return responded
+
+responded = asyncio.run(first_response())
+with open(sys.argv[1], "w") as f:
+    json.dump({"import": imported - start, "first_response": responded - start}, f)
+"""
+
+
+class ImportRecord(NamedTuple):
+    """One line of ``python -X importtime`` output, times in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Parse the stderr of ``python -X importtime``."""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append(
+            ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth)
+        )
+    return records
+
+
+def _environ(log_dir: str) -> Dict[str, str]:
+    # Keep the probe's logs out of the way of the report and the log file.
+    return {
+        **os.environ,
+        "LOG_LEVEL": "WARNING",
+        "LOG_FILE": str(Path(log_dir) / "app.log"),
+    }
+
+
+def import_profile(module: str = "app.main") -> List[ImportRecord]:
+    """Import module in a fresh interpreter and return its import records."""
+    with tempfile.TemporaryDirectory() as log_dir:
+        # This interpreter with a fixed command line, no untrusted input.
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            cwd=BASE_DIR,
+            env=_environ(log_dir),
+            check=True,
+        )
+    return parse_importtime(result.stderr)
+
+
+def measure_startup(
+    path: str = f"{settings.API_V1_STR}/health",
+    repeat: int = 1,
+) -> Dict[str, float]:
+    """Time importing app.main and answering a first request on path.
+
+    Args:
+        path: Path of the first request, it must answer 200
+        repeat: Fresh interpreters to measure, the best run is returned
+
+    Returns:
+        Seconds to import app.main and seconds from starting the import to
+        the first response
+
+    """
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output = Path(tmp) / "startup.json"
+        for _ in range(repeat):
+            # This interpreter running PROBE, no untrusted input.
+            subprocess.run(  # noqa: S603
+                [sys.executable, "-c", PROBE, str(output), path],
+                capture_output=True,
+                cwd=BASE_DIR,
+                env=_environ(tmp),
+                check=True,
+            )
+            runs.append(json.loads(output.read_text()))
+    return {key: min(run[key] for run in runs) for key in runs[0]}
+
+
+def over_budget(timings: Dict[str, float]) -> List[str]:
+    """Describe every startup time that is over its budget."""
+    budgets = {
+        "import": settings.STARTUP_IMPORT_BUDGET_SECONDS,
+        "first_response": settings.STARTUP_FIRST_RESPONSE_BUDGET_SECONDS,
+    }
+    return [
+        f"{name} took {timings[name]:.3f}s, budget {budget:.3f}s"
+        for name, budget in budgets.items()
+        if timings[name] > budget
+    ]
+
+
+def render(
+    timings: Dict[str, float],
+    records: List[ImportRecord],
+    top: int,
+) -> str:
+    """Format the startup times and the slowest imports."""
+    lines = [
+        f"import app.main      {timings['import'] * 1000:8.1f} ms",
+        f"first response       {timings['first_response'] * 1000:8.1f} ms",
+        "",
+        f"{'cumulative ms':>13}{'self ms':>9}  module",
+    ]
+    slowest = sorted(records, key=lambda record: record.cumulative_us, reverse=True)
+    for record in slowest[:top]:
+        lines.append(
+            f"{record.cumulative_us / 1000:>13.1f}{record.self_us / 1000:>9.1f}  "
+            f"{'  ' * record.depth}{record.module}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    """Print the startup report, return the exit status."""
+    parser = argparse.ArgumentParser(prog="python -m app.common.importtime")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=25, help="slowest imports shown")
+    parser.add_argument(
+        "--check", action="store_true", help="exit with 1 if over budget"
+    )
+    args = parser.parse_args()
+
+    timings = measure_startup(repeat=args.repeat)
+    print(render(timings, import_profile(), args.top))  # noqa: T201
+    if not args.check:
+        return 0
+    problems = over_budget(timings)
+    for problem in problems:
+        print(f"OVER BUDGET {problem}")  # noqa: T201
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
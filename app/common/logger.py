@@ -1,19 +1,362 @@
+import json
 import logging
+import queue
+import re
 import sys
-from typing import Any, Dict, Optional
+import threading
+import time
+import traceback
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict
 
 from loguru import logger
+
 from app.common.config import settings
+from app.common.metrics import Counter, Gauge
+
+if TYPE_CHECKING:
+    from loguru import Message
+
+# Id of the request being handled, set by the access log middleware.
+request_id_ctx: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+LOG_RECORDS_QUEUED = Counter(
+    "log_records_queued_total", "Log records queued for the background writer."
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+    labelnames=("level",),
+)
+LOG_QUEUE_DEPTH = Gauge("log_queue_depth", "Log records waiting to be written.")
+
+DEBUG_LEVELNO = logging.DEBUG
+ERROR_LEVELNO = logging.ERROR
+
+# Loguru time tokens understood in LOG_FORMAT.
+_TIME_TOKENS = re.compile(r"YYYY|MM|DD|HH|mm|ss|SSS")
+_TIME_FIELD = re.compile(r"\{time(?::([^}]*))?\}")
+_MARKUP = re.compile(r"</?[a-z]+>")
+
+
+class LogRecord(TypedDict):
+    """Log record handed to the background writer.
+
+    Records from loguru and from the standard library are converted to this
+    shape before they are queued.
+    """
+
+    time: datetime
+    level: str
+    levelno: int
+    message: str
+    name: Optional[str]
+    function: str
+    line: int
+    extra: Dict[str, Any]
+    exception: Optional[Tuple[Any, Any, Any]]
+
+
+def _format_time(value: datetime, spec: str) -> str:
+    tokens = {
+        "YYYY": f"{value.year:04d}",
+        "MM": f"{value.month:02d}",
+        "DD": f"{value.day:02d}",
+        "HH": f"{value.hour:02d}",
+        "mm": f"{value.minute:02d}",
+        "ss": f"{value.second:02d}",
+        "SSS": f"{value.microsecond // 1000:03d}",
+    }
+    return _TIME_TOKENS.sub(lambda match: tokens[match.group(0)], spec)
+
+
+class LogWriter:
+    """Write batches of records to a stream as text or JSON lines."""
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        level: str = "INFO",
+        fmt: str = "",
+        serialize: bool = False,
+    ) -> None:
+        """Initialize writer.
+
+        Args:
+            stream: Stream to write to
+            level: Minimum level written
+            fmt: Loguru style format, color markup is stripped
+            serialize: Write JSON lines instead of formatted text
+
+        """
+        self.stream = stream
+        self.levelno = logger.level(level).no
+        self.serialize = serialize
+        fmt = _MARKUP.sub("", fmt or "{time} | {level: <8} | {message}")
+        match = _TIME_FIELD.search(fmt)
+        self.time_spec = (match and match.group(1)) or "YYYY-MM-DD HH:mm:ss.SSS"
+        self.fmt = _TIME_FIELD.sub("{time}", fmt)
+
+    def write(self, records: List[LogRecord]) -> None:
+        """Write records at or above the writer level in one call."""
+        lines = [
+            self.format(record)
+            for record in records
+            if record["levelno"] >= self.levelno
+        ]
+        if lines:
+            self._write("".join(lines))
+
+    def format(self, record: LogRecord) -> str:
+        """Format a record as one line, plus the traceback if any."""
+        exception = record["exception"]
+        if exception is not None:
+            exception = "".join(traceback.format_exception(*exception))
+        if self.serialize:
+            return json.dumps(
+                {
+                    "time": record["time"].isoformat(),
+                    "level": record["level"],
+                    "message": record["message"],
+                    "name": record["name"],
+                    "function": record["function"],
+                    "line": record["line"],
+                    "extra": record["extra"],
+                    "exception": exception,
+                },
+                default=str,
+            ) + "\n"
+        text = self.fmt.format(
+            time=_format_time(record["time"], self.time_spec),
+            level=record["level"],
+            name=record["name"],
+            function=record["function"],
+            line=record["line"],
+            message=record["message"],
+            extra=record["extra"],
+        )
+        return f"{text}\n{exception}" if exception else f"{text}\n"
+
+    def close(self) -> None:
+        """Flush the stream."""
+        if self.stream is not None:
+            self.stream.flush()
+
+    def _write(self, data: str) -> None:
+        self.stream.write(data)
+        self.stream.flush()
+
+
+class FileLogWriter(LogWriter):
+    """Write batches of records to a file, rotating it by size."""
+
+    def __init__(
+        self,
+        path: str,
+        rotation_bytes: int,
+        retention_days: int,
+        **kwargs: object,
+    ) -> None:
+        """Initialize writer.
+
+        Args:
+            path: Log file path
+            rotation_bytes: Size at which the file is rotated
+            retention_days: Days rotated files are kept
+            kwargs: LogWriter arguments
+
+        """
+        super().__init__(**kwargs)
+        self.path = Path(path)
+        self.rotation_bytes = rotation_bytes
+        self.retention_days = retention_days
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.stream = self.path.open("a", encoding="utf-8")
+
+    def close(self) -> None:
+        """Close the file."""
+        self.stream.close()
+
+    def _write(self, data: str) -> None:
+        if self.stream.tell() + len(data) > self.rotation_bytes:
+            self._rotate()
+        self.stream.write(data)
+        self.stream.flush()
+
+    def _rotate(self) -> None:
+        self.stream.close()
+        suffix = datetime.now(timezone.utc).strftime("%Y-%m-%d_%H-%M-%S_%f")
+        stem, ext = self.path.stem, self.path.suffix
+        self.path.rename(self.path.with_name(f"{stem}.{suffix}{ext}"))
+        self.stream = self.path.open("a", encoding="utf-8")
+
+        cutoff = time.time() - self.retention_days * 86400
+        for rotated in self.path.parent.glob(f"{stem}.*{ext}"):
+            if rotated.stat().st_mtime < cutoff:
+                rotated.unlink(missing_ok=True)
+
+
+class LogPipeline:
+    """Bounded queue of log records drained by a background writer thread.
+
+    Logging calls only convert the record and put it on the queue, the writer
+    thread formats and serializes records and writes them in batches. When
+    the queue is past its high watermark DEBUG and TRACE records are dropped.
+    When it is full the overflow policy applies: ``drop`` drops records below
+    ERROR and waits for room for the rest, ``block`` waits for room for all.
+    """
+
+    def __init__(
+        self,
+        writers: List[LogWriter],
+        maxsize: int = 10000,
+        overflow: str = "drop",
+        batch_size: int = 512,
+        flush_interval: float = 0.5,
+    ) -> None:
+        """Initialize pipeline.
+
+        Args:
+            writers: Writers each batch is handed to
+            maxsize: Maximum number of queued records
+            overflow: "drop" or "block"
+            batch_size: Maximum records written per batch
+            flush_interval: Seconds a record may wait before being written
+
+        """
+        self.writers = writers
+        self.levelno = min(writer.levelno for writer in writers)
+        self.maxsize = maxsize
+        self.high_watermark = int(maxsize * 0.8)
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue[Optional[LogRecord]] = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+
+    def sink(self, message: "Message") -> None:
+        """Loguru sink queueing the record of message."""
+        record = message.record
+        exception = record["exception"]
+        self.put(
+            LogRecord(
+                time=record["time"],
+                level=record["level"].name,
+                levelno=record["level"].no,
+                message=record["message"],
+                name=record["name"],
+                function=record["function"],
+                line=record["line"],
+                extra=record["extra"],
+                exception=(
+                    (exception.type, exception.value, exception.traceback)
+                    if exception
+                    else None
+                ),
+            )
+        )
+
+    def put(self, record: LogRecord) -> None:
+        """Queue a record, applying the overflow policy."""
+        levelno = record["levelno"]
+        if levelno <= DEBUG_LEVELNO and self._queue.qsize() >= self.high_watermark:
+            LOG_RECORDS_DROPPED.labels(record["level"]).inc()
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow != "block" and levelno < ERROR_LEVELNO:
+                LOG_RECORDS_DROPPED.labels(record["level"]).inc()
+                return
+            self._queue.put(record)
+        LOG_RECORDS_QUEUED.inc()
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        LOG_QUEUE_DEPTH.set_function(self._queue.qsize)
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write all queued records and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        for writer in self.writers:
+            writer.close()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            stopping = record is None
+            if not stopping:
+                batch.append(record)
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                else:
+                    batch.append(record)
+            if batch:
+                self._write(batch)
+            if stopping:
+                return
+
+    def _write(self, batch: List[LogRecord]) -> None:
+        for writer in self.writers:
+            try:
+                writer.write(batch)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+
+
+log_pipeline: Optional[LogPipeline] = None
+
 
 class InterceptHandler(logging.Handler):
     """Intercept standard logging add redirect to logura."""
 
     def emit(self, record: logging.LogRecord) -> None:
+        pipeline = log_pipeline
+        if pipeline is not None:
+            # Queue directly, the record already knows where it was logged.
+            if record.levelno < pipeline.levelno:
+                return
+            request_id = request_id_ctx.get()
+            extra = {"request_id": request_id} if request_id is not None else {}
+            pipeline.put(
+                LogRecord(
+                    time=datetime.fromtimestamp(record.created).astimezone(),
+                    level=record.levelname,
+                    levelno=record.levelno,
+                    message=record.getMessage(),
+                    name=record.name,
+                    function=record.funcName,
+                    line=record.lineno,
+                    extra=extra,
+                    exception=record.exc_info,
+                )
+            )
+            return
+
         try:
             level = logger.level(record.levelname).name
         except ValueError:
             level = record.levelno
-        
+
         frame, depth = logging.currentframe(), 2
         while frame.f_code.co_filename == logging.__file__:
             frame = frame.f_back
@@ -25,21 +368,42 @@ class InterceptHandler(logging.Handler):
 
 def setup_logging(_logging_config: Optional[Dict[str, Any]] = None) -> None:
     """Configura logging with logura."""
+    global log_pipeline
+    shutdown_logging()
     logger.remove()
 
-    logger.add(
-        sys.stdout,
-        format=settings.LOG_FORMAT,
-        level=settings.LOG_LEVEL,
-        serialize=True,
+    log_pipeline = LogPipeline(
+        writers=[
+            LogWriter(
+                sys.stdout,
+                level=settings.LOG_LEVEL,
+                fmt=settings.LOG_FORMAT,
+                serialize=True,
+            ),
+            FileLogWriter(
+                settings.LOG_FILE,
+                rotation_bytes=settings.LOG_FILE_ROTATION_BYTES,
+                retention_days=settings.LOG_FILE_RETENTION_DAYS,
+                level="INFO",
+                fmt=settings.LOG_FORMAT,
+            ),
+        ],
+        maxsize=settings.LOG_QUEUE_SIZE,
+        overflow=settings.LOG_OVERFLOW_POLICY,
+        batch_size=settings.LOG_BATCH_SIZE,
+        flush_interval=settings.LOG_FLUSH_INTERVAL,
     )
+    log_pipeline.start()
+    logger.add(log_pipeline.sink, level=log_pipeline.levelno, format="{message}")
 
-    logger.add(
-        "logs/app.log",
-        format=settings.LOG_FORMAT,
-        level="INFO",
-        rotation="500 MB",
-        retention="10 days",
-    )
+    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
 
-    logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
\ No newline at end of file
+def shutdown_logging() -> None:
+    """Write all queued log records and stop the background writer."""
+    global log_pipeline
+    if log_pipeline is not None:
+        pipeline, log_pipeline = log_pipeline, None
+        # Records logged after shutdown go straight to stderr.
+        logger.remove()
+        logger.add(sys.stderr, level=settings.LOG_LEVEL)
+        pipeline.stop()
@@ -0,0 +1,477 @@
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from loguru import logger
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0
+)
+
+Sample = Tuple[str, Dict[str, str], float]
+# (name, type, documentation, samples)
+Family = Tuple[str, str, str, List[Sample]]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Registry:
+    """Process-local collection of metrics."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: "Metric") -> None:
+        """Register a metric, rejecting duplicate names."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional["Metric"]:
+        """Return a registered metric by name."""
+        return self._metrics.get(name)
+
+    def __iter__(self) -> Iterator["Metric"]:
+        """Iterate over registered metrics."""
+        return iter(list(self._metrics.values()))
+
+    def collect(self) -> List[Family]:
+        """Return the current samples of every metric."""
+        return [
+            (metric.name, metric.type, metric.documentation, metric.collect())
+            for metric in self
+        ]
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Base class for metrics.
+
+    Children are created once per label-value tuple and cached, so the hot
+    path of recording a value is a dict lookup plus an attribute update.
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ) -> None:
+        """Initialize metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels of this metric
+            registry: Registry to add the metric to, None to keep it private
+
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> object:
+        """Return the child for the given label values."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"Expected labels {self.labelnames}, got {values}")
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], object]]:
+        """Return (labels, child) pairs."""
+        return [
+            (dict(zip(self.labelnames, values)), child)
+            for values, child in list(self._children.items())
+        ]
+
+    def collect(self) -> List[Sample]:
+        """Return the samples of every child."""
+        return [
+            (self.name, labels, child.value) for labels, child in self.children()
+        ]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+
+    type = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled counter."""
+        self._children[()].inc(amount)
+
+    @property
+    def value(self) -> float:
+        """Value of the unlabelled counter."""
+        return self._children[()].value
+
+
+class _GaugeChild:
+    __slots__ = ("_function", "_value")
+
+    def __init__(self) -> None:
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._value
+
+
+class Gauge(Metric):
+    """Value that can go up and down, or be computed at collection time.
+
+    multiprocess_mode tells how the values of several worker processes are
+    combined: summed, like in-flight requests, or the max or min of them,
+    like replication lag or replica health.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+        multiprocess_mode: Literal["sum", "max", "min"] = "sum",
+    ) -> None:
+        """Initialize gauge.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels of this metric
+            registry: Registry to add the metric to, None to keep it private
+            multiprocess_mode: How values of worker processes are combined
+
+        """
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled gauge."""
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the unlabelled gauge."""
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled gauge."""
+        self._children[()].set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the unlabelled gauge by calling function at collection time."""
+        self._children[()].set_function(function)
+
+    @property
+    def value(self) -> float:
+        """Value of the unlabelled gauge."""
+        return self._children[()].value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    """Distribution of observed values in fixed buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ) -> None:
+        """Initialize histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels of this metric
+            buckets: Sorted upper bounds of the buckets, +Inf is implicit
+            registry: Registry to add the metric to, None to keep it private
+
+        """
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Observe a value on the unlabelled histogram."""
+        self._children[()].observe(value)
+
+    def collect(self) -> List[Sample]:
+        """Return cumulative bucket, sum and count samples of every child."""
+        samples: List[Sample] = []
+        for labels, child in self.children():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), child.counts):
+                cumulative += count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        {**labels, "le": _format_value(bound)},
+                        cumulative,
+                    )
+                )
+            samples.append((f"{self.name}_sum", labels, child.sum))
+            samples.append((f"{self.name}_count", labels, child.count))
+        return samples
+
+    @property
+    def count(self) -> int:
+        """Number of observations of the unlabelled histogram."""
+        return self._children[()].count
+
+
+@contextmanager
+def timer(child: "_HistogramChild | Histogram") -> Iterator[None]:
+    """Observe the duration of the block on a histogram or histogram child."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        child.observe(time.perf_counter() - start)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str, quotes: bool = True) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quotes else value
+
+
+def generate_latest(families: Iterable[Family]) -> str:
+    """Render metric families in the Prometheus text exposition format.
+
+    Args:
+        families: Families as returned by Registry.collect
+
+    Returns:
+        Exposition text
+
+    """
+    lines = []
+    for name, metric_type, documentation, samples in families:
+        lines.append(f"# HELP {name} {_escape(documentation, quotes=False)}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for sample_name, labels, value in samples:
+            if labels:
+                rendered = ",".join(
+                    f'{key}="{_escape(str(label))}"' for key, label in labels.items()
+                )
+                sample_name = f"{sample_name}{{{rendered}}}"
+            lines.append(f"{sample_name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MultiProcessStore:
+    """Share metrics between the worker processes of one server.
+
+    Every process keeps recording into its own lock-free registry and
+    periodically writes a snapshot of it to ``<directory>/metrics-<pid>.json``.
+    A scrape, served by whichever worker gets it, merges the snapshots of
+    all workers: counters and histograms are summed, gauges are combined by
+    their multiprocess_mode. Gauges of processes that have exited are left
+    out, their counters and histograms stay so totals never go backwards.
+
+    The directory must be emptied before the server starts.
+    """
+
+    def __init__(self, directory: str, registry: Registry = REGISTRY) -> None:
+        """Initialize store.
+
+        Args:
+            directory: Directory shared by the worker processes
+            registry: Registry of this process
+
+        """
+        self.directory = Path(directory)
+        self.registry = registry
+        self._writer: Optional[asyncio.Task] = None
+
+    @property
+    def path(self) -> Path:
+        """Snapshot file of this process."""
+        return self.directory / f"metrics-{os.getpid()}.json"
+
+    def write(self) -> None:
+        """Write the snapshot of this process."""
+        families = []
+        for metric in self.registry:
+            mode = getattr(metric, "multiprocess_mode", None)
+            families.append(
+                [metric.name, metric.type, metric.documentation, mode, metric.collect()]
+            )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path
+        temporary = path.with_name(f"{path.name}.tmp")
+        with temporary.open("w") as f:
+            json.dump({"pid": os.getpid(), "families": families}, f)
+        temporary.replace(path)
+
+    def collect(self) -> List[Family]:
+        """Merge the snapshots of every process, this one freshly written."""
+        self.write()
+        merged: Dict[str, Tuple[str, str, Optional[str], Dict[tuple, list]]] = {}
+        for path in self.directory.glob("metrics-*.json"):
+            try:
+                with path.open() as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _process_alive(snapshot["pid"])
+            for name, metric_type, documentation, mode, samples in snapshot["families"]:
+                if metric_type == "gauge" and not alive:
+                    continue
+                _, _, _, values = merged.setdefault(
+                    name, (metric_type, documentation, mode, {})
+                )
+                for sample_name, labels, value in samples:
+                    key = (sample_name, tuple(sorted(labels.items())))
+                    values.setdefault(key, []).append(value)
+
+        return [
+            (
+                name,
+                metric_type,
+                documentation,
+                [
+                    (sample_name, dict(labels), _combine(mode, values))
+                    for (sample_name, labels), values in values_by_key.items()
+                ],
+            )
+            for name, (metric_type, documentation, mode, values_by_key) in sorted(
+                merged.items()
+            )
+        ]
+
+    def start(self, interval: float) -> None:
+        """Write a snapshot every interval seconds in the background."""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_forever(interval))
+
+    async def stop(self) -> None:
+        """Stop writing in the background and write a last snapshot."""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        self.write()
+
+    async def _write_forever(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.write()
+            except OSError as e:
+                logger.warning(f"Writing the metrics snapshot failed: {e}")
+
+
+def _combine(mode: Optional[str], values: List[float]) -> float:
+    if mode == "max":
+        return max(values)
+    if mode == "min":
+        return min(values)
+    return sum(values)
+
+
+def _process_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,48 @@
+from typing import TYPE_CHECKING, Optional, Type
+
+from app.common.config import settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+_client: Optional["Redis"] = None
+
+
+def get_redis() -> Optional["Redis"]:
+    """Get the shared Redis client.
+
+    Returns:
+        Redis client, or None if REDIS_URL is not configured
+
+    """
+    global _client
+    if _client is None and settings.REDIS_URL:
+        from redis.asyncio import Redis
+
+        _client = Redis.from_url(settings.REDIS_URL)
+    return _client
+
+
+def redis_error() -> Type[Exception]:
+    """Return the base class of the Redis client's errors.
+
+    redis is only imported once a client is used, so callers catch
+    ``redis_error()`` rather than importing RedisError at module level.
+    """
+    from redis.exceptions import RedisError
+
+    return RedisError
+
+
+def set_redis(client: Optional["Redis"]) -> None:
+    """Replace the shared Redis client, e.g. with a stand-in in tests."""
+    global _client
+    _client = client
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
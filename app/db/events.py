@@ -0,0 +1,172 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Union
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.engine.interfaces import (
+    DBAPICursor,
+    ExceptionContext,
+    ExecutionContext,
+)
+
+from app.common.logger import request_id_ctx
+from app.common.metrics import Counter, Histogram
+
+STATEMENT_SECONDS = Histogram(
+    "db_statement_seconds",
+    "Time spent executing SQL statements, by statement keyword.",
+    labelnames=("operation",),
+    buckets=(
+        0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+        5.0, 10.0,
+    ),
+)
+STATEMENT_ERRORS = Counter(
+    "db_statement_errors_total",
+    "SQL statements that raised an error, by statement keyword.",
+    labelnames=("operation",),
+)
+SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total",
+    "SQL statements slower than the slow query threshold.",
+)
+
+OPERATIONS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"})
+
+# Parameters of a statement, a list of them for executemany.
+Parameters = Union[Mapping[str, Any], Sequence[Any]]
+
+
+class StatementStats:
+    """Statements issued while the stats are tracked, see track_statements.
+
+    Stats tracked inside other stats, e.g. a request inside a test, count
+    towards both.
+    """
+
+    __slots__ = ("count", "parent", "seconds", "statements")
+
+    def __init__(
+        self, parent: Optional["StatementStats"] = None, record: bool = False
+    ) -> None:
+        """Initialize stats.
+
+        Args:
+            parent: Enclosing stats, updated as well
+            record: Whether to keep the statements themselves
+
+        """
+        self.count = 0
+        self.seconds = 0.0
+        self.parent = parent
+        self.statements: Optional[List[str]] = [] if record else None
+
+    def add(self, statement: str, seconds: float) -> None:
+        """Count a statement here and in every enclosing stats."""
+        stats: Optional[StatementStats] = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            if stats.statements is not None:
+                stats.statements.append(statement)
+            stats = stats.parent
+
+
+statement_stats_ctx: ContextVar[Optional[StatementStats]] = ContextVar(
+    "statement_stats", default=None
+)
+
+
+@contextmanager
+def track_statements(record: bool = False) -> Iterator[StatementStats]:
+    """Count the statements issued by the current context within the block.
+
+    Args:
+        record: Whether to keep the statements themselves
+
+    Yields:
+        Stats updated as statements complete
+
+    """
+    stats = StatementStats(parent=statement_stats_ctx.get(), record=record)
+    token = statement_stats_ctx.set(stats)
+    try:
+        yield stats
+    finally:
+        statement_stats_ctx.reset(token)
+
+
+def statement_operation(statement: str) -> str:
+    """Leading keyword of a statement, "OTHER" for anything unusual."""
+    keyword = statement[:16].split(None, 1)
+    if keyword and keyword[0].upper() in OPERATIONS:
+        return keyword[0].upper()
+    return "OTHER"
+
+
+def redact(
+    parameters: Parameters, executemany: bool = False
+) -> Union[str, Dict[str, str], List[str]]:
+    """Replace parameter values by their type names, which are safe to log."""
+    if executemany:
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def instrument_statements(engine: Engine, slow_query_seconds: float = 0.0) -> None:
+    """Record the latency of every statement executed on engine.
+
+    Statements are added to the statement stats of the current request and
+    those taking at least slow_query_seconds, if positive, are logged with
+    the request id and redacted parameters.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        conn: Connection,
+        _cursor: DBAPICursor,
+        _statement: str,
+        _parameters: Parameters,
+        _context: Optional[ExecutionContext],
+        _executemany: bool,
+    ) -> None:
+        conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        conn: Connection,
+        _cursor: DBAPICursor,
+        statement: str,
+        parameters: Parameters,
+        _context: Optional[ExecutionContext],
+        executemany: bool,
+    ) -> None:
+        seconds = time.perf_counter() - conn.info["statement_start"].pop()
+        STATEMENT_SECONDS.labels(statement_operation(statement)).observe(seconds)
+        stats = statement_stats_ctx.get()
+        if stats is not None:
+            stats.add(statement, seconds)
+        if 0 < slow_query_seconds <= seconds:
+            SLOW_STATEMENTS.inc()
+            logger.warning(
+                "Slow query took {:.3f}s in request {}: {} parameters {}",
+                seconds,
+                request_id_ctx.get(),
+                statement,
+                redact(parameters, executemany),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context: ExceptionContext) -> None:
+        conn = context.connection
+        starts = conn.info.get("statement_start") if conn is not None else None
+        if starts and context.statement is not None:
+            starts.pop()
+            STATEMENT_ERRORS.labels(statement_operation(context.statement)).inc()
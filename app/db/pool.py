@@ -0,0 +1,182 @@
+import time
+from typing import Any, Dict
+from uuid import uuid4
+
+from loguru import logger
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.engine.interfaces import DBAPIConnection
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    NullPool,
+    PoolProxiedConnection,
+)
+
+from app.common.config import Settings
+from app.common.logger import request_id_ctx
+from app.common.metrics import Counter, Gauge, Histogram
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the pool.",
+    labelnames=("pool",),
+)
+POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out of the pool.",
+    labelnames=("pool",),
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Connections open beyond the pool size.",
+    labelnames=("pool",),
+)
+POOL_EXHAUSTED = Counter(
+    "db_pool_exhausted_total",
+    "Checkouts that had to wait because every connection was in use.",
+    labelnames=("pool",),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after waiting for the pool timeout.",
+    labelnames=("pool",),
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording checkout wait time, usage and exhaustion.
+
+    A checkout that finds every connection in use, overflow included, is
+    logged with the id of the request that is waiting, so a saturated pool
+    shows up next to the requests it slows down.
+
+    Metrics are labelled with the pool's logging name, the engine's
+    ``pool_logging_name``, "primary" if unset. A pool recreated when its
+    engine is disposed keeps the name and takes over its gauges.
+    """
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        """Initialize pool and bind the usage gauges to it."""
+        super().__init__(*args, **kwargs)
+        name = self._orig_logging_name or "primary"
+        self._checkout_seconds = POOL_CHECKOUT_SECONDS.labels(name)
+        self._exhausted = POOL_EXHAUSTED.labels(name)
+        self._timeouts = POOL_TIMEOUTS.labels(name)
+        POOL_IN_USE.labels(name).set_function(self.checkedout)
+        POOL_OVERFLOW.labels(name).set_function(lambda: max(self.overflow(), 0))
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        exhausted = (
+            self._max_overflow > -1
+            and self.checkedout() >= self.size() + self._max_overflow
+        )
+        if exhausted:
+            self._exhausted.inc()
+            logger.warning(
+                "Database pool exhausted ({} connections in use), request {} "
+                "waits up to {}s for a connection",
+                self.checkedout(),
+                request_id_ctx.get(),
+                self._timeout,
+            )
+
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self._timeouts.inc()
+            logger.error(
+                "Request {} timed out after {}s waiting for a database connection",
+                request_id_ctx.get(),
+                self._timeout,
+            )
+            raise
+        finally:
+            self._checkout_seconds.observe(time.perf_counter() - start)
+
+
+def ping_idle_connections(engine: Engine, idle_seconds: float) -> None:
+    """Ping connections on checkout only after they sat idle in the pool.
+
+    pool_pre_ping pays a round trip on every checkout. Connections that were
+    returned moments ago are very unlikely to be dead, so they are handed out
+    as is and only those idle for longer than idle_seconds are pinged. A
+    failed ping discards the connection and the pool tries a fresh one.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def checkin(
+        _dbapi_connection: DBAPIConnection, connection_record: ConnectionPoolEntry
+    ) -> None:
+        connection_record.info["checkin_time"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def checkout(
+        dbapi_connection: DBAPIConnection,
+        connection_record: ConnectionPoolEntry,
+        _connection_proxy: PoolProxiedConnection,
+    ) -> None:
+        checkin_time = connection_record.info.get("checkin_time")
+        if checkin_time is None or time.monotonic() - checkin_time < idle_seconds:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except engine.dialect.loaded_dbapi.Error as e:
+            if engine.dialect.is_disconnect(e, dbapi_connection, None):
+                raise exc.DisconnectionError from e
+            raise
+
+
+def engine_options(
+    settings: Settings, url: str, name: str = "primary"
+) -> Dict[str, Any]:
+    """Build create_engine keyword arguments from the settings.
+
+    Args:
+        settings: Application settings
+        url: Database URL the engine connects to
+        name: Name of the engine's pool in logs and metrics
+
+    Returns:
+        Keyword arguments for create_async_engine
+
+    """
+    options: Dict[str, Any] = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+    }
+    connect_args: Dict[str, Any] = {}
+    is_asyncpg = make_url(url).drivername == "postgresql+asyncpg"
+
+    if settings.DB_PROFILE == "pgbouncer":
+        # PgBouncer in transaction mode hands each transaction to any server
+        # connection, so statements prepared on one may be missing or taken
+        # on the next. Nothing is cached, statement names are unique and the
+        # pooling is left to PgBouncer.
+        options["poolclass"] = NullPool
+        if is_asyncpg:
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = (
+                lambda: f"__asyncpg_{uuid4()}__"
+            )
+    else:
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_logging_name=name,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            # With LIFO the busy connections are reused and the spare ones
+            # age, so only the spare ones ever need an idle ping.
+            pool_use_lifo=settings.DB_POOL_PRE_PING == "idle",
+        )
+        if is_asyncpg:
+            connect_args["prepared_statement_cache_size"] = (
+                settings.DB_STATEMENT_CACHE_SIZE
+            )
+
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
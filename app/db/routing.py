@@ -0,0 +1,324 @@
+import asyncio
+import itertools
+import time
+from typing import Callable, Hashable, Iterable, Optional, Sequence, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.common.metrics import Counter, Gauge
+from app.utils.cache import ExpiringLRUCache
+
+ROUTED_STATEMENTS = Counter(
+    "db_routed_statements_total",
+    "Statements sent to the primary or a replica.",
+    labelnames=("target",),
+)
+REPLICA_HEALTHY = Gauge(
+    "db_replica_healthy",
+    "Whether a replica is serving reads, 1 or 0.",
+    labelnames=("replica",),
+    multiprocess_mode="min",
+)
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag measured by the last health check.",
+    labelnames=("replica",),
+    multiprocess_mode="max",
+)
+
+# Time since the last replayed transaction, 0 while the replica is caught up.
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM now() - "
+    "pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    """Replica engine and its health as seen by the last check."""
+
+    def __init__(self, name: str, engine: AsyncEngine) -> None:
+        """Initialize replica.
+
+        Args:
+            name: Name used in logs and metrics
+            engine: Engine connected to the replica
+
+        """
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.lag = 0.0
+
+
+class ReplicaRouter:
+    """Choose the engine each statement of a session runs on.
+
+    Writes go to the primary, and so does everything after a session's first
+    write. Sessions are spread round robin over the healthy replicas, each
+    session reading from one replica so its reads see one point in time. A subject,
+    usually the authenticated user, that committed a write reads from the
+    primary for read_your_writes_seconds afterwards. That way the user never
+    sees a replica that has not caught up with their own change yet.
+
+    Replicas are checked in the background. A replica that can not be
+    reached or lags more than max_lag_seconds is ejected until a later check
+    passes. With no healthy replica every statement goes to the primary.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine] = (),
+        max_lag_seconds: float = 5.0,
+        check_interval: float = 5.0,
+        read_your_writes_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize router.
+
+        Args:
+            primary: Engine connected to the primary
+            replicas: Engines connected to the replicas
+            max_lag_seconds: Replication lag beyond which a replica is ejected
+            check_interval: Seconds between replica health checks
+            read_your_writes_seconds: Seconds a writer keeps reading from the
+                primary
+            clock: Monotonic clock, replaceable in tests
+
+        """
+        self.primary = primary
+        self.replicas = [
+            Replica(f"replica{i}", engine) for i, engine in enumerate(replicas)
+        ]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.clock = clock
+        self._recent_writers = ExpiringLRUCache(
+            "read_your_writes", 100000, clock=clock
+        )
+        self._counter = itertools.count()
+        self._checker: Optional[asyncio.Task] = None
+        for replica in self.replicas:
+            REPLICA_HEALTHY.labels(replica.name).set(1)
+
+    def reads_primary(self, subject: Optional[Hashable] = None) -> bool:
+        """Whether a read on behalf of subject goes to the primary."""
+        if subject is not None and self._recent_writers.get(subject):
+            return True
+        return not any(replica.healthy for replica in self.replicas)
+
+    def read_replica(
+        self,
+        subject: Optional[Hashable] = None,
+        current: Optional[Replica] = None,
+    ) -> Optional[Replica]:
+        """Replica for a read on behalf of subject, None to read the primary.
+
+        Args:
+            subject: Subject the read is for
+            current: Replica the session read from so far, kept while it is
+                healthy so the session does not mix replicas at different lag
+
+        """
+        if self.reads_primary(subject):
+            return None
+        if current is not None and current.healthy:
+            return current
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        return healthy[next(self._counter) % len(healthy)]
+
+    def reader(self, subject: Optional[Hashable] = None) -> Engine:
+        """Engine for a read on behalf of subject."""
+        return self.engine(self.read_replica(subject))
+
+    def engine(self, replica: Optional[Replica]) -> Engine:
+        """Engine of replica, of the primary if replica is None."""
+        if replica is None:
+            return self.writer()
+        ROUTED_STATEMENTS.labels("replica").inc()
+        return replica.engine.sync_engine
+
+    def writer(self) -> Engine:
+        """Engine for writes and reads that must see them."""
+        ROUTED_STATEMENTS.labels("primary").inc()
+        return self.primary.sync_engine
+
+    def mark_written(self, subjects: Set[Hashable]) -> None:
+        """Send reads of subjects to the primary for the next while."""
+        if self.read_your_writes_seconds <= 0:
+            return
+        expires_at = self.clock() + self.read_your_writes_seconds
+        for subject in subjects:
+            self._recent_writers.set(subject, True, expires_at)
+
+    async def check_replicas(self) -> None:
+        """Check every replica once and eject or restore it."""
+        for replica in self.replicas:
+            try:
+                lag = await self._lag(replica.engine)
+            except Exception as e:
+                healthy, lag = False, None
+                reason = str(e)
+            else:
+                healthy = lag <= self.max_lag_seconds
+                reason = f"lag {lag:.1f}s exceeds {self.max_lag_seconds}s"
+
+            if lag is not None:
+                replica.lag = lag
+                REPLICA_LAG.labels(replica.name).set(lag)
+            if healthy != replica.healthy:
+                if healthy:
+                    logger.info(f"Replica {replica.name} restored")
+                else:
+                    logger.warning(f"Replica {replica.name} ejected: {reason}")
+            replica.healthy = healthy
+            REPLICA_HEALTHY.labels(replica.name).set(int(healthy))
+
+    def start(self) -> None:
+        """Start checking the replicas in the background."""
+        if self._checker is None and self.replicas:
+            self._checker = asyncio.create_task(self._check_forever())
+
+    async def stop(self) -> None:
+        """Stop checking the replicas."""
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+
+    async def dispose(self) -> None:
+        """Close the connections of every engine."""
+        await self.primary.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _check_forever(self) -> None:
+        while True:
+            await self.check_replicas()
+            await asyncio.sleep(self.check_interval)
+
+    @staticmethod
+    async def _lag(engine: AsyncEngine) -> float:
+        async with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                return float((await conn.execute(POSTGRES_LAG_QUERY)).scalar())
+            await conn.execute(text("SELECT 1"))
+            return 0.0
+
+
+class RoutingSession(Session):
+    """Session sending each statement to the engine its router picks.
+
+    Reads stay on the replica picked for the first one, unless it is
+    ejected, so one request never mixes replicas at different lag.
+
+    Set ``info["subject"]`` to route the session for read-your-writes, see
+    ReplicaRouter. Set ``info["primary"]`` to read from the primary only.
+    """
+
+    def __init__(
+        self, *args: object, router: ReplicaRouter, **kwargs: object
+    ) -> None:
+        """Initialize session with the router that picks its engines."""
+        super().__init__(*args, **kwargs)
+        self.router = router
+        self._wrote = False
+        self._written: Set[Hashable] = set()
+        self._replica: Optional[Replica] = None
+
+    # Session.get_bind's signature, SQLAlchemy passes mapper by keyword.
+    def get_bind(
+        self,
+        mapper: Optional[object] = None,  # noqa: ARG002
+        clause: Optional[ClauseElement] = None,
+        **kwargs: object,  # noqa: ARG002
+    ) -> Engine:
+        """Route writes and everything after them to the primary."""
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._wrote = True
+            subject = self.info.get("subject")
+            if subject is not None:
+                self._written.add(subject)
+        if self._wrote or self.info.get("primary"):
+            return self.router.writer()
+        replica = self.router.read_replica(self.info.get("subject"), self._replica)
+        if replica is not None:
+            self._replica = replica
+        return self.router.engine(replica)
+
+    @property
+    def wrote(self) -> bool:
+        """Whether the session wrote, so every further statement is primary."""
+        return self._wrote
+
+    def mark_written(self, subjects: Iterable[Hashable]) -> None:
+        """Let subjects read this session's writes once it commits."""
+        self._written.update(subjects)
+
+    def commit(self) -> None:
+        """Commit and let the written subjects read their writes."""
+        super().commit()
+        if self._written:
+            self.router.mark_written(self._written)
+            self._written = set()
+
+
+def mark_written(session: AsyncSession, *subjects: Hashable) -> None:
+    """Let subjects besides the session's own read this session's writes.
+
+    Used when one user changes another, e.g. so the changed user's next
+    request does not load and cache their old row from a replica.
+    """
+    sync_session = session.sync_session
+    if isinstance(sync_session, RoutingSession):
+        sync_session.mark_written(subjects)
+
+
+def shared_read_target(session: AsyncSession) -> Optional[Tuple[ReplicaRouter, bool]]:
+    """Where another session must read to see what session would read.
+
+    Returns:
+        The router of session and whether to read from the primary, or None
+        if the reads must stay in session: it wrote and has to see its own
+        transaction, or it is not routed
+
+    """
+    sync_session = session.sync_session
+    if not isinstance(sync_session, RoutingSession) or sync_session.wrote:
+        return None
+    router = sync_session.router
+    primary = bool(
+        sync_session.info.get("primary")
+        or router.reads_primary(sync_session.info.get("subject"))
+    )
+    return router, primary
+
+
+def read_session(router: ReplicaRouter, primary: bool) -> AsyncSession:
+    """Session routed by router, reading from the primary only if primary."""
+    session = AsyncSession(
+        bind=router.primary,
+        sync_session_class=RoutingSession,
+        router=router,
+        expire_on_commit=False,
+    )
+    if primary:
+        read_from_primary(session)
+    return session
+
+
+def read_from_primary(session: AsyncSession) -> None:
+    """Send every further read of session to the primary."""
+    session.info["primary"] = True
+
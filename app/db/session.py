@@ -1,21 +1,80 @@
-from typing import AsyncGenerator
+from functools import cache
+from typing import AsyncGenerator, Union
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+
 from app.common.config import settings
+from app.db.events import instrument_statements
+from app.db.pool import engine_options, ping_idle_connections
+from app.db.routing import ReplicaRouter, RoutingSession
 
-async_engine = create_async_engine(
-    settings.ASYNC_DATABASE_URL,
-    pool_pre_ping=True,
-    future=True,
-)
 
-AsyncSessionLocal = sessionmaker(
-    async_engine,
+def create_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """Create an engine configured from the settings, its pool named name."""
+    engine = create_async_engine(
+        url, future=True, **engine_options(settings, url, name)
+    )
+    instrument_statements(engine.sync_engine, settings.DB_SLOW_QUERY_SECONDS)
+    if settings.DB_POOL_PRE_PING == "idle":
+        ping_idle_connections(
+            engine.sync_engine, settings.DB_POOL_PRE_PING_IDLE_SECONDS
+        )
+    return engine
+
+
+@cache
+def get_db_router() -> ReplicaRouter:
+    """Get the router of the primary and replica engines, creating them once.
+
+    Engines are created on first use, normally at application startup, not
+    when this module is imported. Importing the app then neither loads the
+    database drivers nor needs a valid database URL.
+    """
+    return ReplicaRouter(
+        create_engine(settings.ASYNC_DATABASE_URL),
+        [
+            create_engine(url, f"replica{i}")
+            for i, url in enumerate(settings.ASYNC_DATABASE_REPLICA_URLS)
+        ],
+        max_lag_seconds=settings.DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.DB_REPLICA_CHECK_INTERVAL,
+        read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+    )
+
+
+def get_engine() -> AsyncEngine:
+    """Get the engine connected to the primary."""
+    return get_db_router().primary
+
+
+class LazySessionMaker(sessionmaker):
+    """Session factory that binds to the router on the first session."""
+
+    def __call__(self, **local_kw: object) -> AsyncSession:
+        """Create a session, creating the engines first if needed."""
+        if "router" not in self.kw:
+            router = get_db_router()
+            self.configure(bind=router.primary, router=router)
+        return super().__call__(**local_kw)
+
+
+AsyncSessionLocal = LazySessionMaker(
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
 )
 
+
+def __getattr__(name: str) -> Union[AsyncEngine, ReplicaRouter]:
+    # async_engine and db_router are created on first access.
+    if name == "async_engine":
+        return get_engine()
+    if name == "db_router":
+        return get_db_router()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 async def get_async_session() -> AsyncGenerator[AsyncGenerator, None]:
     """Get an async database session."""
 
@@ -23,4 +82,4 @@ async def get_async_session() -> AsyncGenerator[AsyncGenerator, None]:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
@@ -25,6 +25,9 @@ class ErrorCode:
     RATE_LIMIT_EXCEEDED_CODE = "E0007"
     RATE_LIMIT_EXCEEDED_MESSAGE = "Rate limit exceeded."
 
+    NOT_MODIFIED_CODE = "E0008"
+    NOT_MODIFIED_MESSAGE = "Not modified."
+
     EMAIL_ALREADY_EXISTS_CODE = "E0100"
     EMAIL_ALREADY_EXISTS_MESSAGE = "Email already exists."
 
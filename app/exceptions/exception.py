@@ -9,6 +9,7 @@ class BaseError(Exception):
         message: Optional[str] = None, 
         code: Optional[str] = None,
         status_code: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
         ) -> None:
         """
         Initialize error.
@@ -17,12 +18,14 @@ class BaseError(Exception):
             message: Error message
             code: Error code
             status_code: HTTP status code
+            headers: HTTP headers added to the error response
         
         """
 
         self.message = message or self.message
         self.code = code or self.code
         self.status_code = status_code or self.status_code
+        self.headers = headers
         super().__init__(self.message)
 
     
@@ -165,4 +168,11 @@ class UserDoesNotExistError(BaseError):
 
     status_code = 404
     code = ErrorCode.USER_DOES_NOT_EXIST_CODE
-    message = ErrorCode.USER_DOES_NOT_EXIST_MESSAGE
\ No newline at end of file
+    message = ErrorCode.USER_DOES_NOT_EXIST_MESSAGE
+
+class NotModifiedError(BaseError):
+    """Resource not modified since the client's copy, sent without a body."""
+
+    status_code = 304
+    code = ErrorCode.NOT_MODIFIED_CODE
+    message = ErrorCode.NOT_MODIFIED_MESSAGE
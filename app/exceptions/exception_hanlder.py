@@ -1,7 +1,16 @@
-from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi import Request, Response
+
+from starlette.status import HTTP_304_NOT_MODIFIED
+
 from app.exceptions.exception import BaseError
+from app.utils.responses import ORJSONResponse
+
 
-async def http_exception_handler(_request: Request, exc: BaseError) -> JSONResponse:
+async def http_exception_handler(_request: Request, exc: BaseError) -> Response:
     """Handle exceptions and return JSON response."""
-    return JSONResponse(status_code=exc.status_code, content=exc.to_dict())
\ No newline at end of file
+    if exc.status_code == HTTP_304_NOT_MODIFIED:
+        # A 304 response must not have a body.
+        return Response(status_code=exc.status_code, headers=exc.headers)
+    return ORJSONResponse(
+        status_code=exc.status_code, content=exc.to_dict(), headers=exc.headers
+    )
@@ -0,0 +1,132 @@
+"""Drive the API with open-loop load from a scenario file.
+
+Run with: python -m app.loadgen app/loadgen/scenarios/auth_flow.toml
+    [--target http://localhost:8000 | --in-process] [--output report.json]
+
+Virtual users start at the arrival rate of each phase and go through the
+scenarios of the file. Every phase is reported with its throughput,
+latency percentiles and errors by step, and --output writes the full
+report, histograms included, as JSON. With an SLO in the file the report
+names the highest rate that met it, so a file with phases of increasing
+rate finds the saturation point of the target.
+
+Seed users are created directly in the database configured for the app,
+so seeding a remote target needs the same settings as the target.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Dict
+
+import httpx
+from loguru import logger
+
+from app.loadgen.runner import LoadRunner, render_report, saturation
+from app.loadgen.scenario import load
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the load test described by args and return its report."""
+    test = load(args.scenario)
+    if args.target:
+        test.target = args.target
+    for phase in test.phases:
+        phase.rate *= args.rate_scale
+
+    if args.in_process or test.seed:
+        from app.loadgen import seed
+
+        if args.in_process:
+            logger.remove()
+            logger.add(lambda _message: None, level="INFO")
+        if args.create_schema:
+            await seed.create_schema()
+        if test.seed:
+            await seed.seed_users(test.seed)
+
+    if args.in_process:
+        from app.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadgen"
+        )
+    else:
+        limits = httpx.Limits(
+            max_connections=test.max_sessions,
+            max_keepalive_connections=test.max_sessions,
+        )
+        client = httpx.AsyncClient(base_url=test.target, limits=limits)
+
+    run_id = datetime.now(UTC).strftime("%Y%m%d%H%M%S")
+    async with client:
+        runner = LoadRunner(test, client, {"run": run_id})
+        await runner.setup()
+        phases = await runner.run()
+
+    if args.in_process:
+        from app.db.session import db_router
+
+        await db_router.dispose()
+    return {
+        "created": datetime.now(UTC).isoformat(),
+        "scenario_file": args.scenario,
+        "target": "in-process" if args.in_process else test.target,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "slo": test.slo.model_dump() if test.slo else None,
+        "saturation": saturation(phases),
+        "phases": phases,
+    }
+
+
+def main() -> int:
+    """Run the load test given on the command line, return the exit status."""
+    parser = argparse.ArgumentParser(prog="python -m app.loadgen")
+    parser.add_argument("scenario", help="TOML or YAML scenario file")
+    parser.add_argument("--target", help="base URL, overrides the scenario file")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="drive the app in this process instead of over the network",
+    )
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="create the tables first, for a fresh database",
+    )
+    parser.add_argument(
+        "--rate-scale",
+        type=float,
+        default=1.0,
+        help="multiply the arrival rate of every phase",
+    )
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        report = asyncio.run(run(args))
+    except (RuntimeError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)  # noqa: T201
+        return 2
+    finally:
+        # Seeding and the in-process app may have started the hashing pool.
+        hashing = sys.modules.get("app.utils.hashing")
+        if hashing is not None:
+            hashing.password_hasher.shutdown()
+
+    print(render_report(report["phases"]))  # noqa: T201
+    if report["saturation"]:
+        print(f"saturation: {json.dumps(report['saturation'])}")  # noqa: T201
+    if args.output:
+        with Path(args.output).open("w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
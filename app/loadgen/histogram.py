@@ -0,0 +1,91 @@
+import math
+from typing import Dict, Iterable, List, Tuple
+
+# 2**SUB_BUCKET_BITS sub-buckets per power of two keep every recorded value
+# within 1/128, under 1%, of its true value, like an HDR histogram with two
+# significant digits.
+SUB_BUCKET_BITS = 8
+SUB_BUCKET_HALF = 1 << (SUB_BUCKET_BITS - 1)
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in microseconds.
+
+    Recording is a couple of integer operations and a dict update whatever
+    the value, memory grows with the number of distinct buckets hit rather
+    than with the number of values, and histograms of several phases or
+    runs can be merged without losing precision.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def record(self, seconds: float) -> None:
+        """Record a latency."""
+        value = max(int(seconds * 1_000_000), 0)
+        index = _index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the values of other to this histogram."""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> int:
+        """Microseconds at or below which pct percent of the values fall."""
+        if not self.total:
+            return 0
+        rank = max(math.ceil(pct * self.total / 100), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(_highest_equivalent(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        """Mean in microseconds."""
+        return self.sum / self.total if self.total else 0.0
+
+    def buckets(self) -> List[Tuple[int, int]]:
+        """(highest microseconds, count) of every non-empty bucket."""
+        return [
+            (_highest_equivalent(index), self.counts[index])
+            for index in sorted(self.counts)
+        ]
+
+    @classmethod
+    def from_buckets(cls, buckets: Iterable[Tuple[int, int]]) -> "LatencyHistogram":
+        """Rebuild a histogram from buckets()."""
+        histogram = cls()
+        for value, count in buckets:
+            index = _index(value)
+            histogram.counts[index] = histogram.counts.get(index, 0) + count
+            histogram.total += count
+            histogram.sum += value * count
+            histogram.max = max(histogram.max, value)
+        return histogram
+
+
+def _index(value: int) -> int:
+    shift = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+
+def _highest_equivalent(index: int) -> int:
+    if index < 2 * SUB_BUCKET_HALF:
+        return index
+    shift = index // SUB_BUCKET_HALF - 1
+    sub_bucket = index - (shift << (SUB_BUCKET_BITS - 1))
+    return ((sub_bucket + 1) << shift) - 1
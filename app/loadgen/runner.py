@@ -0,0 +1,309 @@
+import asyncio
+import itertools
+import random
+import time
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import httpx
+
+from app.loadgen.histogram import LatencyHistogram
+from app.loadgen.scenario import (
+    LoadTest,
+    Phase,
+    Scenario,
+    Slo,
+    Step,
+    extract,
+    render,
+)
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+class StepStats:
+    """Latency and errors of one step within a phase."""
+
+    def __init__(self) -> None:
+        """Initialize empty stats."""
+        self.latency = LatencyHistogram()
+        self.errors: Dict[str, int] = {}
+
+    def record(self, seconds: float, error: Optional[str]) -> None:
+        """Record the outcome of a request."""
+        self.latency.record(seconds)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize as a JSON serializable dict."""
+        return {
+            "requests": self.latency.total,
+            "errors": dict(sorted(self.errors.items())),
+            "latency_ms": latency_summary(self.latency),
+            "histogram_us": self.latency.buckets(),
+        }
+
+
+class PhaseStats:
+    """Outcome of every virtual user scheduled during a phase."""
+
+    def __init__(self, phase: Phase) -> None:
+        """Initialize empty stats for phase."""
+        self.phase = phase
+        self.steps: Dict[str, StepStats] = {}
+        self.scheduled = 0
+        self.dropped = 0
+        self.completed = 0
+        self.aborted = 0
+        self.elapsed = 0.0
+
+    def step(self, key: str) -> StepStats:
+        """Stats of the step named key, created on first use."""
+        if key not in self.steps:
+            self.steps[key] = StepStats()
+        return self.steps[key]
+
+    def report(self, slo: Optional[Slo] = None) -> Dict[str, Any]:
+        """Summarize as a JSON serializable dict.
+
+        Arrivals dropped because max_sessions were in flight count as failed
+        requests: the generator could not keep up with the offered load, and
+        hiding them would flatter the server.
+        """
+        latency = LatencyHistogram()
+        failed = self.dropped
+        for stats in self.steps.values():
+            latency.merge(stats.latency)
+            failed += sum(stats.errors.values())
+        attempts = latency.total + self.dropped
+        error_rate = failed / attempts if attempts else 0.0
+        summary = latency_summary(latency)
+
+        slo_met = None
+        if slo is not None:
+            slo_met = (
+                latency.total > 0
+                and summary["p99"] <= slo.p99_ms
+                and error_rate <= slo.max_error_rate
+            )
+        return {
+            "name": self.phase.name,
+            "arrival": self.phase.arrival,
+            "rate": self.phase.rate,
+            "duration": self.phase.duration,
+            "elapsed": round(self.elapsed, 3),
+            "sessions": {
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "aborted": self.aborted,
+                "dropped": self.dropped,
+            },
+            "requests": latency.total,
+            "failed": failed,
+            "error_rate": round(error_rate, 6),
+            "throughput": round(latency.total / self.elapsed, 3) if self.elapsed else 0,
+            "latency_ms": summary,
+            "slo_met": slo_met,
+            "steps": {key: stats.report() for key, stats in self.steps.items()},
+        }
+
+
+class LoadRunner:
+    """Run the scenarios of a load test against an HTTP client.
+
+    Arrivals are open loop: virtual users start on a schedule fixed by the
+    phase rate, whether or not earlier ones have finished. A slow server
+    therefore builds up a backlog instead of quietly lowering the load, and
+    latency is measured from when a request was due to be sent, not from
+    when it was sent. That avoids coordinated omission, where a stall hides
+    the requests it delayed. Each phase waits for its virtual users to
+    finish before the next one starts.
+    """
+
+    def __init__(
+        self,
+        test: LoadTest,
+        client: httpx.AsyncClient,
+        variables: Optional[Mapping[str, Any]] = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """Initialize runner.
+
+        Args:
+            test: Load test to run
+            client: Client sending the requests
+            variables: Initial template variables
+            clock: Monotonic clock, replaceable in tests
+
+        """
+        self.test = test
+        self.client = client
+        self.variables: Dict[str, Any] = dict(variables or {})
+        self.clock = clock
+        # Seeded for reproducible arrival times, not used for anything secret.
+        self.random = random.Random(test.random_seed)  # noqa: S311
+        self._vu = itertools.count(1)
+
+    async def setup(self) -> None:
+        """Run the setup steps once, keeping the variables they save.
+
+        Raises:
+            RuntimeError: If a setup step fails
+
+        """
+        stats = StepStats()
+        for step in self.test.setup:
+            if not await self._send(step, self.variables, self.clock(), stats):
+                raise RuntimeError(f"Setup step {step.name} failed: {stats.errors}")
+
+    async def run(self) -> List[Dict[str, Any]]:
+        """Run every phase and return their reports."""
+        return [
+            (await self.run_phase(phase)).report(self.test.slo)
+            for phase in self.test.phases
+        ]
+
+    async def run_phase(self, phase: Phase) -> PhaseStats:
+        """Start virtual users at the rate of phase and wait for them."""
+        stats = PhaseStats(phase)
+        sessions: set = set()
+        weights = [scenario.weight for scenario in self.test.scenarios]
+        start = self.clock()
+        for offset in self.arrivals(phase):
+            intended = start + offset
+            delay = intended - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            stats.scheduled += 1
+            if len(sessions) >= self.test.max_sessions:
+                stats.dropped += 1
+                continue
+            (scenario,) = self.random.choices(self.test.scenarios, weights)
+            task = asyncio.create_task(
+                self._session(scenario, next(self._vu), intended, stats)
+            )
+            sessions.add(task)
+            task.add_done_callback(sessions.discard)
+        if sessions:
+            await asyncio.gather(*sessions)
+        stats.elapsed = self.clock() - start
+        return stats
+
+    def arrivals(self, phase: Phase) -> Iterator[float]:
+        """Seconds from the start of phase at which virtual users start."""
+        if phase.arrival == "constant":
+            count = int(phase.duration * phase.rate)
+            return (i / phase.rate for i in range(count))
+        return self._poisson(phase)
+
+    def _poisson(self, phase: Phase) -> Iterator[float]:
+        offset = self.random.expovariate(phase.rate)
+        while offset < phase.duration:
+            yield offset
+            offset += self.random.expovariate(phase.rate)
+
+    async def _session(
+        self,
+        scenario: Scenario,
+        number: int,
+        intended: float,
+        stats: PhaseStats,
+    ) -> None:
+        variables = {**self.variables, "vu": number}
+        for step in scenario.steps:
+            step_stats = stats.step(f"{scenario.name}/{step.name}")
+            if not await self._send(step, variables, intended, step_stats):
+                stats.aborted += 1
+                return
+            if step.think_time:
+                await asyncio.sleep(step.think_time)
+            intended = self.clock()
+        stats.completed += 1
+
+    async def _send(
+        self,
+        step: Step,
+        variables: Dict[str, Any],
+        intended: float,
+        stats: StepStats,
+    ) -> bool:
+        """Send the request of step, saving variables, and record its outcome."""
+        error = None
+        try:
+            response = await self.client.request(
+                step.method,
+                render(step.path, variables),
+                headers=render(step.headers, variables),
+                json=render(step.body, variables),
+                timeout=self.test.timeout,
+            )
+        except KeyError as e:
+            error = f"unknown variable {e}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        else:
+            if response.status_code not in step.expect:
+                error = f"status {response.status_code}"
+            elif step.save:
+                try:
+                    document = response.json()
+                    for name, path in step.save.items():
+                        variables[name] = extract(document, path)
+                except ValueError:
+                    error = "invalid json"
+                except KeyError as e:
+                    error = f"missing {e}"
+        stats.record(self.clock() - intended, error)
+        return error is None
+
+
+def latency_summary(histogram: LatencyHistogram) -> Dict[str, float]:
+    """Percentiles, mean and max of histogram in milliseconds."""
+    summary = {
+        f"p{pct:g}": histogram.percentile(pct) / 1000 for pct in PERCENTILES
+    }
+    summary["mean"] = round(histogram.mean / 1000, 3)
+    summary["max"] = histogram.max / 1000
+    return summary
+
+
+def saturation(phases: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Highest arrival rate that stayed within the SLO.
+
+    Returns:
+        The rate and phase that sustained it, and the first phase that broke
+        the SLO, or None if the load test has no SLO
+
+    """
+    judged = [phase for phase in phases if phase["slo_met"] is not None]
+    if not judged:
+        return None
+    met = [phase for phase in judged if phase["slo_met"]]
+    best = max(met, key=lambda phase: phase["rate"], default=None)
+    breach = next((phase for phase in judged if not phase["slo_met"]), None)
+    return {
+        "sustained_rate": best["rate"] if best else None,
+        "sustained_phase": best["name"] if best else None,
+        "first_breach": breach["name"] if breach else None,
+    }
+
+
+def render_report(phases: List[Dict[str, Any]]) -> str:
+    """Format phase reports as a table with their error breakdown."""
+    lines = [
+        f"{'phase':<16}{'rate/s':>9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'p99.9 ms':>10}{'max ms':>9}{'errors':>9}{'dropped':>9}  slo"
+    ]
+    for phase in phases:
+        latency = phase["latency_ms"]
+        slo = {None: "-", True: "ok", False: "FAIL"}[phase["slo_met"]]
+        lines.append(
+            f"{phase['name']:<16}{phase['rate']:>9g}{phase['throughput']:>9.1f}"
+            f"{latency['p50']:>9.1f}{latency['p99']:>9.1f}{latency['p99.9']:>10.1f}"
+            f"{latency['max']:>9.1f}{phase['error_rate']:>9.2%}"
+            f"{phase['sessions']['dropped']:>9}  {slo}"
+        )
+        for key, step in phase["steps"].items():
+            for error, count in step["errors"].items():
+                lines.append(f"  {key}: {error} x{count}")
+    return "\n".join(lines)
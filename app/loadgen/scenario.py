@@ -0,0 +1,156 @@
+from pathlib import Path
+from string import Formatter
+from typing import Any, Dict, List, Literal, Mapping, Optional, TypeVar
+
+import tomllib
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover
+    yaml = None
+
+T = TypeVar("T")
+
+class Step(BaseModel):
+    """One request of a scenario."""
+
+    model_config = ConfigDict(populate_by_name=True, extra="forbid")
+
+    name: str
+    method: str = "GET"
+    path: str
+    headers: Dict[str, str] = Field(default_factory=dict)
+    body: Optional[Any] = Field(None, alias="json", description="JSON request body")
+    expect: List[int] = Field(default_factory=lambda: [200])
+    save: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Variables to set from dotted paths into the response JSON",
+    )
+    think_time: float = Field(0.0, ge=0, description="Seconds to wait afterwards")
+
+
+class Scenario(BaseModel):
+    """Steps a virtual user goes through, in order."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    name: str
+    weight: float = Field(1.0, gt=0)
+    steps: List[Step] = Field(..., min_length=1)
+
+
+class Phase(BaseModel):
+    """A period with a constant arrival rate of virtual users."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    name: str
+    duration: float = Field(..., gt=0, description="Seconds")
+    rate: float = Field(..., gt=0, description="Virtual users started per second")
+    arrival: Literal["constant", "poisson"] = "poisson"
+
+
+class SeedUser(BaseModel):
+    """User created in the database before the run."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    username: str
+    email: str
+    password: str
+    superuser: bool = False
+
+
+class Slo(BaseModel):
+    """Limits a phase must stay within to count as sustainable."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    p99_ms: float = Field(..., gt=0)
+    max_error_rate: float = Field(0.01, ge=0, le=1)
+
+
+class LoadTest(BaseModel):
+    """A load test: what to send, how often and what counts as sustainable."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    target: str = "http://localhost:8000"
+    timeout: float = Field(10.0, gt=0, description="Seconds per request")
+    max_sessions: int = Field(
+        1000,
+        gt=0,
+        description="Virtual users in flight beyond which arrivals are dropped",
+    )
+    random_seed: Optional[int] = None
+    seed: List[SeedUser] = Field(default_factory=list)
+    setup: List[Step] = Field(default_factory=list)
+    scenarios: List[Scenario] = Field(..., min_length=1)
+    phases: List[Phase] = Field(..., min_length=1)
+    slo: Optional[Slo] = None
+
+    @model_validator(mode="after")
+    def unique_names(self) -> "LoadTest":
+        """Validate scenario and phase names are unique."""
+        for kind, names in (
+            ("scenario", [scenario.name for scenario in self.scenarios]),
+            ("phase", [phase.name for phase in self.phases]),
+        ):
+            if len(set(names)) != len(names):
+                raise ValueError(f"Duplicate {kind} names")
+        return self
+
+
+def load(path: str) -> LoadTest:
+    """Load a load test from a TOML or YAML file.
+
+    Raises:
+        ValueError: If the file can not be parsed or is not a valid load test
+
+    """
+    file = Path(path)
+    if file.suffix in (".yaml", ".yml"):
+        if yaml is None:
+            raise ValueError("PyYAML is required for YAML scenario files")
+        data = yaml.safe_load(file.read_text())
+    else:
+        with file.open("rb") as f:
+            data = tomllib.load(f)
+    return LoadTest.model_validate(data)
+
+
+def render(value: T, variables: Mapping[str, Any]) -> T:
+    """Substitute ``{name}`` placeholders in every string of value.
+
+    Raises:
+        KeyError: If a placeholder names an unknown variable
+
+    """
+    if isinstance(value, str):
+        if not any(field for _, field, _, _ in Formatter().parse(value)):
+            return value
+        return value.format_map(variables)
+    if isinstance(value, dict):
+        return {key: render(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [render(item, variables) for item in value]
+    return value
+
+
+def extract(document: object, path: str) -> object:
+    """Value at a dotted path such as ``data.items.0.id``.
+
+    Raises:
+        KeyError: If the path does not exist in document
+
+    """
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            raise KeyError(path)
+    return value
@@ -0,0 +1,42 @@
+from datetime import UTC, datetime
+from typing import List
+
+from app.db.base import Base
+from app.db.session import AsyncSessionLocal, async_engine
+from app.loadgen.scenario import SeedUser
+from app.services.user import UserService
+from app.utils.hashing import password_hasher
+
+
+async def create_schema() -> None:
+    """Create the tables of a fresh database, e.g. a throwaway SQLite file."""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_users(users: List[SeedUser]) -> int:
+    """Create the seed users that do not exist yet in the configured database.
+
+    Returns:
+        Number of users created
+
+    """
+    created = 0
+    async with AsyncSessionLocal() as session:
+        user_service = UserService(session)
+        for user in users:
+            inserted = await user_service.insert(
+                {
+                    "email": user.email,
+                    "username": user.username,
+                    "first_name": "",
+                    "last_name": "",
+                    "is_active": True,
+                    "is_superuser": user.superuser,
+                    "date_joined": datetime.now(UTC),
+                    "password": await password_hasher.hash(user.password),
+                }
+            )
+            created += inserted is not None
+        await session.commit()
+    return created
@@ -1,27 +1,55 @@
 from loguru import logger
 from fastapi import FastAPI
 from app.common.config import settings
-from app.common.logger import setup_logging
+from app.common.logger import setup_logging, shutdown_logging
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from app.middlewares.logging_middleware import LoginMiddleware
+from app.middlewares.compression_middleware import CompressionMiddleware
+from app.middlewares.logging_middleware import AccessLogMiddleware
+from app.middlewares.metrics_middleware import MetricsMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from app.exceptions.exception import BaseError
 from app.exceptions.exception_hanlder import http_exception_handler
-from app.api import router
+from app.api import metrics, router
+from app.api.metrics import metrics_store
+from app.common.redis import close_redis
+from app.db.session import get_db_router
+from app.services.principal_cache import principal_cache
+from app.services.warmup import warmup
+from app.utils.hashing import password_hasher
+from app.utils.responses import ORJSONResponse
+from app.utils.revocation import revoked_tokens
 
 
 @asynccontextmanager
-async def lifespan(_app: FastAPI) -> AsyncGenerator[None, None]:
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Application lifespan events."""
     # Startup
     setup_logging()
     logger.info("Running application startup tasks...")
+    # Heavy objects are created here rather than at import time.
+    db_router = get_db_router()
+    principal_cache.start()
+    revoked_tokens.start()
+    db_router.start()
+    if metrics_store:
+        metrics_store.start(settings.METRICS_SNAPSHOT_INTERVAL)
+    warmup.start(db_router, app)
 
     yield
 
     # Shutdown
     logger.info("Running application shutdown tasks...")
+    await warmup.stop()
+    password_hasher.shutdown()
+    await principal_cache.stop()
+    await revoked_tokens.stop()
+    await db_router.stop()
+    await db_router.dispose()
+    if metrics_store:
+        await metrics_store.stop()
+    await close_redis()
+    shutdown_logging()
 
 def run_application() -> FastAPI: 
     """Create FastAPI application."""
@@ -31,10 +59,26 @@ def run_application() -> FastAPI:
         title=settings.PROJECT_NAME,
         openapi_url=f"{settings.API_V1_STR}/openapi.json",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
 
+    # Add Compression Middleware, innermost so the others see what is sent
+    if settings.COMPRESSION_ENABLED:
+        application.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+            content_types=settings.COMPRESSION_CONTENT_TYPES,
+        )
+
     # Add Logging Middleware
-    application.add_middleware(LoginMiddleware)
+    application.add_middleware(
+        AccessLogMiddleware,
+        headers=settings.ACCESS_LOG_HEADERS,
+        sample_rates=settings.ACCESS_LOG_SAMPLE_RATES,
+        request_id_header=settings.REQUEST_ID_HEADER,
+    )
 
     # Set CORS Middleware
     if settings.ALLOW_ORIGINS:
@@ -46,11 +90,15 @@ def run_application() -> FastAPI:
             allow_headers=["*"],
         )
 
+    # Add Metrics Middleware, outermost so it times everything
+    application.add_middleware(MetricsMiddleware)
+
     # Add exception handler
     application.add_exception_handler(BaseError, http_exception_handler)
 
     # Add routes
     application.include_router(router, prefix=settings.API_V1_STR)
+    application.include_router(metrics.router, tags=["metrics"])
 
     logger.info("Application startup complete...")
     return application
@@ -0,0 +1,283 @@
+import time
+import zlib
+from typing import Iterable, List, Optional, Union
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.common.metrics import Counter, Histogram
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+COMPRESSION_RATIO = Histogram(
+    "http_response_compression_ratio",
+    "Compressed size over uncompressed size of compressed responses.",
+    labelnames=("encoding",),
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0),
+)
+COMPRESSION_CPU_SECONDS = Histogram(
+    "http_response_compression_cpu_seconds",
+    "CPU time spent compressing a response.",
+    labelnames=("encoding",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+COMPRESSION_BYTES = Counter(
+    "http_response_compression_bytes_total",
+    "Bytes of compressed responses before and after compression.",
+    labelnames=("encoding", "stage"),
+)
+
+# Responses that never have a body.
+NO_BODY_STATUSES = {204, 304}
+
+
+class GzipEncoder:
+    """Incremental gzip encoder."""
+
+    name = "gzip"
+
+    def __init__(self, level: int) -> None:
+        """Initialize encoder with a gzip level, 1 to 9."""
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        """Compress data, flushing so the client can decode what was sent."""
+        out = self._compressor.compress(data)
+        if last:
+            return out + self._compressor.flush()
+        return out + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class BrotliEncoder:
+    """Incremental brotli encoder."""
+
+    name = "br"
+
+    def __init__(self, quality: int) -> None:
+        """Initialize encoder with a brotli quality, 0 to 11."""
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, last: bool) -> bytes:
+        """Compress data, flushing so the client can decode what was sent."""
+        out = self._compressor.process(data)
+        if last:
+            return out + self._compressor.finish()
+        return out + self._compressor.flush()
+
+
+Encoder = Union[GzipEncoder, BrotliEncoder]
+
+
+def negotiate(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """Pick a content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. ``gzip, br;q=0.8``
+        available: Codings the server supports, preferred first
+
+    Returns:
+        The coding with the highest q value, the server's preference breaking
+        ties, or None if the client accepts none
+
+    """
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip()] = q
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware compressing responses with brotli or gzip.
+
+    The coding is negotiated from Accept-Encoding, brotli preferred when the
+    brotli package is installed. Only bodies of an allowed content type and
+    of at least minimum_size bytes are compressed. A streaming response is
+    held back only until minimum_size bytes arrived, then each chunk is
+    compressed and flushed as it comes, so NDJSON rows reach the client
+    without waiting for the rest of the body.
+
+    The compression ratio and the CPU time spent on each response are
+    recorded to tune the level.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+        content_types: Iterable[str] = ("application/json", "text/"),
+    ) -> None:
+        """Initialize the CompressionMiddleware.
+
+        Args:
+            app: ASGI application
+            minimum_size: Smallest body in bytes that is compressed
+            gzip_level: gzip level, 1 fastest to 9 smallest
+            brotli_quality: brotli quality, 0 fastest to 11 smallest
+            content_types: Content types compressed, an entry ending in
+                ``/`` matches every subtype
+
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = tuple(content_types)
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle the request and compress its response."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingSender(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compressible(self, headers: MutableHeaders) -> bool:
+        """Whether a response with headers may be compressed."""
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip()
+        return any(
+            content_type.startswith(allowed)
+            if allowed.endswith("/")
+            else content_type == allowed
+            for allowed in self.content_types
+        )
+
+    def encoder(self, encoding: str) -> Encoder:
+        """Create an encoder for encoding."""
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
+
+
+class _CompressingSender:
+    """Send wrapper of one response, see CompressionMiddleware."""
+
+    def __init__(
+        self, middleware: CompressionMiddleware, encoding: str, send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start: Optional[Message] = None
+        self.headers: Optional[MutableHeaders] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.encoder: Optional[Encoder] = None
+        self.passthrough = False
+        self.uncompressed = 0
+        self.compressed = 0
+        self.cpu_seconds = 0.0
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+        if message["type"] == "http.response.start":
+            self.start = message
+            message["headers"] = list(message.get("headers", ()))
+            self.headers = MutableHeaders(raw=message["headers"])
+            if message["status"] in NO_BODY_STATUSES or not (
+                self.middleware.compressible(self.headers)
+            ):
+                self.passthrough = True
+                await self._send(message)
+            else:
+                self.headers.add_vary_header("Accept-Encoding")
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if more_body and self.buffered < self.middleware.minimum_size:
+                return
+            body = b"".join(self.buffer)
+            self.buffer = []
+            if not more_body and self.buffered < self.middleware.minimum_size:
+                # Too small to be worth it, sent as it is.
+                self.passthrough = True
+                await self._send(self.start)
+                await self._send({**message, "body": body})
+                return
+            await self._start_compressing(body, more_body)
+            return
+        if body or not more_body:
+            await self._send_compressed(body, more_body)
+
+    async def _start_compressing(self, body: bytes, more_body: bool) -> None:
+        self.encoder = self.middleware.encoder(self.encoding)
+        headers = self.headers
+        headers["Content-Encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed bytes differ, the strong ETag no longer holds.
+            headers["ETag"] = "W/" + etag
+        if more_body:
+            del headers["Content-Length"]
+            await self._send(self.start)
+            await self._send_compressed(body, more_body)
+            return
+        data = self._compress(body, last=True)
+        headers["Content-Length"] = str(len(data))
+        await self._send(self.start)
+        await self._send({"type": "http.response.body", "body": data})
+        self._record()
+
+    async def _send_compressed(self, body: bytes, more_body: bool) -> None:
+        data = self._compress(body, last=not more_body)
+        await self._send(
+            {"type": "http.response.body", "body": data, "more_body": more_body}
+        )
+        if not more_body:
+            self._record()
+
+    def _compress(self, body: bytes, last: bool) -> bytes:
+        start = time.thread_time()
+        data = self.encoder.compress(body, last)
+        self.cpu_seconds += time.thread_time() - start
+        self.uncompressed += len(body)
+        self.compressed += len(data)
+        return data
+
+    def _record(self) -> None:
+        encoding = self.encoding
+        COMPRESSION_CPU_SECONDS.labels(encoding).observe(self.cpu_seconds)
+        if self.uncompressed:
+            COMPRESSION_RATIO.labels(encoding).observe(
+                self.compressed / self.uncompressed
+            )
+        COMPRESSION_BYTES.labels(encoding, "uncompressed").inc(self.uncompressed)
+        COMPRESSION_BYTES.labels(encoding, "compressed").inc(self.compressed)
@@ -1,57 +1,132 @@
+import os
+import random
 import time
-import uuid
-from typing import Callable
+from typing import Dict, Iterable, List, Optional, Tuple
+
 from loguru import logger
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response
-from starlette.types import ASGIApp
-
-class LoginMiddleware(BaseHTTPMiddleware):
-    """Middleware for logging request and response."""
-
-    def __init__(self, app: ASGIApp) -> None:
-        """Initialize the LoggingMiddleware."""
-        super().__init__(app)
-
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        """Dispatch the request and log details."""
-        request_id = str(uuid.uuid4())
-
-        with logger.contextualize(request_id=request_id):
-            logger.info(
-                "Request",
-                extra={
-                    "method": request.method,
-                    "url": str(request.url),
-                    "headers": dict(request.headers),
-                    "client_host": request.client.host if request.client else None,
-                },
-            )
-
-            start_time = time.time()
-
-            try:
-                response = await call_next(request)
-                process_time = time.time() - start_time
-
-                logger.info(
-                    "Response",
-                    extra={
-                        "status_code": response.status_code,
-                        "processing_time": f"{process_time:.4f}",
-                    },
-                )
-
-                return response
-            
-            except Exception as e:
-                process_time = time.time() - start_time
-                logger.error(
-                    f"Request failed: {str(e)}",
-                    extr={
-                        "processing_time": f"{process_time:.4f}",
-                        "error": str(e),
-                    },
-                )
-                raise
\ No newline at end of file
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.common.logger import request_id_ctx
+from app.db.events import StatementStats, track_statements
+
+MAX_REQUEST_ID_LENGTH = 128
+
+
+class AccessLogMiddleware:
+    """Pure ASGI middleware writing one access log record per request.
+
+    The record is built lazily, so nothing but the timing and the count and
+    duration of the SQL statements the request issued are computed when no
+    sink accepts INFO. A request id is taken from the request header if the
+    upstream proxy sent one, generated otherwise, bound to the log context
+    and echoed in the response headers.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        headers: Iterable[str] = (),
+        sample_rates: Optional[Dict[str, float]] = None,
+        request_id_header: str = "X-Request-ID",
+    ) -> None:
+        """Initialize the AccessLogMiddleware.
+
+        Args:
+            app: ASGI application
+            headers: Names of request headers to include in the log record
+            sample_rates: Fraction of requests to log per path prefix,
+                requests not matching any prefix are always logged
+            request_id_header: Header carrying the request id
+
+        """
+        self.app = app
+        self.headers = {name.lower().encode("latin-1") for name in headers}
+        # Longest prefix first so the most specific rate wins.
+        self.sample_rates: List[Tuple[str, float]] = sorted(
+            (sample_rates or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.request_id_header = request_id_header.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle the request and log details."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        request_id = self._get_request_id(scope)
+        status_code = 500
+        response_header = (self.request_id_header, request_id.encode("latin-1"))
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), response_header]
+            await send(message)
+
+        token = request_id_ctx.set(request_id)
+        try:
+            with logger.contextualize(request_id=request_id), track_statements() as db:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                except Exception as e:
+                    logger.opt(lazy=True).error(
+                        "Request failed: {error}",
+                        error=e.__str__,
+                        **self._fields(scope, status_code, start_time, db),
+                    )
+                    raise
+                if status_code >= 500 or self._sampled(scope):
+                    logger.opt(lazy=True).info(
+                        "{method} {path} {status_code}",
+                        **self._fields(scope, status_code, start_time, db),
+                    )
+        finally:
+            request_id_ctx.reset(token)
+
+    def _get_request_id(self, scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == self.request_id_header:
+                if len(value) <= MAX_REQUEST_ID_LENGTH and value.isascii():
+                    request_id = value.decode("latin-1")
+                    if request_id.isprintable():
+                        return request_id
+                break
+        return os.urandom(16).hex()
+
+    def _sampled(self, scope: Scope) -> bool:
+        if not self.sample_rates:
+            return True
+        path = scope["path"]
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                return random.random() < rate  # noqa: S311
+        return True
+
+    def _fields(
+        self,
+        scope: Scope,
+        status_code: int,
+        start_time: float,
+        db: StatementStats,
+    ) -> dict:
+        # Captured now, formatted by loguru only if a sink wants the record.
+        processing_time = time.perf_counter() - start_time
+        client = scope.get("client")
+        db_statements, db_time = db.count, db.seconds
+        return {
+            "db_statements": lambda: db_statements,
+            "db_time": lambda: f"{db_time:.4f}",
+            "method": lambda: scope["method"],
+            "path": lambda: scope["path"],
+            "query_string": lambda: scope["query_string"].decode("latin-1"),
+            "status_code": lambda: status_code,
+            "processing_time": lambda: f"{processing_time:.4f}",
+            "client_host": lambda: client[0] if client else None,
+            "headers": lambda: {
+                name.decode("latin-1"): value.decode("latin-1")
+                for name, value in scope["headers"]
+                if name in self.headers
+            },
+        }
@@ -0,0 +1,89 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.common.metrics import Counter, Gauge, Histogram
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled.",
+    labelnames=("method",),
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "Requests handled, by route template and status code.",
+    labelnames=("method", "route", "status"),
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last of its response.",
+    labelnames=("method", "route"),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts, latency and concurrency.
+
+    Requests are labelled with the template of the route that handled them,
+    e.g. ``/api/v1/user/{user_id}``, never with the raw path, so the number
+    of series stays bounded whatever URLs clients send.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize the MetricsMiddleware.
+
+        Args:
+            app: ASGI application
+
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle the request and record its metrics."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            template = route_template(scope)
+            REQUEST_SECONDS.labels(method, template).observe(
+                time.perf_counter() - start_time
+            )
+            REQUESTS_TOTAL.labels(method, template, str(status_code)).inc()
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled the request.
+
+    The router stores the matched route in the scope. An included router's
+    route may only know its path relative to the include prefix. The prefix
+    is then the part of the request path before the longest tail that the
+    route's pattern matches.
+    """
+    route = scope.get("route")
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    starts = [i for i, char in enumerate(path) if char == "/"]
+    for start in (*starts, len(path)):
+        if path_regex.match(path[start:]):
+            return path[:start] + route.path
+    return UNMATCHED_ROUTE
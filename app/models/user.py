@@ -1,11 +1,15 @@
 from datetime import UTC, datetime
 from typing import Optional
-from passlib.context import CryptContext
 from sqlalchemy import Boolean, DateTime, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db.base import Base
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.common.metrics import timer
+from app.utils.hashing import (
+    HASH_LATENCY,
+    hash_password,
+    password_hasher,
+    verify_password,
+)
 
 class User(Base):
     """User model."""
@@ -102,7 +106,8 @@ class User(Base):
         Args:
             password: Plain text password
         """
-        self.password = pwd_context.hash(password)
+        with timer(HASH_LATENCY.labels("hash")):
+            self.password = hash_password(password)
 
     def check_password(self, password: str) -> bool:
         """
@@ -114,7 +119,29 @@ class User(Base):
         Returns:
             True if password is correct, False otherwise
         """
-        return pwd_context.verify(password, self.password)
+        with timer(HASH_LATENCY.labels("verify")):
+            return verify_password(password, self.password)
+
+    async def aset_password(self, password: str) -> None:
+        """Set password without blocking the event loop.
+
+        Args:
+            password: Plain text password
+
+        """
+        self.password = await password_hasher.hash(password)
+
+    async def acheck_password(self, password: str) -> bool:
+        """Check is password is correct without blocking the event loop.
+
+        Args:
+            password: Plain text password to check
+
+        Returns:
+            True if password is correct, False otherwise
+
+        """
+        return await password_hasher.verify(password, self.password)
     
     def set_unusable_password(self) -> None:
         """Set a user's password to an unusable value."""
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing_extensions import Annotated
 
@@ -22,6 +23,14 @@ class TokenPayload(BaseModel):
     sub: str
     exp: int
     type: str
+    jti: Optional[str] = None
+
+class LogoutRequest(BaseModel):
+    """Schema for logout request."""
+
+    refresh_token: Optional[str] = Field(
+        None, description="JWT refresh token to revoke along with the access token"
+    )
 
 class RefreshTokenRequest(BaseModel):
     """Schema for refresh token request."""
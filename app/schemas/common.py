@@ -1,5 +1,6 @@
-from typing import Generic, List, TypeVar
-from pydantic import BaseModel
+from typing import Generic, List, Literal, Optional, TypeVar
+
+from pydantic import BaseModel, Field
 
 T = TypeVar("T")
 
@@ -27,4 +28,24 @@ class PaginationResponse(ResponseSchema, Generic[T]):
     total: int
     skip: int
     limit: int
-    has_more: bool
\ No newline at end of file
+    has_more: bool
+
+
+class CursorPaginationParams(BaseModel):
+    """Schema for cursor pagination parameters."""
+
+    cursor: Optional[str] = Field(None, description="Cursor from the previous page")
+    limit: int = Field(50, ge=1, le=100, description="Maximum items per page")
+    total: Literal["none", "estimated", "exact"] = Field(
+        "none", description="Whether and how to count all items"
+    )
+
+
+class CursorPaginationResponse(ResponseSchema, Generic[T]):
+    """Schema for cursor paginated response."""
+
+    items: List[T]
+    next_cursor: Optional[str] = None
+    limit: int
+    has_more: bool
+    total: Optional[int] = None
@@ -1,7 +1,10 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing_extensions import Annotated
+from app.common.config import settings
+from app.schemas.common import ResponseSchema
+from app.utils.responses import ModelSerializer
 
 class UserLoginSchema(BaseModel):
     """Schema for user login."""
@@ -27,17 +30,38 @@ class UserCreate(UserBase):
 
     password: Annotated[str, Field(..., min_length=8, max_length=128)]
 
+class UserImport(BaseModel):
+    """Schema for one row of a bulk user import."""
+
+    email: EmailStr = Field(..., description="User email")
+    username: Annotated[str, Field(..., min_length=3, max_length=150)]
+    password: Annotated[str, Field(..., min_length=8, max_length=128)]
+    first_name: Annotated[str, Field(default="", max_length=150)]
+    last_name: Annotated[str, Field(default="", max_length=150)]
+    is_active: bool = Field(default=True, description="Whether the user is active")
+    is_superuser: bool = Field(
+        default=False, description="Whether the user is a superuser"
+    )
+
 class UserUpdate(BaseModel):
     """Schema for updating a user."""
 
     model_config = ConfigDict(from_attributes=True)
-    emial: Optional[EmailStr] = None
+    email: Optional[EmailStr] = None
     username: Optional[str] = None
     password: Optional[str] = None
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     is_active: Optional[bool] = None
 
+    @field_validator("email", "username", "password", "is_active")
+    @classmethod
+    def not_null(cls, v: Optional[object]) -> object:
+        """Reject an explicit null for columns that can not be null."""
+        if v is None:
+            raise ValueError("Field can not be null")
+        return v
+
 class UserInDBBase(UserBase):
     """Base schema fro user in database."""
 
@@ -50,6 +74,25 @@ class User(UserInDBBase):
 
     pass
 
+# Serializes ORM users to the JSON of the User schema without validating.
+user_serializer = ModelSerializer(User)
+
+class UserBatchRequest(BaseModel):
+    """Schema for looking up users by id."""
+
+    ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.USER_BATCH_MAX_IDS,
+        description="User IDs, duplicates are answered once",
+    )
+
+class UserBatchResponse(ResponseSchema):
+    """Schema for users looked up by id."""
+
+    items: List[User] = Field(..., description="Found users, in request order")
+    missing: List[int] = Field(..., description="IDs no user has")
+
 class UserInDB(UserInDBBase):
     """Schema for user in database with hashed password."""
 
@@ -1,6 +1,9 @@
-from datetime import datetime
+from datetime import UTC, datetime
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.utils.jwt import TokenType, create_token, verify_token
+
+from app.db.routing import mark_written
 from app.exceptions.exception import (
     EmailAlreadyExistError,
     InvalidTokenError,
@@ -11,7 +14,12 @@ from app.exceptions.exception import (
 )
 from app.models.user import User
 from app.schemas.auth import LoginRequest, RegisterRequest, TokenResponse
+from app.services.principal_cache import principal_cache
 from app.services.user import UserService
+from app.utils.hashing import password_hasher
+from app.utils.jwt import TokenType, create_token, verify_token, verify_token_claims
+from app.utils.revocation import revoked_tokens
+
 
 class AuthService:
 
@@ -21,26 +29,27 @@ class AuthService:
 
     async def register(self, register_data: RegisterRequest) -> User:
         email = str(register_data.email)
-
-        if await self.user_service.get_by_email(email):
-            raise EmailAlreadyExistError
-        if await self.user_service.get_by_username(register_data.username):
-            raise UsernameAlreadyExistError
-    
-        user = User(
-            email=email,
-            username = register_data.username,
-            first_name = register_data.first_name,
-            last_name = register_data.last_name,
-            is_active = True,
-            date_joined = datetime.now(),
+        user = await self.user_service.insert(
+            {
+                "email": email,
+                "username": register_data.username,
+                "first_name": register_data.first_name,
+                "last_name": register_data.last_name,
+                "is_active": True,
+                "date_joined": datetime.now(UTC),
+                "password": await password_hasher.hash(register_data.password),
+            }
         )
-        user.set_password(register_data.password)
+        if not user:
+            conflict = await self.user_service.find_conflict(
+                email, register_data.username
+            )
+            await self.db.rollback()
+            if conflict == "email":
+                raise EmailAlreadyExistError
+            raise UsernameAlreadyExistError
 
-        self.db.add(user)
         await self.db.commit()
-        await self.db.refresh(user)
-
         return user
     
     async def login(self, login_data: LoginRequest) -> TokenResponse:
@@ -56,7 +65,9 @@ class AuthService:
             raise UserIsInactiveError
         
         user.last_login = datetime.now()
+        mark_written(self.db, user.id)
         await self.db.commit()
+        await principal_cache.invalidate(user.id)
 
         return TokenResponse(
             access_token = create_token(user.id, TokenType.ACCESS_TOKEN),
@@ -83,5 +94,21 @@ class AuthService:
         except Exception as e:
             raise InvalidTokenError from e
         
-    async def logout(self, _user: User) -> dict:
+    async def logout(
+        self,
+        user: User,
+        access_token: str,
+        refresh_token: Optional[str] = None,
+    ) -> dict:
+        """Revoke the access token and, if given, the user's refresh token."""
+        tokens = [verify_token_claims(access_token)]
+        if refresh_token:
+            # Checked the way refresh_token checks it.
+            claims = verify_token_claims(refresh_token, TokenType.ACCESS_TOKEN)
+            if int(claims.sub) != user.id:
+                raise InvalidTokenError
+            tokens.append(claims)
+        for claims in tokens:
+            if claims.jti is not None and claims.exp is not None:
+                await revoked_tokens.revoke(claims.jti, claims.exp)
         return {"message": "successfully logged out"}
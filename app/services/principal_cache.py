@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import DateTime, inspect
+
+from app.common.config import settings
+from app.common.redis import get_redis, redis_error
+from app.models.user import User
+from app.utils.cache import ExpiringLRUCache
+
+# Columns never copied into the cache.
+EXCLUDED_COLUMNS = {"password"}
+DATETIME_COLUMNS = [
+    column.key
+    for column in inspect(User).column_attrs
+    if isinstance(column.columns[0].type, DateTime)
+]
+
+
+class PrincipalCache:
+    """Cache of authenticated users, keyed by user id.
+
+    Lookups go to an in-process TTL cache first and then, if Redis is
+    configured, to a shared Redis tier. Invalidations remove the entry from
+    both tiers and are published on a Redis channel so every other worker
+    drops its in-process copy too.
+
+    Cached users are detached ``User`` instances built from column values,
+    without the password hash. They are fine for authorization checks and
+    serialization, writes must load the row through ``UserService``.
+    """
+
+    CHANNEL = "principal:invalidate"
+    KEY_PREFIX = "principal:"
+
+    def __init__(
+        self,
+        ttl: int,
+        maxsize: int,
+        redis_getter: Callable[[], Any] = get_redis,
+    ) -> None:
+        """Initialize cache.
+
+        Args:
+            ttl: Seconds an entry is kept in either tier
+            maxsize: Maximum number of entries in the in-process tier
+            redis_getter: Function returning a Redis client or None
+
+        """
+        self.ttl = ttl
+        self._local: ExpiringLRUCache[Dict[str, Any]] = ExpiringLRUCache(
+            "principal", maxsize if ttl > 0 else 0, clock=time.monotonic
+        )
+        self._redis_getter = redis_getter
+        # User id to [loads in flight, invalidations while they ran], so a
+        # load that raced with an invalidation is not written back to the
+        # cache. Only users being loaded have an entry.
+        self._loading: Dict[int, List[int]] = {}
+        self._generation = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def generation(self) -> int:
+        """Number of invalidations this worker has seen.
+
+        A load that may be cached must not share a query started in an
+        earlier generation, which may have read the row before the write
+        that was invalidated.
+        """
+        return self._generation
+
+    async def get(self, user_id: int) -> Optional[User]:
+        """Return cached user or None."""
+        data = self._local.get(user_id)
+        if data is None:
+            data = await self._get_shared(user_id)
+            if data is None:
+                return None
+            self._local.set(user_id, data, time.monotonic() + self.ttl)
+        return User(**data)
+
+    async def get_or_load(
+        self,
+        user_id: int,
+        loader: Callable[[], Awaitable[Optional[User]]],
+    ) -> Optional[User]:
+        """Return cached user, calling loader and caching its result on a miss.
+
+        Args:
+            user_id: User ID
+            loader: Coroutine function loading the user from the database
+
+        Returns:
+            User, or None if loader found nothing
+
+        """
+        user = await self.get(user_id)
+        if user is not None:
+            return user
+
+        load = self._loading.setdefault(user_id, [0, 0])
+        load[0] += 1
+        version = load[1]
+        try:
+            user = await loader()
+        finally:
+            load[0] -= 1
+            if load[0] == 0:
+                del self._loading[user_id]
+        if user is not None and load[1] == version:
+            await self.set(user)
+        return user
+
+    async def set(self, user: User) -> None:
+        """Store user in both tiers."""
+        if self.ttl <= 0:
+            return
+        data = self._snapshot(user)
+        self._local.set(user.id, data, time.monotonic() + self.ttl)
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        try:
+            await redis.set(
+                self.KEY_PREFIX + str(user.id), self._dumps(data), ex=self.ttl
+            )
+        except redis_error() as e:
+            logger.warning(f"Principal cache write failed: {e}")
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop user from both tiers and tell the other workers to drop it."""
+        self._drop_local(user_id)
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        try:
+            await redis.delete(self.KEY_PREFIX + str(user_id))
+            await redis.publish(self.CHANNEL, str(user_id))
+        except redis_error() as e:
+            logger.warning(f"Principal cache invalidation failed: {e}")
+
+    def start(self) -> None:
+        """Start listening for invalidations from other workers."""
+        if self._listener is None and self._redis_getter() is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _drop_local(self, user_id: int) -> None:
+        self._generation += 1
+        load = self._loading.get(user_id)
+        if load is not None:
+            load[1] += 1
+        self._local.pop(user_id)
+
+    async def _get_shared(self, user_id: int) -> Optional[Dict[str, Any]]:
+        redis = self._redis_getter()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self.KEY_PREFIX + str(user_id))
+        except redis_error() as e:
+            logger.warning(f"Principal cache read failed: {e}")
+            return None
+        return self._loads(raw) if raw is not None else None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._redis_getter().pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._drop_local(int(message["data"]))
+            except redis_error() as e:
+                logger.warning(f"Principal cache listener failed: {e}")
+                # Entries may have been invalidated while disconnected.
+                self._generation += 1
+                self._local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    @staticmethod
+    def _snapshot(user: User) -> Dict[str, Any]:
+        return {
+            column.key: getattr(user, column.key)
+            for column in inspect(User).column_attrs
+            if column.key not in EXCLUDED_COLUMNS
+        }
+
+    @staticmethod
+    def _dumps(data: Dict[str, Any]) -> str:
+        return json.dumps(
+            {
+                key: value.isoformat() if isinstance(value, datetime) else value
+                for key, value in data.items()
+            }
+        )
+
+    @staticmethod
+    def _loads(raw: bytes) -> Dict[str, Any]:
+        data = json.loads(raw)
+        for key in DATETIME_COLUMNS:
+            if data.get(key) is not None:
+                data[key] = datetime.fromisoformat(data[key])
+        return data
+
+
+principal_cache = PrincipalCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+)
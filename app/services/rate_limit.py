@@ -0,0 +1,106 @@
+import math
+from typing import Dict, List, Optional, Tuple, Union
+
+from app.common.config import settings
+from app.common.metrics import Counter
+from app.exceptions.exception import RateLimitExceededError
+from app.utils.rate_limit import (
+    MemoryRateLimiter,
+    Rate,
+    RedisRateLimiter,
+    parse_rate,
+)
+
+RATE_LIMIT_REQUESTS = Counter(
+    "rate_limit_requests_total",
+    "Requests checked by the credential rate limiter.",
+    labelnames=("endpoint", "result"),
+)
+
+GLOBAL_KEY = "credentials"
+
+
+class CredentialRateLimit:
+    """Rate limits of the endpoints that hash a password.
+
+    Every request takes a token from the bucket of its client IP, of the
+    email it targets and from one bucket shared by all clients. The check
+    runs as a route dependency, before the request touches the database or
+    the hashing pool, so a burst of rejected requests costs next to nothing.
+    """
+
+    def __init__(
+        self,
+        limiter: Union[MemoryRateLimiter, RedisRateLimiter],
+        per_ip: Dict[str, str],
+        per_email: Dict[str, str],
+        global_rate: str = "",
+        enabled: bool = True,
+    ) -> None:
+        """Initialize rate limit.
+
+        Args:
+            limiter: Limiter holding the token buckets
+            per_ip: Rate per client IP, by endpoint
+            per_email: Rate per target email, by endpoint
+            global_rate: Rate of all requests together, empty for no limit
+            enabled: Whether to limit at all
+
+        Raises:
+            ValueError: If a rate can not be parsed
+
+        """
+        self.limiter = limiter
+        self.enabled = enabled
+        self.per_ip = {name: parse_rate(rate) for name, rate in per_ip.items()}
+        self.per_email = {name: parse_rate(rate) for name, rate in per_email.items()}
+        self.global_rate = parse_rate(global_rate)
+
+    async def check(
+        self,
+        endpoint: str,
+        client_ip: Optional[str],
+        email: str,
+    ) -> None:
+        """Take a token for a request to endpoint.
+
+        Raises:
+            RateLimitExceededError: If a bucket is empty, with Retry-After
+
+        """
+        if not self.enabled:
+            return
+        limits: List[Tuple[str, Rate]] = []
+        ip_rate = self.per_ip.get(endpoint)
+        if ip_rate is not None and client_ip:
+            limits.append((f"{endpoint}:ip:{client_ip}", ip_rate))
+        email_rate = self.per_email.get(endpoint)
+        if email_rate is not None:
+            limits.append((f"{endpoint}:email:{email.lower()}", email_rate))
+        if self.global_rate is not None:
+            limits.append((GLOBAL_KEY, self.global_rate))
+        if not limits:
+            return
+
+        wait = await self.limiter.acquire(limits)
+        if wait:
+            RATE_LIMIT_REQUESTS.labels(endpoint, "denied").inc()
+            raise RateLimitExceededError(
+                headers={"Retry-After": str(max(math.ceil(wait), 1))}
+            )
+        RATE_LIMIT_REQUESTS.labels(endpoint, "allowed").inc()
+
+    def reset(self) -> None:
+        """Forget the in-process buckets."""
+        self.limiter.reset()
+
+
+credential_rate_limit = CredentialRateLimit(
+    RedisRateLimiter()
+    if settings.RATE_LIMIT_BACKEND == "redis"
+    else MemoryRateLimiter(),
+    per_ip=settings.RATE_LIMIT_PER_IP,
+    per_email=settings.RATE_LIMIT_PER_EMAIL,
+    global_rate=settings.RATE_LIMIT_GLOBAL,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
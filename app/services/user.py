@@ -1,6 +1,23 @@
-from typing import Optional, Tuple
-from sqlalchemy import func, select
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    ColumnElement,
+    Insert,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+from app.db.routing import mark_written, read_session, shared_read_target
 from app.exceptions.exception import (
     UsernameOrEmailAllreadyExistError,
     UsernameOrPasswordIsIncorrectError,
@@ -8,6 +25,21 @@ from app.exceptions.exception import (
 )
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
+from app.services.principal_cache import principal_cache
+from app.utils.hashing import password_hasher
+from app.utils.loader import BatchLoader
+from app.utils.singleflight import SingleFlight
+
+# Key of the session's user loader in Session.info.
+LOADER_KEY = "user_loader"
+
+# Queries for users in flight, shared by concurrent requests. Keys are
+# (router, whether read from the primary, principal cache generation, column,
+# value). The generation keeps a read started before an invalidation from
+# being shared with, and cached by, a caller that started after it.
+user_flights: SingleFlight[Tuple[Any, bool, int, str, Any], User] = SingleFlight(
+    "user"
+)
 
 class UserService:
     """Service for user operations."""
@@ -15,66 +47,165 @@ class UserService:
     def __init__(self, db: AsyncSession) -> None:
         self.db = db
 
+    @property
+    def loader(self) -> BatchLoader[int, User]:
+        """Loader of users by id shared by every UserService of the session.
+
+        A session lives for one request, so repeated and concurrent
+        get_by_id calls of a request cost a single query.
+        """
+        loader = self.db.info.get(LOADER_KEY)
+        if loader is None:
+            loader = self.db.info[LOADER_KEY] = BatchLoader(self.get_many)
+        return loader
+
     async def get_by_id(self, user_id: int) -> Optional[User]:
-        result = await self.db.execute(select(User).filter(User.id == user_id))
-        return result.scalar_one_or_none()
+        return await self.loader.load(user_id)
+
+    async def get_many(self, user_ids: Sequence[int]) -> Dict[int, User]:
+        """Load users by id in one query, keyed by id, missing ids left out."""
+        return await self._load_many(User.id, user_ids)
     
     async def get_by_email(self, email: str) -> Optional[User]:
-        result = await self.db.execute(select(User).filter(User.email == email))
-        return result.scalar_one_or_none()
+        return (await self._load_many(User.email, [email])).get(email)
     
     async def get_by_username(self, username: str) -> Optional[User]:
-        result = await self.db.execute(select(User).filter(User.username == username))
-        return result.scalar_one_or_none()
+        return (await self._load_many(User.username, [username])).get(username)
     
     async def create(self, user_in: UserCreate) -> User:
-        if await self.get_by_email(str(user_in.email)):
-            raise UsernameOrEmailAllreadyExistError
-        if await self.get_by_username(str(user_in.username)):
-            raise UsernameOrEmailAllreadyExistError
-        
-        user = User(**user_in.model_dump(exclude={"password"}))
-        user.set_password(user_in.password)
+        values = user_in.model_dump(exclude={"password"})
+        values["email"] = str(user_in.email)
+        values["password"] = await password_hasher.hash(user_in.password)
 
-        self.db.add(user)
+        user = await self.insert(values)
+        if not user:
+            raise UsernameOrEmailAllreadyExistError
         await self.db.commit()
-        await self.db.refresh(user)
         return user
-    
-    async def update(self, user_id: int, user_in: UserUpdate) -> User:
-        user = await self.get_by_id(user_id)
-        if not User:
-            raise UserNotFoundError
 
+    async def insert(self, values: Dict[str, Any]) -> Optional[User]:
+        """Insert a user in a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+
+        Server and column defaults come back through RETURNING, so there is
+        no follow-up SELECT. Returns None if the email or username is taken,
+        see find_conflict. On a dialect without ON CONFLICT, find_conflict
+        is checked before a plain INSERT. The caller commits.
+        """
+        stmt = self._insert_ignoring_conflicts()
+        if stmt is None:
+            if await self.find_conflict(values["email"], values["username"]):
+                return None
+            stmt = insert(User)
+        return await self.db.scalar(stmt.values(**values).returning(User))
+
+    async def find_conflict(self, email: str, username: str) -> Optional[str]:
+        """Return "email" or "username", whichever is already taken."""
+        result = await self.db.execute(
+            select(User.email).filter(
+                or_(User.email == email, User.username == username)
+            )
+        )
+        emails = result.scalars().all()
+        if email in emails:
+            return "email"
+        return "username" if emails else None
+
+    async def bulk_create(
+            self,
+            rows: List[Dict[str, Any]],
+    ) -> List[Tuple[int, str]]:
+        """Insert users with multi-row statements, skipping existing ones.
+
+        Rows whose email or username already exists are left out by
+        ON CONFLICT DO NOTHING, or by a query for the taken ones first on a
+        dialect without it. The rows are sent as multi-row VALUES batches
+        sized to the driver's parameter limit. Returns (id, email) of the
+        inserted rows.
+        """
+        stmt = self._insert_ignoring_conflicts()
+        if stmt is None:
+            rows = await self._without_conflicts(rows)
+            stmt = insert(User)
+        if not rows:
+            return []
+        result = await self.db.execute(stmt.returning(User.id, User.email), rows)
+        return [(row.id, row.email) for row in result]
+
+    async def _without_conflicts(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Rows whose email and username are both free."""
+        if not rows:
+            return []
+        emails = [row["email"] for row in rows]
+        usernames = [row["username"] for row in rows]
+        result = await self.db.execute(
+            select(User.email, User.username).filter(
+                or_(User.email.in_(emails), User.username.in_(usernames))
+            )
+        )
+        taken_emails, taken_usernames = set(), set()
+        for email, username in result:
+            taken_emails.add(email)
+            taken_usernames.add(username)
+        return [
+            row
+            for row in rows
+            if row["email"] not in taken_emails
+            and row["username"] not in taken_usernames
+        ]
+
+    async def update(self, user_id: int, user_in: UserUpdate) -> User:
         update_data = user_in.model_dump(exclude_unset=True)
+        if not update_data:
+            user = await self.get_by_id(user_id)
+            if not user:
+                raise UserNotFoundError
+            return user
 
         if "password" in update_data:
-            user.set_password(update_data.pop("password"))
-
-        if "email" in update_data and update_data["email"] != user.email:
-            if await self.get_by_email(update_data["email"]):
-                raise UsernameOrEmailAllreadyExistError
-        if "username" in update_data and update_data["usernane"] != user.username:
-            if await self.get_by_username(update_data["username"]):
-                raise UsernameOrEmailAllreadyExistError
-            
-        for field, value in update_data.items():
-            setattr(user, field, value)
+            update_data["password"] = await password_hasher.hash(
+                update_data["password"]
+            )
+        if update_data.get("email") is not None:
+            update_data["email"] = str(update_data["email"])
 
+        # Uniqueness is left to the unique indexes, a single UPDATE ...
+        # RETURNING replaces the SELECT, uniqueness checks and refresh.
+        stmt = (
+            update(User)
+            .filter(User.id == user_id)
+            .values(**update_data)
+            .returning(User)
+            .execution_options(populate_existing=True)
+        )
+        try:
+            user = await self.db.scalar(stmt)
+        except IntegrityError as e:
+            await self.db.rollback()
+            raise UsernameOrEmailAllreadyExistError from e
+        if not user:
+            raise UserNotFoundError
+
+        self.loader.prime(user_id, user)
+        mark_written(self.db, user_id)
         await self.db.commit()
-        await self.db.refresh(user)
+        await principal_cache.invalidate(user_id)
         return user
-    
+
     async def delete(self, user_id: int) -> None:
-        user = await self.get_by_id(user_id)
-        if not user:
+        result = await self.db.execute(
+            delete(User).filter(User.id == user_id).returning(User.id)
+        )
+        if result.scalar_one_or_none() is None:
             raise UserNotFoundError
-        await self.db.delete(user)
+        self.loader.clear(user_id)
         await self.db.commit()
+        await principal_cache.invalidate(user_id)
 
     async def authenticate(self, email: str, password: str) -> Optional[User]:
         user = await self.get_by_email(email=email)
-        if not user or not user.check_password(password=password):
+        if not user or not await user.acheck_password(password=password):
             raise UsernameOrPasswordIsIncorrectError
         return user
     
@@ -89,3 +220,131 @@ class UserService:
         total = await self.db.execute(select(func.count(User.id)))
         total_count = total.scalar()
         return list(users), total_count
+
+    async def get_page(
+            self,
+            after_id: Optional[int] = None,
+            limit: int = 50,
+    ) -> Tuple[List[User], bool]:
+        """Return users ordered by id after after_id, and whether more follow."""
+        query = select(User).order_by(User.id).limit(limit + 1)
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        result = await self.db.execute(query)
+        users = list(result.scalars().all())
+        return users[:limit], len(users) > limit
+
+    async def stream_columns(
+            self,
+            columns: Sequence[str],
+            batch_size: int = 1000,
+    ) -> AsyncIterator[List[Tuple[Any, ...]]]:
+        """Yield batches of rows of the given columns, via a server-side cursor."""
+        query = (
+            select(*(User.__table__.c[name] for name in columns))
+            .order_by(User.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream(query)
+        async for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+    async def count(self, estimated: bool = False) -> int:
+        """Count users, from planner statistics if estimated on PostgreSQL."""
+        if estimated and self.db.get_bind().dialect.name == "postgresql":
+            result = await self.db.execute(
+                text(
+                    "SELECT reltuples::bigint FROM pg_class "
+                    "WHERE oid = to_regclass(:table)"
+                ),
+                {"table": User.__tablename__},
+            )
+            estimate = result.scalar()
+            # reltuples is -1 until the table is first vacuumed or analyzed.
+            if estimate is not None and estimate >= 0:
+                return estimate
+        total = await self.db.execute(select(func.count(User.id)))
+        return total.scalar()
+
+    async def _load_many(
+            self,
+            column: InstrumentedAttribute,
+            values: Sequence[Any],
+    ) -> Dict[Any, User]:
+        """Load users whose column is one of values, keyed by it.
+
+        Concurrent requests reading the same users share the query, see
+        SingleFlight. It runs in a session of its own, reading where this
+        session would, and the users are merged into this session. A
+        session that wrote reads its own transaction instead.
+        """
+        if not values:
+            return {}
+        target = shared_read_target(self.db)
+        if target is None:
+            return await self.select_in(column, values)
+
+        router, primary = target
+        generation = principal_cache.generation
+
+        async def fetch(
+            keys: List[Tuple[Any, bool, int, str, Any]],
+        ) -> Dict[Any, User]:
+            async with read_session(router, primary) as session:
+                found = await UserService(session).select_in(
+                    column, [key[4] for key in keys]
+                )
+            return {
+                (router, primary, generation, column.key, value): user
+                for value, user in found.items()
+            }
+
+        shared = await user_flights.do_many(
+            [(router, primary, generation, column.key, value) for value in values],
+            fetch,
+        )
+        users = {}
+        for (*_, value), user in shared.items():
+            if user is not None:
+                users[value] = await self.db.merge(user, load=False)
+        return users
+
+    async def select_in(
+            self,
+            column: InstrumentedAttribute,
+            values: Sequence[Any],
+    ) -> Dict[Any, User]:
+        """Select the users whose column is one of values, keyed by it.
+
+        The query runs in this session, not shared with concurrent requests
+        like the get_* lookups.
+        """
+        result = await self.db.execute(select(User).filter(self._in(column, values)))
+        return {getattr(user, column.key): user for user in result.scalars()}
+
+    def _in(
+            self,
+            column: InstrumentedAttribute,
+            values: Sequence[Any],
+    ) -> ColumnElement[bool]:
+        """Build the condition that column is one of values."""
+        if self.db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import ARRAY
+
+            # One array parameter, so one prepared statement for any count.
+            array = bindparam("values", list(values), type_=ARRAY(column.type))
+            return column == any_(array)
+        return column.in_(values)
+
+    def _insert_ignoring_conflicts(self) -> Optional[Insert]:
+        """INSERT ... ON CONFLICT DO NOTHING, None if the dialect has none."""
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects import postgresql
+
+            return postgresql.insert(User).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            from sqlalchemy.dialects import sqlite
+
+            return sqlite.insert(User).on_conflict_do_nothing()
+        return None
@@ -0,0 +1,293 @@
+import csv
+import json
+from collections import deque
+from datetime import UTC, datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.common.config import settings
+from app.db.session import AsyncSessionLocal
+from app.exceptions.exception import ServiceUnavailableError
+from app.schemas.user import UserImport
+from app.services.user import UserService
+from app.utils.hashing import password_hasher
+
+CSV = "csv"
+NDJSON = "ndjson"
+
+Record = Tuple[int, Union[Dict[str, Any], str]]
+
+
+class UserImportService:
+    """Import users from an NDJSON or CSV request body.
+
+    The body is parsed record by record as it arrives and valid rows are
+    collected into batches. Each batch has its passwords hashed across the
+    hashing pool and is inserted with one multi-row INSERT ... ON CONFLICT DO
+    NOTHING, so existing users are reported as duplicates without aborting
+    the import. One NDJSON result line is produced per input row, and memory
+    stays bounded by the batch size whatever the size of the body.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+        batch_size: int = settings.USER_IMPORT_BATCH_SIZE,
+        max_line_bytes: int = settings.USER_IMPORT_MAX_LINE_BYTES,
+    ) -> None:
+        """Initialize service.
+
+        Args:
+            session_factory: Factory for the session the import runs in
+            batch_size: Rows hashed and inserted together
+            max_line_bytes: Longest accepted input line
+
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_line_bytes = max_line_bytes
+
+    async def run(self, chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[bytes]:
+        """Import users and yield the result of each row.
+
+        Args:
+            chunks: Request body chunks
+            fmt: CSV or NDJSON
+
+        Yields:
+            NDJSON result lines
+
+        """
+        async with self.session_factory() as session:
+            user_service = UserService(session)
+            batch: List[Tuple[int, UserImport]] = []
+            try:
+                async for line_number, record in self._records(chunks, fmt):
+                    if isinstance(record, str):
+                        yield self._result(line_number, "invalid", errors=[record])
+                        continue
+                    try:
+                        batch.append((line_number, UserImport.model_validate(record)))
+                    except ValidationError as e:
+                        errors = [
+                            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+                            for error in e.errors()
+                        ]
+                        yield self._result(line_number, "invalid", errors=errors)
+                        continue
+                    if len(batch) >= self.batch_size:
+                        for result in await self._import_batch(user_service, batch):
+                            yield result
+                        batch = []
+            except ValueError as e:
+                yield self._result(None, "error", errors=[str(e)])
+            for result in await self._import_batch(user_service, batch):
+                yield result
+
+    async def _import_batch(
+        self,
+        user_service: UserService,
+        batch: List[Tuple[int, UserImport]],
+    ) -> List[bytes]:
+        if not batch:
+            return []
+        results: Dict[int, bytes] = {}
+        emails, usernames = set(), set()
+        unique = []
+        for line_number, user in batch:
+            email = str(user.email)
+            if email in emails or user.username in usernames:
+                results[line_number] = self._result(line_number, "duplicate")
+                continue
+            emails.add(email)
+            usernames.add(user.username)
+            unique.append((line_number, user))
+
+        try:
+            hashes = await password_hasher.hash_many([u.password for _, u in unique])
+        except ServiceUnavailableError as e:
+            for line_number, _ in unique:
+                results[line_number] = self._result(
+                    line_number, "error", errors=[e.message]
+                )
+            return [results[line_number] for line_number, _ in batch]
+
+        now = datetime.now(UTC)
+        rows = [
+            {
+                **user.model_dump(exclude={"email", "password"}),
+                "email": str(user.email),
+                "password": hashed,
+                "is_staff": False,
+                "date_joined": now,
+                "create_at": now,
+                "updated_at": now,
+            }
+            for (_, user), hashed in zip(unique, hashes)
+        ]
+        inserted = {
+            email: user_id for user_id, email in await user_service.bulk_create(rows)
+        }
+        await user_service.db.commit()
+
+        for line_number, user in unique:
+            user_id = inserted.get(str(user.email))
+            if user_id is None:
+                results[line_number] = self._result(line_number, "duplicate")
+            else:
+                results[line_number] = self._result(line_number, "created", id=user_id)
+        return [results[line_number] for line_number, _ in batch]
+
+    async def _records(
+        self,
+        chunks: AsyncIterator[bytes],
+        fmt: str,
+    ) -> AsyncIterator[Record]:
+        """Yield (line number, row dict or error message) for each data row."""
+        lines = self._text_lines(chunks)
+        if fmt == NDJSON:
+            records = self._ndjson_records(lines)
+        else:
+            records = self._csv_records(lines)
+        async for record in records:
+            yield record
+
+    async def _ndjson_records(
+        self, lines: AsyncIterator[Tuple[int, Optional[str]]]
+    ) -> AsyncIterator[Record]:
+        async for line_number, text in lines:
+            if text is None:
+                yield line_number, "Line is not valid UTF-8"
+                continue
+            text = text.strip()
+            if not text:
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError:
+                yield line_number, "Line is not valid JSON"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, "Line is not a JSON object"
+                continue
+            yield line_number, record
+
+    async def _csv_records(
+        self, lines: AsyncIterator[Tuple[int, Optional[str]]]
+    ) -> AsyncIterator[Record]:
+        header = None
+        # A quoted field may hold line breaks, so a record can span lines.
+        # Its lines are held back until no quoted field is left open, then
+        # the one reader parses the whole record from them.
+        pending: Deque[str] = deque()
+        reader = csv.reader(iter(pending.popleft, None))
+        start = size = 0
+        quoted = False
+        async for line_number, text in lines:
+            if text is None:
+                yield start or line_number, "Line is not valid UTF-8"
+                pending.clear()
+                start, quoted = 0, False
+                continue
+            if not pending:
+                if not text.strip():
+                    continue
+                start, size = line_number, 0
+            pending.append(text + "\n")
+            size += len(text)
+            quoted = self._ends_quoted(text, quoted)
+            if quoted:
+                if size > self.max_line_bytes:
+                    raise ValueError(
+                        f"Record at line {start} is longer than "
+                        f"{self.max_line_bytes} bytes"
+                    )
+                continue
+            values = next(reader)
+            line_number, start = start, 0
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            if len(values) != len(header):
+                yield line_number, f"Expected {len(header)} columns"
+                continue
+            # Empty cells fall back to the schema defaults.
+            yield line_number, {
+                name: value for name, value in zip(header, values) if value != ""
+            }
+        if pending:
+            yield start, "Quoted field is not closed"
+
+    async def _text_lines(
+        self, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[Tuple[int, Optional[str]]]:
+        """Yield (line number, line text or None if it is not UTF-8)."""
+        async for line_number, line in self._lines(chunks):
+            try:
+                yield line_number, line.decode("utf-8")
+            except UnicodeDecodeError:
+                yield line_number, None
+
+    async def _lines(
+        self, chunks: AsyncIterator[bytes]
+    ) -> AsyncIterator[Tuple[int, bytes]]:
+        buffer = b""
+        line_number = 0
+        async for chunk in chunks:
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                line_number += 1
+                yield line_number, line
+            if len(buffer) > self.max_line_bytes:
+                raise ValueError(
+                    f"Line {line_number + 1} is longer than {self.max_line_bytes} bytes"
+                )
+        if buffer:
+            yield line_number + 1, buffer
+
+    @staticmethod
+    def _ends_quoted(text: str, quoted: bool) -> bool:
+        """Whether a line leaves a quoted field open, as csv.reader reads it.
+
+        Only a quote at the start of a field opens a quoted field, quotes
+        inside unquoted fields are data. In a quoted field a doubled quote
+        is data and a single one closes it.
+
+        Args:
+            text: Line without its line break
+            quoted: Whether the line starts inside a quoted field
+
+        """
+        state = "quoted" if quoted else "start"
+        for char in text:
+            if state == "quoted":
+                if char == '"':
+                    state = "closing"
+            elif state == "closing":
+                # A doubled quote, or text after the closing quote.
+                if char == '"':
+                    state = "quoted"
+                else:
+                    state = "start" if char == "," else "unquoted"
+            elif char == ",":
+                state = "start"
+            elif state == "start":
+                state = "quoted" if char == '"' else "unquoted"
+        return state == "quoted"
+
+    @staticmethod
+    def _result(line: Optional[int], status: str, **fields: object) -> bytes:
+        return (json.dumps({"line": line, "status": status, **fields}) + "\n").encode()
@@ -0,0 +1,171 @@
+import asyncio
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.pool import QueuePool
+
+from app.common.config import settings
+from app.common.metrics import Gauge
+from app.db.routing import ReplicaRouter
+from app.exceptions.exception import UserNotFoundError
+from app.schemas.user import UserUpdate
+from app.services.user import UserService
+from app.utils.hashing import password_hasher
+from app.utils.jwt import create_token, verify_token
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+APP_READY = Gauge(
+    "app_ready",
+    "Whether the worker finished warming up and accepts traffic, 1 or 0.",
+    multiprocess_mode="min",
+)
+
+# Warm-up runs the statements with ids and names no user has.
+MISSING_ID = 0
+MISSING_NAME = ""
+
+
+class WarmUp:
+    """Pay the first-request costs before the worker reports ready.
+
+    Opens connections to every engine so the pools start full, runs the
+    UserService statements on each connection so SQLAlchemy has them
+    compiled and asyncpg has prepared them, hashes and verifies a password
+    to start the hashing pool, signs and verifies a JWT and builds the
+    OpenAPI schema.
+
+    Warm-up is an optimization, not a health check: a failed or timed out
+    step is logged and the worker still becomes ready.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = settings.WARMUP_ENABLED,
+        connections: int = settings.WARMUP_CONNECTIONS,
+        timeout: float = settings.WARMUP_TIMEOUT_SECONDS,
+    ) -> None:
+        """Initialize warm-up.
+
+        Args:
+            enabled: Whether to warm up, if not the worker is ready at once
+            connections: Connections opened per engine, capped at the pool
+                size, 0 opens none
+            timeout: Seconds the whole warm-up may take
+
+        """
+        self.enabled = enabled
+        self.connections = connections
+        self.timeout = timeout
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+        APP_READY.set(0)
+
+    def start(self, router: ReplicaRouter, app: Optional["FastAPI"] = None) -> None:
+        """Warm up in the background, the worker is ready once it is done."""
+        if not self.enabled:
+            self._set_ready(True)
+        elif self._task is None:
+            self._task = asyncio.create_task(self.run(router, app))
+
+    async def stop(self) -> None:
+        """Report not ready and cancel a warm-up that is still running."""
+        self._set_ready(False)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self, router: ReplicaRouter, app: Optional["FastAPI"] = None) -> None:
+        """Run every warm-up step, then report ready."""
+        start = time.perf_counter()
+        engines = [router.primary, *(replica.engine for replica in router.replicas)]
+        steps: List[Callable[[], Awaitable[None]]] = [
+            *(partial(self.warm_engine, engine) for engine in engines),
+            self.warm_hashing,
+            self.warm_jwt,
+        ]
+        if app is not None:
+            steps.append(partial(self.warm_openapi, app))
+        try:
+            await asyncio.wait_for(self._run_steps(steps), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up did not finish within {self.timeout}s")
+        self._set_ready(True)
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.3f}s")
+
+    async def warm_engine(self, engine: AsyncEngine) -> None:
+        """Open connections to engine and run the user statements on each."""
+        pool = engine.sync_engine.pool
+        # Connections beyond the pool size are closed when released and
+        # NullPool keeps none, there one connection still primes the caches.
+        limit = pool.size() if isinstance(pool, QueuePool) else 1
+        count = min(self.connections, limit)
+        if count <= 0:
+            return
+        connections = [engine.connect() for _ in range(count)]
+        try:
+            await asyncio.gather(*(conn.start() for conn in connections))
+            await asyncio.gather(*(self._prime(conn) for conn in connections))
+        finally:
+            await asyncio.gather(*(conn.close() for conn in connections))
+
+    @staticmethod
+    async def warm_hashing() -> None:
+        """Start a hashing worker and load bcrypt in it."""
+        hashed = await password_hasher.hash("warm-up-password")
+        await password_hasher.verify("warm-up-password", hashed)
+
+    @staticmethod
+    async def warm_jwt() -> None:
+        """Import the JWT library and sign and verify a token."""
+        verify_token(create_token(MISSING_ID))
+
+    @staticmethod
+    async def warm_openapi(app: "FastAPI") -> None:
+        """Build and cache the OpenAPI schema."""
+        app.openapi()
+
+    @staticmethod
+    async def _prime(conn: AsyncConnection) -> None:
+        """Run the UserService statements in a transaction rolled back after."""
+        async with AsyncSession(bind=conn) as session:
+            user_service = UserService(session)
+            await user_service.get_by_id(MISSING_ID)
+            await user_service.get_by_email(MISSING_NAME)
+            await user_service.get_by_username(MISSING_NAME)
+            await user_service.find_conflict(MISSING_NAME, MISSING_NAME)
+            await user_service.get_page(limit=1)
+            await user_service.count()
+            for write in (
+                lambda: user_service.update(
+                    MISSING_ID, UserUpdate(first_name=MISSING_NAME)
+                ),
+                lambda: user_service.delete(MISSING_ID),
+            ):
+                try:
+                    await write()
+                except UserNotFoundError:
+                    pass
+            await session.rollback()
+
+    async def _run_steps(self, steps: List[Callable[[], Awaitable[None]]]) -> None:
+        for step in steps:
+            try:
+                await step()
+            except Exception as e:
+                logger.warning(f"Warm-up step failed: {e!r}")
+
+    def _set_ready(self, ready: bool) -> None:
+        self.ready = ready
+        APP_READY.set(int(ready))
+
+
+warmup = WarmUp()
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+from app.common.metrics import Counter
+
+V = TypeVar("V")
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "In-process cache lookups.",
+    labelnames=("cache", "result"),
+)
+CACHE_EVICTIONS = Counter(
+    "cache_evictions_total",
+    "Entries removed from an in-process cache before being read again.",
+    labelnames=("cache", "reason"),
+)
+
+
+class ExpiringLRUCache(Generic[V]):
+    """Bounded LRU mapping whose entries carry their own expiry time.
+
+    An expired entry is never returned, it is dropped on the lookup that
+    finds it. When the cache is full the least recently used entry is evicted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: int,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize cache.
+
+        Args:
+            name: Cache name used as the metrics label
+            maxsize: Maximum number of entries, 0 disables the cache
+            clock: Function returning the current time, in the unit of expiry
+
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.clock = clock
+        self._data: OrderedDict[Hashable, Tuple[V, float]] = OrderedDict()
+        self._hits = CACHE_REQUESTS.labels(name, "hit")
+        self._misses = CACHE_REQUESTS.labels(name, "miss")
+        self._expired = CACHE_EVICTIONS.labels(name, "expired")
+        self._evicted = CACHE_EVICTIONS.labels(name, "size")
+
+    def __len__(self) -> int:
+        """Return number of entries, including expired ones not yet dropped."""
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[V]:
+        """Return the value for key, or None if it is missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses.inc()
+            return None
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            self._data.pop(key, None)
+            self._expired.inc()
+            self._misses.inc()
+            return None
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: Hashable, value: V, expires_at: float) -> None:
+        """Store value under key until expires_at."""
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evicted.inc()
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        """Remove key and return its value if it was present."""
+        entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._data.clear()
@@ -0,0 +1,31 @@
+from datetime import UTC, datetime, timedelta
+from typing import Optional
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def make_etag(resource_id: int, updated_at: datetime) -> str:
+    """Build the strong ETag of a resource from its id and last update time.
+
+    Every write sets updated_at, so the ETag changes whenever the resource
+    does. Naive datetimes are taken as UTC, the same instant read with or
+    without a time zone gives the same ETag.
+    """
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=UTC)
+    micros = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'"{resource_id:x}-{micros:x}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag.
+
+    If-None-Match uses the weak comparison, so a ``W/`` prefix is ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
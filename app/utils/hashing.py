@@ -0,0 +1,146 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from typing import TYPE_CHECKING, Callable, List, Optional, TypeVar
+
+from app.common.config import settings
+from app.common.metrics import Counter, Gauge, Histogram
+from app.exceptions.exception import ServiceUnavailableError
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth",
+    "Password hashing jobs queued or running in the process pool.",
+)
+HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password hashing jobs rejected because the queue was full.",
+)
+HASH_LATENCY = Histogram(
+    "password_hash_seconds",
+    "Time from submitting a password hashing job to getting its result.",
+    labelnames=("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0),
+)
+
+
+@cache
+def get_pwd_context() -> "CryptContext":
+    """Get the passlib context, importing passlib and bcrypt on first use."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """Hash a plain text password."""
+    return get_pwd_context().hash(password)
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Check a plain text password against a hash."""
+    return get_pwd_context().verify(password, hashed_password)
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash several plain text passwords."""
+    pwd_context = get_pwd_context()
+    return [pwd_context.hash(password) for password in passwords]
+
+
+class PasswordHasher:
+    """Run password hashing in a bounded process pool.
+
+    bcrypt is deliberately slow, running it on the event loop stalls every
+    other request on the worker. Jobs are sent to a process pool instead and
+    at most ``max_workers + max_queue`` jobs may be in flight; beyond that
+    callers get a ServiceUnavailableError right away instead of queueing up.
+    """
+
+    def __init__(self, max_workers: int = 0, max_queue: int = 64) -> None:
+        """Initialize hasher.
+
+        Args:
+            max_workers: Number of worker processes, 0 means one per CPU
+            max_queue: Number of jobs allowed to wait for a free worker
+
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs queued or running."""
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        """Hash a plain text password off the event loop."""
+        return await self._submit("hash", hash_password, password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash passwords in parallel across the worker processes.
+
+        The passwords are split into one chunk per worker, so a large batch
+        takes max_workers queue slots rather than one slot per password.
+        """
+        if not passwords:
+            return []
+        size = -(-len(passwords) // self.max_workers)
+        chunks = await asyncio.gather(
+            *(
+                self._submit("hash_many", hash_passwords, passwords[i : i + size])
+                for i in range(0, len(passwords), size)
+            )
+        )
+        return [hashed for chunk in chunks for hashed in chunk]
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Check a plain text password against a hash off the event loop."""
+        return await self._submit("verify", verify_password, password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _submit(
+        self, operation: str, func: Callable[..., T], *args: object
+    ) -> T:
+        if self._pending >= self.max_workers + self.max_queue:
+            HASH_REJECTED.inc()
+            raise ServiceUnavailableError(message="Password hashing queue is full.")
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        HASH_QUEUE_DEPTH.inc()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+            HASH_QUEUE_DEPTH.dec()
+            HASH_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -1,8 +1,15 @@
+import hashlib
+import secrets
 from datetime import UTC, datetime, timedelta
-from typing import Optional, Union
-from jose import JWTError, jwt
+from types import ModuleType
+from typing import Any, NamedTuple, Optional, Union
+
 from app.common.config import settings
+from app.common.metrics import Histogram, timer
 from app.exceptions.exception import InvalidTokenError, TokenExpiredError
+from app.utils.cache import ExpiringLRUCache
+from app.utils.jwt_codec import HMACCodec
+from app.utils.revocation import revoked_tokens
 
 
 class TokenType:
@@ -12,6 +19,42 @@ class TokenType:
     REFRESH_TOKEN = "refresh"
 
 
+class TokenClaims(NamedTuple):
+    """Claims of a token whose signature has been verified."""
+
+    sub: Any
+    type: Any
+    jti: Optional[str]
+    exp: Optional[int]
+
+
+# Maps sha256(token) to the claims of a token whose signature has been
+# verified. Entries expire together with the token.
+token_cache: ExpiringLRUCache[TokenClaims] = ExpiringLRUCache(
+    "jwt", settings.TOKEN_CACHE_SIZE
+)
+
+JWT_SECONDS = Histogram(
+    "jwt_seconds",
+    "Time spent signing or verifying JWTs, cache hits excluded.",
+    labelnames=("operation",),
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025),
+)
+
+
+# Fast path for HMAC algorithms, None when every token goes through jose.
+hmac_codec: Optional[HMACCodec] = HMACCodec.for_algorithm(
+    settings.SECURITY_ALGORITHM, settings.SECRET_KEY.get_secret_value()
+)
+
+
+def _jose() -> ModuleType:
+    """python-jose's jwt module, imported on first use to keep startup fast."""
+    from jose import jwt
+
+    return jwt
+
+
 def create_token(
         subject: Union[int, str],
         token_type: str = TokenType.ACCESS_TOKEN,
@@ -40,15 +83,29 @@ def create_token(
             if token_type == TokenType.ACCESS_TOKEN
             else timedelta(seconds=settings.REFRESH_TOKEN_EXPISE_SECONDS)
         )
-    to_encode = {"exp": expire, "sub": str(subject), "type": token_type}
-
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "type": token_type,
+        # Identifies the token so it can be revoked, see revoked_tokens.
+        "jti": secrets.token_hex(8),
+    }
+
+    if hmac_codec is not None:
+        # jose encodes exp as the timestamp truncated to the second.
+        to_encode["exp"] = int(expire.timestamp())
+        with timer(JWT_SECONDS.labels("encode")):
+            return hmac_codec.encode(to_encode)
+
+    jwt = _jose()
     try:
-        return jwt.encode(
-            to_encode,
-            settings.SECRET_KEY.get_secret_value(),
-            algorithm=settings.SECURITY_ALGORITHM,
-        )
-    except JWTError as e:
+        with timer(JWT_SECONDS.labels("encode")):
+            return jwt.encode(
+                to_encode,
+                settings.SECRET_KEY.get_secret_value(),
+                algorithm=settings.SECURITY_ALGORITHM,
+            )
+    except jwt.JWTError as e:
         raise InvalidTokenError(message=str(e)) from e
     
 def verify_token(
@@ -66,25 +123,76 @@ def verify_token(
 
     Raises:
         TokenExpiredError: If token has expired
-        InvalidTokenError: If token is invalid
+        InvalidTokenError: If token is invalid or revoked
 
     """
+    return int(verify_token_claims(token, token_type).sub)
+
+def verify_token_claims(
+    token: str, token_type: str = TokenType.ACCESS_TOKEN
+) -> TokenClaims:
+    """Verify JWT token and return its claims, see verify_token.
+
+    Raises:
+        TokenExpiredError: If token has expired
+        InvalidTokenError: If token is invalid or revoked
+
+    """
+    jwt = _jose()
     try:
-        payload = jwt.decode(
-            token=token,
-            key=settings.SECRET_KEY.get_secret_value(),
-            algorithms=[settings.SECURITY_ALGORITHM]
-        )
-        if payload.get("type") != token_type:
+        claims = _decode_claims(token)
+        if claims.type != token_type:
             raise InvalidTokenError("Invalid token type")
 
-        user_id = payload.get("sub")
-        if not user_id:
+        if not claims.sub:
             raise InvalidTokenError("Token missing user id")
 
-        return int(user_id)
+        # Tokens issued before jti was added can not be revoked.
+        if (
+            claims.jti is not None
+            and claims.exp is not None
+            and revoked_tokens.is_revoked(claims.jti, claims.exp)
+        ):
+            raise InvalidTokenError("Token has been revoked")
+
+        return claims
 
     except jwt.ExpiredSignatureError as e:
         raise TokenExpiredError from e
-    except JWTError as e:
-        raise InvalidTokenError(message=str(e)) from e
\ No newline at end of file
+    except jwt.JWTError as e:
+        raise InvalidTokenError(message=str(e)) from e
+
+def _decode_claims(token: str) -> TokenClaims:
+    """Decode token and return its claims, using the token cache.
+
+    Tokens of the shape create_token issues are decoded by hmac_codec,
+    others by jose.
+
+    A cached entry is dropped once the token's exp has passed, the token is
+    then decoded again so an expired token raises exactly as before.
+    """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    claims = token_cache.get(cache_key)
+    if claims is not None:
+        return claims
+
+    with timer(JWT_SECONDS.labels("decode")):
+        payload = hmac_codec.decode(token) if hmac_codec is not None else None
+        if payload is None:
+            payload = _jose().decode(
+                token=token,
+                key=settings.SECRET_KEY.get_secret_value(),
+                algorithms=[settings.SECURITY_ALGORITHM]
+            )
+    exp = payload.get("exp")
+    claims = TokenClaims(
+        payload.get("sub"),
+        payload.get("type"),
+        payload.get("jti"),
+        int(exp) if exp is not None else None,
+    )
+    if exp is not None:
+        # jose rejects a token once exp < int(now), so it is valid for the
+        # whole second named by exp.
+        token_cache.set(cache_key, claims, int(exp) + 1)
+    return claims
@@ -0,0 +1,135 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.exceptions.exception import InvalidTokenError, TokenExpiredError
+
+HASHES = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+# Claims the fast path understands, with the types it accepts. A token with
+# other claims or other types is left to python-jose.
+CLAIM_TYPES = {"exp": int, "sub": str, "type": str, "jti": str}
+
+
+def b64encode(data: bytes) -> bytes:
+    """Encode data as unpadded base64url, as JWS segments are."""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64decode(segment: bytes) -> bytes:
+    """Decode an unpadded base64url segment, the way python-jose does."""
+    return base64.urlsafe_b64decode(segment + b"=" * (-len(segment) % 4))
+
+
+class HMACCodec:
+    """Encode and decode HMAC signed JWTs without python-jose.
+
+    python-jose looks up the algorithm, builds a key object and converts
+    datetimes on every call. This codec does that work once: the HMAC is
+    keyed up front and copied for each token, and the header segment, the
+    same for every token jose issues with this algorithm, is encoded once.
+
+    Tokens are byte for byte what jose issues for the same claims. Decoding
+    only handles tokens of the shape this app issues, the fixed header and
+    the exp, sub, type and jti claims. For anything else decode returns
+    None and the caller asks jose, so every token jose accepts is still
+    accepted and nothing it rejects gets through.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        key: bytes,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize codec.
+
+        Args:
+            algorithm: HS256, HS384 or HS512
+            key: HMAC secret
+            clock: Wall clock, token expiry times are Unix timestamps
+
+        """
+        self.algorithm = algorithm
+        self.clock = clock
+        self._hmac = hmac.new(key, digestmod=HASHES[algorithm])
+        # jose serializes the header with sorted keys and no whitespace.
+        header = json.dumps(
+            {"alg": algorithm, "typ": "JWT"}, separators=(",", ":"), sort_keys=True
+        )
+        self._header = b64encode(header.encode()) + b"."
+
+    @classmethod
+    def for_algorithm(cls, algorithm: str, key: str) -> Optional["HMACCodec"]:
+        """Create a codec, or None if algorithm and key are left to jose.
+
+        jose refuses PEM and SSH public keys as HMAC secrets, such keys are
+        left to it to report.
+        """
+        key_bytes = key.encode("utf-8")
+        if (
+            algorithm not in HASHES
+            or b"-----BEGIN" in key_bytes
+            or key_bytes.startswith(b"ssh-")
+        ):
+            return None
+        return cls(algorithm, key_bytes)
+
+    def encode(self, claims: Dict[str, Any]) -> str:
+        """Sign claims, exp given as Unix timestamp.
+
+        Claims are serialized in the order given, as jose does.
+        """
+        payload = json.dumps(claims, separators=(",", ":")).encode()
+        signing_input = self._header + b64encode(payload)
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return (signing_input + b"." + b64encode(mac.digest())).decode()
+
+    def decode(self, token: str) -> Optional[Dict[str, Any]]:
+        """Verify token and return its claims.
+
+        Returns:
+            The claims, or None if the token is not of the shape handled here
+
+        Raises:
+            TokenExpiredError: If token has expired
+            InvalidTokenError: If the signature does not match
+
+        """
+        data = token.encode()
+        header = self._header
+        if not data.startswith(header):
+            return None
+        signing_input, _, signature = data.rpartition(b".")
+        if len(signing_input) < len(header):
+            return None  # a single dot, not enough segments
+        try:
+            signature = b64decode(signature)
+        except (TypeError, binascii.Error):
+            return None
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        if not hmac.compare_digest(mac.digest(), signature):
+            raise InvalidTokenError(message="Signature verification failed.")
+
+        try:
+            claims = json.loads(b64decode(signing_input[len(header) :]))
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(claims, dict):
+            return None
+        for name, value in claims.items():
+            expected = CLAIM_TYPES.get(name)
+            # bool is an int, jose treats it as one but it is no timestamp.
+            if expected is None or type(value) is not expected:
+                return None
+        exp = claims.get("exp")
+        # jose compares exp to the current time truncated to the second.
+        if exp is not None and exp < int(self.clock()):
+            raise TokenExpiredError
+        return claims
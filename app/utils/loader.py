@@ -0,0 +1,99 @@
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """Coalesce lookups by key into batched fetches, DataLoader style.
+
+    Keys requested while the event loop runs the same step are fetched
+    together with a single call to fetch. Every key is fetched at most once
+    per loader, later loads share the first result, missing keys included.
+    A loader is meant to live for one request. Batches run one at a time,
+    so fetch may use a session that does not allow concurrent queries.
+    """
+
+    def __init__(self, fetch: Callable[[List[K]], Awaitable[Dict[K, V]]]) -> None:
+        """Initialize loader.
+
+        Args:
+            fetch: Coroutine function returning the values of the found keys
+
+        """
+        self._fetch = fetch
+        self._futures: Dict[K, asyncio.Future] = {}
+        # Keys waiting for the next batch, with the futures their callers
+        # await. A key cleared meanwhile is still fetched for those callers.
+        self._pending: List[Tuple[K, asyncio.Future]] = []
+        self._lock = asyncio.Lock()
+        # Keeps the dispatch tasks referenced until they are done.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        """Return the value of key, or None if it does not exist."""
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[key] = future
+            self._pending.append((key, future))
+            if len(self._pending) == 1:
+                task = asyncio.create_task(self._dispatch())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        # A cancelled caller must not cancel the result others wait for.
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Sequence[K]) -> List[Optional[V]]:
+        """Return the values of keys in order, fetched in one batch."""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: K, value: Optional[V]) -> None:
+        """Record the value of key, e.g. after writing it."""
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._futures[key] = future
+
+    def clear(self, key: K) -> None:
+        """Forget key, the next load fetches it again."""
+        self._futures.pop(key, None)
+
+    async def _dispatch(self) -> None:
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return  # taken by the batch before
+            # A key cleared and loaded again is pending twice.
+            keys = list(dict.fromkeys(key for key, _ in pending))
+            try:
+                values = await self._fetch(keys)
+            except BaseException as e:
+                for key, future in pending:
+                    # A failed fetch is not remembered, the key can be retried.
+                    if self._futures.get(key) is future:
+                        del self._futures[key]
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Callers that gave up would have it logged as never
+                        # retrieved.
+                        future.exception()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                return
+            for key, future in pending:
+                future.set_result(values.get(key))
@@ -0,0 +1,43 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+from app.exceptions.exception import BadRequestError
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset values as an opaque cursor.
+
+    Args:
+        values: Sort key values of the last item of a page
+
+    Returns:
+        URL safe cursor string
+
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor made by encode_cursor.
+
+    Args:
+        cursor: Cursor string
+
+    Returns:
+        Keyset values
+
+    Raises:
+        BadRequestError: If the cursor is malformed
+
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise BadRequestError(message="Invalid cursor.") from e
+    if not isinstance(values, dict):
+        raise BadRequestError(message="Invalid cursor.")
+    return values
@@ -0,0 +1,217 @@
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from app.common.metrics import Counter
+from app.common.redis import get_redis, redis_error
+
+RATE_LIMIT_BACKEND_ERRORS = Counter(
+    "rate_limit_backend_errors_total",
+    "Rate limit checks that fell back to the in-process limiter.",
+)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Rate(NamedTuple):
+    """Token bucket holding capacity tokens, refilled at per_second."""
+
+    capacity: int
+    per_second: float
+
+
+def parse_rate(rate: str) -> Optional[Rate]:
+    """Parse a rate such as ``10/minute``, allowing bursts of 10.
+
+    Returns:
+        The rate, or None for an empty string, which disables the limit
+
+    Raises:
+        ValueError: If rate is not ``<count>/<second|minute|hour|day>`` with
+            a count of at least 1
+
+    """
+    if not rate:
+        return None
+    count, _, period = rate.partition("/")
+    if not count.strip().isdigit() or period.strip() not in PERIODS:
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. 10/minute")
+    capacity = int(count)
+    if capacity < 1:
+        raise ValueError(f"Invalid rate {rate!r}, the count must be at least 1")
+    return Rate(capacity, capacity / PERIODS[period.strip()])
+
+
+Limits = Sequence[Tuple[str, Rate]]
+
+
+class MemoryRateLimiter:
+    """Token buckets kept in process, for a single worker or per-worker limits.
+
+    A request takes one token from each of its buckets, all or none: if any
+    bucket is empty nothing is taken. Buckets are refilled lazily when next
+    used, so a check under the limit is a dict lookup and a few float
+    operations per bucket.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize limiter.
+
+        Args:
+            maxsize: Buckets kept before refilled ones are dropped
+            clock: Monotonic clock, replaceable in tests
+
+        """
+        self.maxsize = maxsize
+        self.clock = clock
+        # key -> (tokens, time of last update, rate)
+        self._buckets: Dict[str, Tuple[float, float, Rate]] = {}
+
+    async def acquire(self, limits: Limits) -> float:
+        """Take a token from every bucket of limits.
+
+        Returns:
+            0 if the request is allowed, else seconds until it would be
+
+        """
+        return self.acquire_now(limits)
+
+    def acquire_now(self, limits: Limits) -> float:
+        """Acquire synchronously, see acquire."""
+        # Hot path: plain indexing and comparisons instead of min/max/zip.
+        now = self.clock()
+        buckets = self._buckets
+        updates = []
+        wait = 0.0
+        for key, rate in limits:
+            bucket = buckets.get(key)
+            if bucket is None:
+                available = rate[0]
+            else:
+                available = bucket[0] + (now - bucket[1]) * rate[1]
+                if available > rate[0]:
+                    available = rate[0]
+            if available < 1:
+                missing = (1 - available) / rate[1]
+                if missing > wait:
+                    wait = missing
+            updates.append((key, (available - 1, now, rate)))
+        if wait:
+            return wait
+        buckets.update(updates)
+        if len(buckets) > self.maxsize:
+            self._evict(now)
+        return 0.0
+
+    def reset(self) -> None:
+        """Forget every bucket."""
+        self._buckets.clear()
+
+    def _evict(self, now: float) -> None:
+        # A refilled bucket is the same as a missing one. If too few have
+        # refilled, the oldest are dropped too and come back full.
+        buckets = self._buckets
+        for key, (tokens, updated, rate) in list(buckets.items()):
+            if tokens + (now - updated) * rate.per_second >= rate.capacity:
+                del buckets[key]
+        for key in list(buckets)[: len(buckets) - self.maxsize // 2]:
+            del buckets[key]
+
+
+# Takes one token from every bucket in KEYS, all or none. ARGV holds the
+# capacity and refill rate of each bucket in turn. Time comes from the Redis
+# server so the clocks of the workers do not matter. Returns the seconds to
+# wait as a string, Redis would truncate a number to an integer.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local per_second = tonumber(ARGV[2 * i])
+    local bucket = redis.call("HMGET", key, "tokens", "time")
+    local available = capacity
+    if bucket[1] then
+        available = math.min(
+            capacity, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * per_second
+        )
+    end
+    if available < 1 then
+        wait = math.max(wait, (1 - available) / per_second)
+    end
+    tokens[i] = available
+end
+if wait > 0 then
+    return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local per_second = tonumber(ARGV[2 * i])
+    redis.call("HSET", key, "tokens", tokens[i] - 1, "time", now)
+    redis.call("PEXPIRE", key, math.ceil(capacity / per_second * 1000))
+end
+return "0"
+"""
+
+
+class RedisRateLimiter:
+    """Token buckets shared by every worker through Redis.
+
+    Each check is one round trip running a Lua script, which refills and
+    takes from all the buckets of a request atomically. A bucket expires
+    once it would be full again, so idle clients leave nothing behind.
+
+    If Redis is not configured or fails, the check falls back to an
+    in-process limiter: limits then hold per worker instead of cluster wide,
+    but an outage neither lets every request through nor rejects them all.
+    """
+
+    KEY_PREFIX = "ratelimit:"
+
+    def __init__(
+        self,
+        redis_getter: Callable[[], Any] = get_redis,
+        fallback: Optional[MemoryRateLimiter] = None,
+    ) -> None:
+        """Initialize limiter.
+
+        Args:
+            redis_getter: Function returning a Redis client or None
+            fallback: Limiter used while Redis is unavailable
+
+        """
+        self._redis_getter = redis_getter
+        self.fallback = fallback or MemoryRateLimiter()
+        self._script: Any = None
+        self._script_client: Any = None
+
+    async def acquire(self, limits: Limits) -> float:
+        """See MemoryRateLimiter.acquire."""
+        redis = self._redis_getter()
+        if redis is None:
+            return self.fallback.acquire_now(limits)
+        if self._script_client is not redis:
+            self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+            self._script_client = redis
+        args: List[Any] = []
+        for _, (capacity, per_second) in limits:
+            args += [capacity, per_second]
+        try:
+            wait = await self._script(
+                keys=[self.KEY_PREFIX + key for key, _ in limits], args=args
+            )
+        except redis_error() as e:
+            RATE_LIMIT_BACKEND_ERRORS.inc()
+            logger.warning(f"Rate limit check fell back to the local limiter: {e}")
+            return self.fallback.acquire_now(limits)
+        return float(wait)
+
+    def reset(self) -> None:
+        """Forget the buckets of the fallback limiter."""
+        self.fallback.reset()
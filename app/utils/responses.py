@@ -0,0 +1,113 @@
+from datetime import date, datetime
+from operator import attrgetter
+from types import UnionType
+from typing import Any, Dict, Iterable, List, Type, Union, get_args, get_origin
+
+import orjson
+from pydantic import BaseModel, EmailStr
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+def dumps(value: object) -> bytes:
+    """Serialize value to compact JSON bytes.
+
+    orjson writes datetimes the way pydantic does, UTC as ``Z``, so the
+    output matches ``model_dump_json`` of the same data.
+    """
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, the default response class."""
+
+    def render(self, content: object) -> bytes:
+        """Serialize content."""
+        return dumps(content)
+
+
+class PrevalidatedJSONResponse(Response):
+    """Response with a body the handler already serialized to JSON.
+
+    FastAPI sends a returned Response as is, so a route returning this one
+    skips validating and serializing its result against response_model,
+    which still documents the response. Only return it when the handler
+    guarantees the shape, e.g. from a ModelSerializer.
+    """
+
+    media_type = "application/json"
+
+
+# Types whose values orjson writes the same way pydantic
+# serializes them, so they need no conversion.
+PLAIN_TYPES = (str, int, float, bool, datetime, date, EmailStr, type(None))
+
+
+class ModelSerializer:
+    """Serialize ORM objects straight to the JSON of a schema.
+
+    ``Schema.model_validate(obj).model_dump_json()`` validates and copies
+    every attribute before serializing. The serializer reads the
+    attributes once with a precompiled getter and dumps them, which gives
+    the same JSON when the ORM columns have the schema's types. Only
+    schemas of plain fields are supported, checked when it is created.
+    """
+
+    def __init__(self, model: Type[BaseModel]) -> None:
+        """Initialize serializer.
+
+        Args:
+            model: Schema whose fields are read from the ORM objects
+
+        Raises:
+            TypeError: If a field is not of a plain type
+
+        """
+        names = []
+        keys = []
+        for name, field in model.model_fields.items():
+            if field.exclude:
+                continue
+            annotation = field.annotation
+            types = (annotation,)
+            if get_origin(annotation) in (Union, UnionType):
+                types = get_args(annotation)
+            if not all(tp in PLAIN_TYPES for tp in types):
+                raise TypeError(
+                    f"{model.__name__}.{name} of type {annotation} is not supported"
+                )
+            names.append(name)
+            keys.append(field.serialization_alias or field.alias or name)
+        self.model = model
+        self.keys = tuple(keys)
+        getter = attrgetter(*names)
+        # attrgetter of one name returns the value, not a tuple.
+        self._getter = getter if len(names) > 1 else lambda obj: (getter(obj),)
+
+    def to_dict(self, obj: object) -> Dict[str, Any]:
+        """Read the schema's fields of obj into a dict."""
+        return dict(zip(self.keys, self._getter(obj)))
+
+    def to_list(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Read the schema's fields of every object."""
+        keys, getter = self.keys, self._getter
+        return [dict(zip(keys, getter(obj))) for obj in objs]
+
+    def dumps(self, obj: object) -> bytes:
+        """Serialize obj to the JSON of the schema."""
+        return dumps(self.to_dict(obj))
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streaming response whose body iterator reads the request body.
+
+    StreamingResponse watches ``receive`` for a disconnect while streaming,
+    which would swallow request body messages. This response leaves
+    ``receive`` to the body iterator, which sees the disconnect itself.
+    """
+
+    async def __call__(self, _scope: Scope, _receive: Receive, send: Send) -> None:
+        """Stream the response."""
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+from loguru import logger
+
+from app.common.config import settings
+from app.common.metrics import Counter
+from app.common.redis import get_redis, redis_error
+
+TOKENS_REVOKED = Counter(
+    "jwt_tokens_revoked_total",
+    "Tokens revoked by this worker.",
+)
+REVOKED_TOKENS_REJECTED = Counter(
+    "jwt_revoked_tokens_rejected_total",
+    "Requests rejected because their token was revoked.",
+)
+
+
+class RevokedTokens:
+    """Ids (jti) of revoked tokens, grouped in buckets by token expiry.
+
+    A token is checked in memory, by looking up the bucket of its exp and
+    the jti in it. When nothing was revoked in that bucket, which is the
+    usual case, the check is a single dict lookup. A revoked token only
+    needs to be remembered until it expires. A bucket holds tokens that
+    all expire before its end, so it is dropped as a whole once that end
+    has passed.
+
+    With Redis configured, a revocation is stored in a Redis set per bucket
+    that expires with the bucket, and published so every worker adds it to
+    its own buckets. A worker loads the sets when it starts and after its
+    subscription was interrupted. Without Redis, revocations only hold in
+    the worker that made them.
+    """
+
+    CHANNEL = "revoked_tokens"
+    KEY_PREFIX = "revoked_tokens:"
+
+    def __init__(
+        self,
+        bucket_seconds: int,
+        redis_getter: Callable[[], Any] = get_redis,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize revocation list.
+
+        Args:
+            bucket_seconds: Span of token expiry times grouped in one bucket
+            redis_getter: Function returning a Redis client or None
+            clock: Wall clock, token expiry times are Unix timestamps
+
+        """
+        self.bucket_seconds = bucket_seconds
+        self.clock = clock
+        self._redis_getter = redis_getter
+        self._buckets: Dict[int, Set[str]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        """Return the number of revoked tokens remembered."""
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def is_revoked(self, jti: str, exp: int) -> bool:
+        """Whether the token with id jti expiring at exp was revoked."""
+        bucket = self._buckets.get(exp // self.bucket_seconds)
+        if bucket is not None and jti in bucket:
+            REVOKED_TOKENS_REJECTED.inc()
+            return True
+        return False
+
+    async def revoke(self, jti: str, exp: int) -> None:
+        """Revoke the token with id jti expiring at exp, on every worker."""
+        TOKENS_REVOKED.inc()
+        index = exp // self.bucket_seconds
+        self._add(index, jti)
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        key = self.KEY_PREFIX + str(index)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.sadd(key, jti)
+                pipe.expireat(key, self._bucket_end(index))
+                pipe.publish(self.CHANNEL, f"{index} {jti}")
+                await pipe.execute()
+        except redis_error() as e:
+            logger.warning(f"Token revocation not shared with other workers: {e}")
+
+    async def load(self) -> None:
+        """Add the revocations stored in Redis."""
+        redis = self._redis_getter()
+        if redis is None:
+            return
+        async for key in redis.scan_iter(match=self.KEY_PREFIX + "*"):
+            index = int(key[len(self.KEY_PREFIX) :])
+            for jti in await redis.smembers(key):
+                self._add(index, jti.decode())
+
+    def start(self) -> None:
+        """Start following the revocations of other workers."""
+        if self._listener is None and self._redis_getter() is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """Stop following the revocations of other workers."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def clear(self) -> None:
+        """Forget every revocation held in this worker."""
+        self._buckets.clear()
+
+    def _add(self, index: int, jti: str) -> None:
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            # New buckets are rare, a good time to drop the expired ones.
+            self._prune()
+            bucket = self._buckets[index] = set()
+        bucket.add(jti)
+
+    def _prune(self) -> None:
+        now = self.clock()
+        for index in [i for i in self._buckets if self._bucket_end(i) <= now]:
+            del self._buckets[index]
+
+    def _bucket_end(self, index: int) -> int:
+        # Tokens are valid for the whole second named by their exp.
+        return (index + 1) * self.bucket_seconds + 1
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._redis_getter().pubsub()
+            try:
+                await pubsub.subscribe(self.CHANNEL)
+                # Subscribed first, so no revocation falls between the two.
+                await self.load()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        index, jti = message["data"].decode().split(" ", 1)
+                        self._add(int(index), jti)
+            except redis_error() as e:
+                logger.warning(f"Token revocation listener failed: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+revoked_tokens = RevokedTokens(settings.TOKEN_REVOCATION_BUCKET_SECONDS)
@@ -0,0 +1,109 @@
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from app.common.metrics import Counter
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_keys_total",
+    "Keys looked up by running a fetch or by joining one already in flight.",
+    labelnames=("name", "result"),
+)
+
+
+class SingleFlight(Generic[K, V]):
+    """Share in-flight fetches between concurrent callers asking for a key.
+
+    A key nobody is fetching is fetched by the caller, a key already being
+    fetched waits for that fetch. Nothing is kept once a fetch is done, the
+    next caller fetches again, so results are never staler than the fetch.
+
+    A fetch runs in its own task. If the caller that started it is
+    cancelled, the others still get the result. An exception raised by the
+    fetch is raised to every caller waiting for it.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize single-flight group.
+
+        Args:
+            name: Name used as the metrics label
+
+        """
+        self._flights: Dict[K, asyncio.Task] = {}
+        self._started = SINGLEFLIGHT_CALLS.labels(name, "fetched")
+        self._joined = SINGLEFLIGHT_CALLS.labels(name, "coalesced")
+
+    def __len__(self) -> int:
+        """Return the number of keys in flight."""
+        return len(self._flights)
+
+    async def do_many(
+        self,
+        keys: Sequence[K],
+        fetch: Callable[[List[K]], Awaitable[Dict[K, V]]],
+    ) -> Dict[K, Optional[V]]:
+        """Look up keys, fetching those not in flight with one call to fetch.
+
+        Args:
+            keys: Keys to look up
+            fetch: Coroutine function returning the values of the found keys
+
+        Returns:
+            The value of every key, None for keys not found
+
+        """
+        tasks: Dict[K, asyncio.Task] = {}
+        missing = []
+        for key in keys:
+            task = self._flights.get(key)
+            if task is None:
+                missing.append(key)
+            else:
+                tasks[key] = task
+        self._joined.inc(len(tasks))
+        if missing:
+            self._started.inc(len(missing))
+            task = asyncio.create_task(fetch(missing))
+            for key in missing:
+                self._flights[key] = tasks[key] = task
+            task.add_done_callback(lambda done: self._land(done, missing))
+
+        values: Dict[K, Optional[V]] = {}
+        for task in dict.fromkeys(tasks.values()):
+            # A cancelled caller must not cancel the fetch others wait for.
+            values.update(await asyncio.shield(task))
+        return {key: values.get(key) for key in keys}
+
+    async def do(
+        self,
+        key: K,
+        fetch: Callable[[], Awaitable[Optional[V]]],
+    ) -> Optional[V]:
+        """Look up one key, see do_many."""
+
+        async def fetch_one(_keys: List[K]) -> Dict[K, V]:
+            value = await fetch()
+            return {} if value is None else {key: value}
+
+        return (await self.do_many([key], fetch_one))[key]
+
+    def _land(self, task: asyncio.Task, keys: List[K]) -> None:
+        for key in keys:
+            if self._flights.get(key) is task:
+                del self._flights[key]
+        # The callers may all have given up, do not log it as never retrieved.
+        if not task.cancelled():
+            task.exception()
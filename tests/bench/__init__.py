@@ -0,0 +1,16 @@
+"""Benchmarks, run as modules: python -m tests.bench, python -m tests.bench.<name>.
+
+Settings are read at import time, so a throwaway SQLite database and test
+secrets are configured here, before anything from app is imported.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("ALLOW_ORIGINS", "[]")
+os.environ["ASYNC_DATABASE_URL"] = (
+    f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='base-fastapi-bench-')}/bench.db"
+)
+os.environ["ASYNC_DATABASE_REPLICA_URLS"] = "[]"
+os.environ["REDIS_URL"] = ""
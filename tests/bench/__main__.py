@@ -0,0 +1,70 @@
+"""Benchmark the auth and user endpoints and their building blocks.
+
+Run with: python -m tests.bench [--output bench-base.json] [--compare bench-base.json]
+
+Results are printed as a table. --output writes them as JSON, to be kept
+as a baseline for later runs on the same machine. --compare runs the
+benchmarks, shows the change against a baseline and exits with status 1
+if any benchmark regressed by more than --tolerance.
+"""
+
+import argparse
+import asyncio
+import platform
+import sys
+from datetime import UTC, datetime
+
+from tests.bench import endpoints, micro
+from tests.bench.report import compare, load, render, save
+
+from app.utils.hashing import password_hasher
+
+
+def main() -> int:
+    """Run the benchmarks given on the command line, return the exit status."""
+    parser = argparse.ArgumentParser(prog="python -m tests.bench")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed slowdown as a fraction of the baseline (default 0.1)",
+    )
+    args = parser.parse_args()
+
+    baseline = load(args.compare) if args.compare else None
+    try:
+        results = asyncio.run(endpoints.run(args.requests, args.concurrency))
+    finally:
+        password_hasher.shutdown()
+    results.update(micro.run(args.iterations))
+
+    print(render(results, baseline))  # noqa: T201
+    if args.output:
+        save(
+            args.output,
+            results,
+            {
+                "created": datetime.now(UTC).isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "iterations": args.iterations,
+            },
+        )
+
+    if baseline is None:
+        return 0
+    regressions = compare(baseline, results, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")  # noqa: T201
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Throughput and latency of the auth and user endpoints.
+
+The real application runs in process behind httpx's ASGITransport against
+a throwaway SQLite database, with access logs formatted into a sink that
+discards them. Concurrent clients keep a fixed number of requests in
+flight, as a server under load would.
+"""
+
+import asyncio
+import time
+from datetime import UTC, datetime
+from typing import Awaitable, Callable, Dict, Tuple
+
+import httpx
+from loguru import logger
+
+from tests.bench.report import Result, Results, summarize
+
+from app.db.base import Base
+from app.db.session import AsyncSessionLocal, async_engine
+from app.main import app
+from app.models.user import User
+from app.utils.hashing import hash_password
+
+PASSWORD = "bench-password"
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    request: Request,
+    requests: int,
+    concurrency: int,
+) -> Result:
+    """Send requests with concurrency in flight and summarize their latency."""
+    for _ in range(min(max(requests // 10, 1), 20)):
+        await request(client)
+
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def setup() -> Tuple[User, Dict[str, str]]:
+    """Create the schema and a superuser, return it with its tokens."""
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        user = User(
+            username="bench",
+            email="bench@example.com",
+            first_name="Bench",
+            last_name="User",
+            password=hash_password(PASSWORD),
+            is_superuser=True,
+            is_active=True,
+            date_joined=datetime.now(UTC),
+        )
+        session.add(user)
+        await session.commit()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        response = await c.post(
+            "/api/v1/auth/login",
+            json={"email": user.email, "password": PASSWORD},
+        )
+        response.raise_for_status()
+    return user, response.json()
+
+
+async def run(requests: int, concurrency: int) -> Results:
+    """Benchmark every endpoint.
+
+    Args:
+        requests: Requests per endpoint, login sends a tenth of them since
+            each one runs bcrypt
+        concurrency: Requests kept in flight
+
+    Returns:
+        Results by benchmark name
+
+    """
+    logger.remove()
+    logger.add(lambda _message: None, level="INFO")
+
+    user, tokens = await setup()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    login = {"email": user.email, "password": PASSWORD}
+
+    endpoints: Dict[str, Tuple[Request, int]] = {
+        "POST /auth/login": (
+            lambda c: c.post("/api/v1/auth/login", json=login),
+            max(requests // 10, 1),
+        ),
+        "POST /auth/refresh": (
+            lambda c: c.post(
+                "/api/v1/auth/refresh",
+                json={"resfresh_token": tokens["refresh_token"]},
+            ),
+            requests,
+        ),
+        "GET /auth/me": (
+            lambda c: c.get("/api/v1/auth/me", headers=headers),
+            requests,
+        ),
+        "GET /user/{user_id}": (
+            lambda c: c.get(f"/api/v1/user/{user.id}", headers=headers),
+            requests,
+        ),
+    }
+
+    results: Results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        for name, (request, count) in endpoints.items():
+            results[name] = await measure(c, request, count, concurrency)
+    await async_engine.dispose()
+    return results
@@ -0,0 +1,152 @@
+"""Microbenchmarks of the per-request building blocks.
+
+JWT signing and verification, with and without the verified token cache,
+python-jose against the HMAC codec for encoding and decoding alone, the
+token revocation check, bcrypt hashing and verification, and building
+the body of a user response: the stdlib JSONResponse, FastAPI's
+response_model path and the precompiled serializer.
+"""
+
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Callable, Iterable
+
+from fastapi.encoders import jsonable_encoder
+
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from tests.bench.report import Result, Results, summarize
+
+from app.common.config import settings
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+from app.schemas.user import user_serializer
+from app.utils.hashing import hash_password, verify_password
+from app.utils.jwt import (
+    _decode_claims,
+    _jose,
+    create_token,
+    token_cache,
+    verify_token,
+)
+from app.utils.jwt_codec import HMACCodec
+from app.utils.responses import PrevalidatedJSONResponse
+from app.utils.revocation import revoked_tokens
+
+
+def measure(calls: Iterable[Callable[[], object]]) -> Result:
+    """Time each call separately and summarize."""
+    latencies = []
+    start = time.perf_counter()
+    for call in calls:
+        call_start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run(iterations: int) -> Results:
+    """Run every microbenchmark.
+
+    Args:
+        iterations: Calls per benchmark, bcrypt runs a hundredth of them
+
+    Returns:
+        Results by benchmark name
+
+    """
+    now = datetime.now(UTC)
+    user = User(
+        id=1,
+        username="bench",
+        email="bench@example.com",
+        first_name="Bench",
+        last_name="User",
+        is_active=True,
+        is_superuser=False,
+        date_joined=now,
+        last_login=now,
+        create_at=now,
+        updated_at=now,
+    )
+    token = create_token(1)
+    tokens = [create_token(i) for i in range(iterations)]
+    hashed = hash_password("bench-password")
+    bcrypt_iterations = max(iterations // 100, 3)
+    # What FastAPI does with response_model: validate, then dump to bytes.
+    adapter = TypeAdapter(UserSchema)
+
+    token_cache.clear()
+    uncached = measure(lambda token=t: verify_token(token) for t in tokens)
+    verify_token(token)
+    claims = _decode_claims(token)
+    jwt = _jose()
+    key = settings.SECRET_KEY.get_secret_value()
+    # Compared at HS256, whatever algorithm is configured.
+    codec = HMACCodec.for_algorithm("HS256", key)
+    expire = now + timedelta(hours=1)
+    payload = {"exp": expire, "sub": "1", "type": "access", "jti": claims.jti}
+    codec_payload = {**payload, "exp": int(expire.timestamp())}
+    hs256_token = jwt.encode(payload, key, algorithm="HS256")
+    return {
+        "jwt create_token": measure(
+            (lambda: create_token(1)) for _ in range(iterations)
+        ),
+        "jwt verify_token (cache miss)": uncached,
+        "jwt verify_token (cache hit)": measure(
+            (lambda: verify_token(token)) for _ in range(iterations)
+        ),
+        "jwt encode (jose)": measure(
+            (lambda: jwt.encode(payload, key, algorithm="HS256"))
+            for _ in range(iterations)
+        ),
+        "jwt encode (codec)": measure(
+            (lambda: codec.encode(codec_payload)) for _ in range(iterations)
+        ),
+        "jwt decode (jose)": measure(
+            (lambda: jwt.decode(hs256_token, key, algorithms=["HS256"]))
+            for _ in range(iterations)
+        ),
+        "jwt decode (codec)": measure(
+            (lambda: codec.decode(hs256_token)) for _ in range(iterations)
+        ),
+        "jwt revocation check": measure(
+            (lambda: revoked_tokens.is_revoked(claims.jti, claims.exp))
+            for _ in range(iterations)
+        ),
+        "bcrypt hash_password": measure(
+            (lambda: hash_password("bench-password"))
+            for _ in range(bcrypt_iterations)
+        ),
+        "bcrypt verify_password": measure(
+            (lambda: verify_password("bench-password", hashed))
+            for _ in range(bcrypt_iterations)
+        ),
+        "schema User serialize": measure(
+            (lambda: UserSchema.model_validate(user).model_dump_json())
+            for _ in range(iterations)
+        ),
+        "response User stdlib JSONResponse": measure(
+            (
+                lambda: JSONResponse(
+                    jsonable_encoder(UserSchema.model_validate(user))
+                )
+            )
+            for _ in range(iterations)
+        ),
+        "response User response_model": measure(
+            (
+                lambda: PrevalidatedJSONResponse(
+                    adapter.dump_json(
+                        adapter.validate_python(user, from_attributes=True)
+                    )
+                )
+            )
+            for _ in range(iterations)
+        ),
+        "response User serializer": measure(
+            (lambda: PrevalidatedJSONResponse(user_serializer.dumps(user)))
+            for _ in range(iterations)
+        ),
+    }
@@ -0,0 +1,130 @@
+"""Per-request overhead of the access log middleware.
+
+Compares the pure ASGI AccessLogMiddleware with the BaseHTTPMiddleware
+implementation it replaced, both wrapping a trivial Starlette app and
+logging at INFO into a sink that discards records.
+
+Run with: python -m tests.bench.middleware_overhead [requests]
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from typing import Callable
+
+from loguru import logger
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp
+
+from app.middlewares.logging_middleware import AccessLogMiddleware
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """The BaseHTTPMiddleware based middleware, kept for comparison."""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        """Log the request and response around call_next."""
+        request_id = str(uuid.uuid4())
+        with logger.contextualize(request_id=request_id):
+            logger.info(
+                "Request",
+                extra={
+                    "method": request.method,
+                    "url": str(request.url),
+                    "headers": dict(request.headers),
+                    "client_host": request.client.host if request.client else None,
+                },
+            )
+            start_time = time.time()
+            response = await call_next(request)
+            process_time = time.time() - start_time
+            logger.info(
+                "Response",
+                extra={
+                    "status_code": response.status_code,
+                    "processing_time": f"{process_time:.4f}",
+                },
+            )
+            return response
+
+
+async def endpoint(_request: Request) -> PlainTextResponse:
+    """Answer ok, the cheapest possible endpoint."""
+    return PlainTextResponse("ok")
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/",
+    "raw_path": b"/",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [
+        (b"host", b"test"),
+        (b"user-agent", b"bench"),
+        (b"accept", b"*/*"),
+        (b"accept-encoding", b"gzip"),
+    ],
+    "client": ("127.0.0.1", 50000),
+    "server": ("test", 80),
+}
+
+
+async def run(app: ASGIApp, requests: int) -> float:
+    """Return mean seconds per request."""
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_message: dict) -> None:
+        pass
+
+    for _ in range(min(requests, 1000)):
+        await app(dict(SCOPE), receive, send)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int) -> None:
+    """Send requests through each middleware and print the time per request."""
+    logger.remove()
+    logger.add(lambda _message: None, level="INFO")
+
+    bare = Starlette(routes=[Route("/", endpoint)])
+    legacy = Starlette(routes=[Route("/", endpoint)])
+    legacy.add_middleware(LegacyLoggingMiddleware)
+    access_log = AccessLogMiddleware(bare, headers=["user-agent"])
+
+    baseline = await run(bare, requests)
+    print(f"{'app':<32}{'us/request':>12}{'overhead us':>14}")  # noqa: T201
+    print(f"{'no middleware':<32}{baseline * 1e6:>12.1f}{'-':>14}")  # noqa: T201
+    for name, app in (
+        ("BaseHTTPMiddleware", legacy),
+        ("AccessLogMiddleware", access_log),
+    ):
+        mean = await run(app, requests)
+        overhead = (mean - baseline) * 1e6
+        print(f"{name:<32}{mean * 1e6:>12.1f}{overhead:>14.1f}")  # noqa: T201
+
+    # Records below the sink level are never built.
+    logger.remove()
+    logger.add(lambda _message: None, level="WARNING")
+    mean = await run(access_log, requests)
+    overhead = (mean - baseline) * 1e6
+    name = "AccessLogMiddleware (INFO off)"
+    print(f"{name:<32}{mean * 1e6:>12.1f}{overhead:>14.1f}")  # noqa: T201
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
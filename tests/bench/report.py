@@ -0,0 +1,108 @@
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+Result = Dict[str, float]
+Results = Dict[str, Result]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> Result:
+    """Summarize per-operation latencies.
+
+    Args:
+        latencies: Seconds taken by each operation
+        elapsed: Wall clock seconds for all of them, concurrency included
+        errors: Operations that failed
+
+    Returns:
+        Throughput in operations per second, latency percentiles in seconds
+
+    """
+    ordered = sorted(latencies)
+    return {
+        "operations": len(ordered),
+        "errors": errors,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+    }
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    rank = math.ceil(pct * len(ordered) / 100)
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+def compare(baseline: Results, current: Results, tolerance: float) -> List[str]:
+    """List the benchmarks that regressed against a baseline.
+
+    A benchmark regressed when its throughput fell, or its median or p95
+    latency rose, by more than tolerance, a fraction of the baseline value.
+    Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput']:.1f}/s, "
+                f"baseline {base['throughput']:.1f}/s"
+            )
+        for key in ("p50", "p95"):
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {_format_seconds(result[key])}, "
+                    f"baseline {_format_seconds(base[key])}"
+                )
+    return regressions
+
+
+def render(results: Results, baseline: Optional[Results] = None) -> str:
+    """Format results as a table, with the change against baseline if given."""
+    header = f"{'benchmark':<36}{'ops/s':>12}{'p50':>12}{'p95':>12}{'p99':>12}"
+    if baseline is not None:
+        header += f"{'ops/s vs base':>16}"
+    lines = [header]
+    for name, result in results.items():
+        line = (
+            f"{name:<36}{result['throughput']:>12.1f}"
+            f"{_format_seconds(result['p50']):>12}"
+            f"{_format_seconds(result['p95']):>12}"
+            f"{_format_seconds(result['p99']):>12}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base["throughput"]:
+            change = result["throughput"] / base["throughput"] - 1
+            line += f"{change:>+16.1%}"
+        if result["errors"]:
+            line += f"  ({int(result['errors'])} errors)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def load(path: str) -> Results:
+    """Read results written by save."""
+    with Path(path).open() as f:
+        return json.load(f)["results"]
+
+
+def save(path: str, results: Results, metadata: Dict[str, object]) -> None:
+    """Write results and the conditions they were measured under."""
+    with Path(path).open("w") as f:
+        json.dump({"metadata": metadata, "results": results}, f, indent=2)
+        f.write("\n")
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
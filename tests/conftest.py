@@ -0,0 +1,113 @@
+import os
+import tempfile
+
+# Settings are read at import time, point them at a throwaway database first.
+_db_dir = tempfile.mkdtemp(prefix="base-fastapi-tests-")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALLOW_ORIGINS", '["http://localhost"]')
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ["REDIS_URL"] = ""
+
+from contextlib import contextmanager  # noqa: E402
+from datetime import UTC, datetime  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.events import track_statements  # noqa: E402
+from app.db.session import AsyncSessionLocal, async_engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.principal_cache import principal_cache  # noqa: E402
+from app.services.rate_limit import credential_rate_limit  # noqa: E402
+from app.utils.hashing import hash_password  # noqa: E402
+from app.utils.jwt import create_token, token_cache  # noqa: E402
+from app.utils.revocation import revoked_tokens  # noqa: E402
+
+PASSWORD = "secret-password"
+PASSWORD_HASH = hash_password(PASSWORD)
+
+@pytest_asyncio.fixture
+async def db():
+    """Create the tables and yield a session, dropping everything afterwards."""
+    principal_cache._local.clear()
+    token_cache.clear()
+    revoked_tokens.clear()
+    credential_rate_limit.reset()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        yield session
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await async_engine.dispose()
+
+@pytest_asyncio.fixture
+async def client(db):
+    """HTTP client calling the application in process."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+@pytest.fixture
+def create_user(db):
+    """Insert a user with PASSWORD as password."""
+
+    async def create_user(username="user", superuser=False, **kwargs):
+        now = datetime.now(UTC)
+        user = User(
+            username=username,
+            email=kwargs.pop("email", f"{username}@example.com"),
+            first_name="",
+            last_name="",
+            password=PASSWORD_HASH,
+            is_superuser=superuser,
+            is_active=True,
+            date_joined=now,
+            **kwargs,
+        )
+        db.add(user)
+        await db.commit()
+        return user
+
+    return create_user
+
+@pytest.fixture
+def auth_headers():
+    """Build the authorization header for a user."""
+
+    def auth_headers(user):
+        return {"Authorization": f"Bearer {create_token(user.id)}"}
+
+    return auth_headers
+
+@pytest.fixture
+def statements(db):
+    """Record the SQL statements sent to the database."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture
+def statement_budget(db):
+    """Fail when the block issues more SQL statements than allowed."""
+
+    @contextmanager
+    def statement_budget(limit):
+        with track_statements(record=True) as stats:
+            yield stats
+        assert stats.count <= limit, (
+            f"{stats.count} statements issued, budget is {limit}:\n"
+            + "\n".join(stats.statements)
+        )
+
+    return statement_budget
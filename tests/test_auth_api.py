@@ -0,0 +1,69 @@
+import pytest
+
+from tests.conftest import PASSWORD
+
+REGISTER = {
+    "email": "new@example.com",
+    "username": "newuser",
+    "password": "new-password",
+}
+
+@pytest.mark.asyncio
+async def test_register_single_statement(client, statements):
+    """Test registering a user costs one INSERT ... RETURNING."""
+    response = await client.post("/api/v1/auth/register", json=REGISTER)
+    assert response.status_code == 200
+    assert response.json()["username"] == "newuser"
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")
+
+@pytest.mark.asyncio
+async def test_register_duplicate(client, create_user):
+    """Test a taken email or username is reported as such."""
+    await create_user("taken")
+    response = await client.post(
+        "/api/v1/auth/register", json={**REGISTER, "email": "taken@example.com"}
+    )
+    assert response.json()["code"] == "E0100"
+    response = await client.post(
+        "/api/v1/auth/register", json={**REGISTER, "username": "taken"}
+    )
+    assert response.json()["code"] == "E0101"
+
+@pytest.mark.asyncio
+async def test_login_statements(client, create_user, statements):
+    """Test logging in reads the user and updates last_login only."""
+    await create_user("user")
+    statements.clear()
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "user@example.com", "password": PASSWORD},
+    )
+    assert response.status_code == 200
+    assert [s.split()[0] for s in statements] == ["SELECT", "UPDATE"]
+
+@pytest.mark.asyncio
+async def test_logout_revokes_tokens(client, create_user):
+    """Test logged out access and refresh tokens are rejected."""
+    await create_user("user")
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "user@example.com", "password": PASSWORD},
+    )
+    tokens = response.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert (await client.get("/api/v1/user/me", headers=headers)).status_code == 200
+
+    response = await client.post(
+        "/api/v1/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    response = await client.get("/api/v1/user/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["code"] == "E0201"
+    response = await client.post(
+        "/api/v1/auth/refresh", json={"resfresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
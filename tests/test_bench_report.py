@@ -0,0 +1,27 @@
+from tests.bench.report import compare, percentile, summarize
+
+
+def result(throughput, p50, p95):
+    """Build the result of a benchmark without errors."""
+    return {"throughput": throughput, "p50": p50, "p95": p95, "p99": p95, "errors": 0}
+
+def test_summarize_percentiles():
+    """Test nearest-rank percentiles and throughput."""
+    summary = summarize([i / 100 for i in range(1, 101)], elapsed=2.0)
+    assert summary["throughput"] == 50
+    assert summary["p50"] == 0.5
+    assert summary["p95"] == 0.95
+    assert summary["p99"] == 0.99
+    assert percentile([], 50) == 0.0
+
+def test_compare_flags_regressions_beyond_tolerance():
+    """Test only changes beyond the tolerance are reported."""
+    baseline = {"a": result(100, 0.010, 0.020), "b": result(100, 0.010, 0.020)}
+    current = {
+        "a": result(95, 0.0105, 0.021),
+        "b": result(80, 0.010, 0.030),
+        "new": result(1, 1, 1),
+    }
+    regressions = compare(baseline, current, tolerance=0.1)
+    assert len(regressions) == 2
+    assert all(line.startswith("b: ") for line in regressions)
@@ -0,0 +1,112 @@
+import asyncio
+import zlib
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.middlewares.compression_middleware import (
+    COMPRESSION_BYTES,
+    CompressionMiddleware,
+    negotiate,
+)
+
+ROWS = [f'{{"id": {i}, "username": "user{i}"}}\n'.encode() for i in range(200)]
+
+async def large(_request):
+    """Answer a JSON body well over the minimum size."""
+    return JSONResponse([row.decode() for row in ROWS], headers={"ETag": '"1-2"'})
+
+async def small(_request):
+    """Answer a JSON body under the minimum size."""
+    return JSONResponse({"status": "ok"})
+
+async def binary(_request):
+    """Answer a body of a content type that is not compressed."""
+    return PlainTextResponse(b"x" * 4096, media_type="application/octet-stream")
+
+def make_app(**kwargs):
+    """App of the test routes wrapped in CompressionMiddleware."""
+    app = Starlette(
+        routes=[Route("/large", large), Route("/small", small), Route("/bin", binary)]
+    )
+    return CompressionMiddleware(app, minimum_size=100, **kwargs)
+
+def test_negotiate():
+    """Test q values, the wildcard and the server's preference on ties."""
+    assert negotiate("gzip, br", ("br", "gzip")) == "br"
+    assert negotiate("gzip;q=1, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert negotiate("*", ("gzip",)) == "gzip"
+    assert negotiate("gzip;q=0, identity", ("gzip",)) is None
+    assert negotiate("", ("gzip",)) is None
+
+@pytest.mark.asyncio
+async def test_compresses_allowed_content_over_minimum_size():
+    """Test only large responses of allowed content types are compressed."""
+    transport = httpx.ASGITransport(make_app(content_types=["application/json"]))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        before = COMPRESSION_BYTES.labels("gzip", "uncompressed").value
+        response = await c.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"1-2"'
+        assert response.json() == [row.decode() for row in ROWS]
+        after = COMPRESSION_BYTES.labels("gzip", "uncompressed").value
+        assert after - before == len(response.content)
+
+        response = await c.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.headers["vary"] == "Accept-Encoding"
+
+        response = await c.get("/bin", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+        response = await c.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+@pytest.mark.asyncio
+async def test_streams_chunk_by_chunk():
+    """Test each chunk is compressed and sent before the next is produced."""
+    produced = asyncio.Event()
+    sent = []
+
+    async def body():
+        yield b"".join(ROWS[:100])
+        # The first chunk must reach the client before the body ends.
+        await produced.wait()
+        yield b"".join(ROWS[100:])
+
+    async def stream(scope, receive, send):
+        await StreamingResponse(body(), media_type="application/x-ndjson")(
+            scope, receive, send
+        )
+
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and message["body"]:
+            produced.set()
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    app = CompressionMiddleware(
+        stream, minimum_size=100, content_types=["application/x-ndjson"]
+    )
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    await asyncio.wait_for(app(scope, receive, send), 5)
+
+    headers = dict(sent[0]["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    decoder = zlib.decompressobj(31)
+    # Every chunk decodes on its own, without waiting for the next.
+    assert decoder.decompress(sent[1]["body"]) == b"".join(ROWS[:100])
+    rest = b"".join(message["body"] for message in sent[2:])
+    assert decoder.decompress(rest) == b"".join(ROWS[100:])
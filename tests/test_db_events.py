@@ -0,0 +1,80 @@
+import pytest
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.common.logger import request_id_ctx
+from app.db.events import instrument_statements, redact, track_statements
+
+
+@pytest.mark.asyncio
+async def test_track_statements_nested(tmp_path):
+    """Test statements count towards the current stats and the enclosing ones."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/events.db")
+    instrument_statements(engine.sync_engine)
+    try:
+        async with engine.connect() as conn:
+            with track_statements() as outer:
+                await conn.execute(text("SELECT 1"))
+                with track_statements(record=True) as inner:
+                    await conn.execute(text("SELECT 2"))
+            await conn.execute(text("SELECT 3"))
+    finally:
+        await engine.dispose()
+    assert outer.count == 2
+    assert inner.count == 1
+    assert inner.statements == ["SELECT 2"]
+    assert outer.seconds >= inner.seconds > 0
+
+@pytest.mark.asyncio
+async def test_slow_query_log(tmp_path):
+    """Test slow statements are logged with the request id and no values."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/events.db")
+    instrument_statements(engine.sync_engine, slow_query_seconds=1e-9)
+    messages = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    token = request_id_ctx.set("req-42")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+    finally:
+        request_id_ctx.reset(token)
+        logger.remove(sink)
+        await engine.dispose()
+    assert len(messages) == 1
+    assert "req-42" in messages[0]
+    assert "SELECT ?" in messages[0]
+    assert "hunter2" not in messages[0]
+    assert "['str']" in messages[0]
+
+def test_redact():
+    """Test parameter values are replaced by their types."""
+    assert redact({"email": "a@b.c", "id": 1}) == {"email": "str", "id": "int"}
+    assert redact(("a", 1)) == ["str", "int"]
+    assert redact([("a",), ("b",)], executemany=True) == "<2 parameter sets>"
+
+@pytest.mark.asyncio
+async def test_endpoint_statement_budgets(
+    client, create_user, auth_headers, statement_budget
+):
+    """Test the authenticated read endpoints stay within their budgets."""
+    admin = await create_user("admin", superuser=True)
+    headers = auth_headers(admin)
+    with statement_budget(1):
+        await client.get("/api/v1/auth/me", headers=headers)
+    with statement_budget(0):
+        await client.get("/api/v1/user/me", headers=headers)
+    with statement_budget(1):
+        await client.get("/api/v1/user", headers=headers)
+    with statement_budget(1):
+        await client.get(f"/api/v1/user/{admin.id}", headers=headers)
+
+@pytest.mark.asyncio
+async def test_statement_budget_exceeded(
+    client, create_user, auth_headers, statement_budget
+):
+    """Test a request going over its budget fails the test."""
+    user = await create_user("user")
+    with pytest.raises(AssertionError, match="1 statements issued, budget is 0"):
+        with statement_budget(0):
+            await client.get("/api/v1/auth/me", headers=auth_headers(user))
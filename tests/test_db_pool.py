@@ -0,0 +1,113 @@
+import pytest
+from loguru import logger
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.common.config import settings
+from app.common.logger import request_id_ctx
+from app.db.pool import (
+    POOL_CHECKOUT_SECONDS,
+    POOL_EXHAUSTED,
+    POOL_IN_USE,
+    POOL_TIMEOUTS,
+    InstrumentedQueuePool,
+    engine_options,
+    ping_idle_connections,
+)
+
+ASYNCPG_URL = "postgresql+asyncpg://postgres@localhost/postgres"
+
+def test_engine_options_default_profile():
+    """Test the pool settings are passed to the instrumented pool."""
+    options = engine_options(
+        settings.model_copy(update={"DB_POOL_SIZE": 3, "DB_POOL_PRE_PING": "never"}),
+        ASYNCPG_URL,
+    )
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == 3
+    assert options["pool_logging_name"] == "primary"
+    assert options["pool_pre_ping"] is False
+    assert options["connect_args"] == {"prepared_statement_cache_size": 100}
+
+def test_engine_options_pgbouncer_profile():
+    """Test the pgbouncer profile disables prepared statement caching."""
+    options = engine_options(
+        settings.model_copy(update={"DB_PROFILE": "pgbouncer"}), ASYNCPG_URL
+    )
+    assert options["poolclass"] is NullPool
+    connect_args = options["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name_func = connect_args["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+@pytest.mark.asyncio
+async def test_pool_exhaustion_is_measured_and_logged(tmp_path):
+    """Test a checkout on a full pool is counted and logged with the request id."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name="busy",
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    # Another pool must not take over the gauges of the first.
+    other = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/other.db",
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name="other",
+    )
+    messages = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    token = request_id_ctx.set("req-1")
+    exhausted = POOL_EXHAUSTED.labels("busy").value
+    timeouts = POOL_TIMEOUTS.labels("busy").value
+    checkouts = POOL_CHECKOUT_SECONDS.labels("busy").count
+    try:
+        async with engine.connect():
+            assert POOL_IN_USE.labels("busy").value == 1
+            assert POOL_IN_USE.labels("other").value == 0
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        assert POOL_IN_USE.labels("busy").value == 0
+        # The pool recreated by dispose keeps the name.
+        await engine.dispose()
+        async with engine.connect():
+            assert POOL_IN_USE.labels("busy").value == 1
+    finally:
+        request_id_ctx.reset(token)
+        logger.remove(sink)
+        await engine.dispose()
+        await other.dispose()
+
+    assert POOL_EXHAUSTED.labels("busy").value == exhausted + 1
+    assert POOL_TIMEOUTS.labels("busy").value == timeouts + 1
+    assert POOL_CHECKOUT_SECONDS.labels("busy").count == checkouts + 3
+    assert POOL_EXHAUSTED.labels("other").value == 0
+    assert len(messages) == 2
+    assert all("req-1" in message for message in messages)
+
+@pytest.mark.asyncio
+async def test_ping_idle_connections(tmp_path, monkeypatch):
+    """Test only connections idle longer than the threshold are pinged."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/ping.db", poolclass=InstrumentedQueuePool
+    )
+    pings = []
+    monkeypatch.setattr(engine.sync_engine.dialect, "do_ping", pings.append)
+    try:
+        ping_idle_connections(engine.sync_engine, idle_seconds=3600)
+        for _ in range(2):
+            async with engine.connect():
+                pass
+        assert pings == []
+
+        ping_idle_connections(engine.sync_engine, idle_seconds=0)
+        async with engine.connect():
+            pass
+        assert len(pings) == 1
+    finally:
+        await engine.dispose()
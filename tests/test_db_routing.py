@@ -0,0 +1,149 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from tests.conftest import PASSWORD_HASH
+
+from app.db.base import Base
+from app.db.routing import ReplicaRouter, RoutingSession, mark_written
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.user import UserService
+
+
+class Clock:
+    """Clock that only moves when a test sets now."""
+
+    def __init__(self) -> None:
+        """Initialize clock at 0."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return now."""
+        return self.now
+
+@pytest_asyncio.fixture
+async def router(tmp_path):
+    """Router over a primary and a replica database that do not replicate."""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/primary.db")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/replica.db")
+    for engine in (primary, replica):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    router = ReplicaRouter(primary, [replica], clock=Clock())
+    yield router
+    await router.dispose()
+
+@pytest.fixture
+def session_factory(router):
+    """Return a factory of routing sessions on router."""
+    return sessionmaker(
+        router.primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        router=router,
+        expire_on_commit=False,
+    )
+
+async def insert_user(session_factory, username="user"):
+    """Insert a user through a session of session_factory."""
+    async with session_factory() as session:
+        user = User(
+            username=username,
+            email=f"{username}@example.com",
+            password=PASSWORD_HASH,
+        )
+        session.add(user)
+        await session.commit()
+        return user.id
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_and_writes_to_primary(router, session_factory):
+    """Test a plain read is served by the replica, which lacks the new row."""
+    user_id = await insert_user(session_factory)
+    async with session_factory() as session:
+        assert await UserService(session).get_by_id(user_id) is None
+
+@pytest.mark.asyncio
+async def test_session_sticks_to_primary_after_write(router, session_factory):
+    """Test reads after a write in the same session see the write."""
+    user_id = await insert_user(session_factory)
+    async with session_factory() as session:
+        user_service = UserService(session)
+        await user_service.update(user_id, UserUpdate(first_name="First"))
+        user = await user_service.get_by_id(user_id)
+        assert user.first_name == "First"
+
+@pytest.mark.asyncio
+async def test_read_your_writes_window(router, session_factory):
+    """Test a subject that wrote reads from the primary until the window ends."""
+    user_id = await insert_user(session_factory)
+    async with session_factory() as session:
+        session.info["subject"] = user_id
+        mark_written(session, "other")
+        await UserService(session).update(user_id, UserUpdate(first_name="First"))
+
+    for subject in (user_id, "other"):
+        async with session_factory() as session:
+            session.info["subject"] = subject
+            assert await UserService(session).get_by_id(user_id) is not None
+
+    router.clock.now += router.read_your_writes_seconds + 1
+    async with session_factory() as session:
+        session.info["subject"] = user_id
+        assert await UserService(session).get_by_id(user_id) is None
+
+@pytest.mark.asyncio
+async def test_unhealthy_replica_is_ejected(router, session_factory, monkeypatch):
+    """Test reads fall back to the primary while the replica fails its checks."""
+    user_id = await insert_user(session_factory)
+
+    async def failing_lag(engine):
+        raise ConnectionError("replica down")
+
+    monkeypatch.setattr(router, "_lag", failing_lag)
+    await router.check_replicas()
+    assert not router.replicas[0].healthy
+    async with session_factory() as session:
+        assert await UserService(session).get_by_id(user_id) is not None
+
+    monkeypatch.undo()
+    await router.check_replicas()
+    assert router.replicas[0].healthy
+
+@pytest.mark.asyncio
+async def test_lagging_replica_is_ejected(router, monkeypatch):
+    """Test a replica lagging beyond the threshold is ejected."""
+
+    async def lag(engine):
+        return router.max_lag_seconds + 1
+
+    monkeypatch.setattr(router, "_lag", lag)
+    await router.check_replicas()
+    assert not router.replicas[0].healthy
+    assert router.reader() is router.primary.sync_engine
+
+@pytest.mark.asyncio
+async def test_session_reads_from_one_replica(tmp_path):
+    """Test a session keeps its replica, sessions are spread over replicas."""
+    engines = [
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/{name}.db")
+        for name in ("primary", "replica0", "replica1")
+    ]
+    router = ReplicaRouter(engines[0], engines[1:], clock=Clock())
+    replicas = {engine.sync_engine for engine in engines[1:]}
+    picked = []
+    for _ in range(2):
+        session = RoutingSession(router=router)
+        binds = {session.get_bind() for _ in range(3)}
+        assert len(binds) == 1
+        picked.append(binds.pop())
+    assert set(picked) == replicas
+
+    # An ejected replica is left for another one.
+    session = RoutingSession(router=router)
+    first = session.get_bind()
+    next(r for r in router.replicas if r.engine.sync_engine is first).healthy = False
+    assert session.get_bind() == (replicas - {first}).pop()
+    await router.dispose()
@@ -0,0 +1,57 @@
+import pytest
+
+from app.utils.etag import etag_matches
+
+
+def test_etag_matches():
+    """Test If-None-Match lists, weak validators and the wildcard."""
+    etag = '"1-2"'
+    assert etag_matches('"0-1", W/"1-2"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"1-3"', etag)
+    assert not etag_matches(None, etag)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/api/v1/user/me", "/api/v1/auth/me"])
+async def test_current_user_not_modified(client, create_user, auth_headers, path):
+    """Test the current user answers 304 until it is updated."""
+    user = await create_user("user")
+    headers = auth_headers(user)
+    response = await client.get(path, headers=headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    response = await client.get(path, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    await client.patch("/api/v1/user/me", json={"first_name": "F"}, headers=headers)
+    response = await client.get(path, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "F"
+    assert response.headers["ETag"] != etag
+
+@pytest.mark.asyncio
+async def test_user_by_id_not_modified_from_cache(
+    client, create_user, auth_headers, statements
+):
+    """Test a cached user answers 304 without querying the database."""
+    admin = await create_user("admin", superuser=True)
+    headers = auth_headers(admin)
+    # Signing in as the admin caches it, the admin then reads itself.
+    response = await client.get(f"/api/v1/user/{admin.id}", headers=headers)
+    etag = response.headers["ETag"]
+
+    statements.clear()
+    response = await client.get(
+        f"/api/v1/user/{admin.id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert statements == []
+
+    other = await create_user("other")
+    response = await client.get(
+        f"/api/v1/user/{other.id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.exceptions.exception import ServiceUnavailableError
+from app.utils.hashing import HASH_REJECTED, PasswordHasher, verify_password
+
+
+@pytest.fixture
+def hasher():
+    """Hasher with one worker and room for one queued job."""
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    yield hasher
+    hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_hash_and_verify(hasher):
+    """Test hashing and verifying a password in the process pool."""
+    hashed = await hasher.hash("secret-password")
+    assert verify_password("secret-password", hashed)
+    assert await hasher.verify("secret-password", hashed)
+    assert not await hasher.verify("wrong-password", hashed)
+    assert hasher.queue_depth == 0
+
+@pytest.mark.asyncio
+async def test_queue_full_fails_fast(hasher):
+    """Test jobs beyond the queue bound are rejected with 503."""
+    rejected = HASH_REJECTED.value
+    results = await asyncio.gather(
+        *(hasher.hash("secret-password") for _ in range(3)),
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, ServiceUnavailableError)]
+    assert len(errors) == 1
+    assert errors[0].status_code == 503
+    assert HASH_REJECTED.value == rejected + 1
+
+@pytest.mark.asyncio
+async def test_event_loop_not_blocked(hasher):
+    """Test the event loop keeps running while a hash is computed."""
+    await hasher.hash("warm-up-pool")
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(ticker())
+    await hasher.hash("secret-password")
+    task.cancel()
+    assert ticks > 5
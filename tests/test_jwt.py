@@ -1,10 +1,15 @@
-from datetime import timedelta
+import time
+from datetime import UTC, datetime, timedelta
+
 import pytest
 from jose import JWTError, jwt
 
 from app.common.config import settings
-from app.utils.jwt import create_token, verify_token
 from app.exceptions.exception import InvalidTokenError, TokenExpiredError
+from app.utils import jwt as jwt_utils
+from app.utils.jwt import create_token, token_cache, verify_token
+from app.utils.jwt_codec import HMACCodec
+
 
 def test_create_access_token():
     """Test creating access token."""
@@ -56,6 +61,7 @@ def test_verify_token_invalid():
 
 def test_create_token_jwt_error(monkeypatch):
     """Test token creation with JWT encoding error."""
+    monkeypatch.setattr(jwt_utils, "hmac_codec", None)
 
     def mock_encode(*args, **kwargs):
         raise JWTError("Encoding error")
@@ -69,4 +75,80 @@ def test_verify_token_wrong_type():
     token = create_token("test-subject", "refresh")
     with pytest.raises(InvalidTokenError):
         verify_token(token, "access")
-        
\ No newline at end of file
+
+def test_verify_token_cached():
+    """Test repeated verification is served from the token cache."""
+    token = create_token(123)
+    assert verify_token(token) == 123
+    hits = token_cache._hits.value
+    assert verify_token(token) == 123
+    assert token_cache._hits.value == hits + 1
+
+def test_verify_token_cached_wrong_type():
+    """Test type check still applies to cached tokens."""
+    token = create_token(123, "refresh")
+    assert verify_token(token, "refresh") == 123
+    with pytest.raises(InvalidTokenError):
+        verify_token(token, "access")
+
+def test_verify_token_cached_expired(monkeypatch):
+    """Test cached token is rejected as expired once exp has passed."""
+    token = create_token(123, expires_delta=timedelta(seconds=60))
+    assert verify_token(token) == 123
+    monkeypatch.setattr(token_cache, "clock", lambda: time.time() + 120)
+    monkeypatch.setattr(jwt_utils.hmac_codec, "clock", lambda: time.time() + 120)
+    with pytest.raises(TokenExpiredError):
+        verify_token(token)
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+def test_codec_matches_jose(algorithm):
+    """Test codec tokens are byte for byte jose's and both decode each other."""
+    key = settings.SECRET_KEY.get_secret_value()
+    codec = HMACCodec.for_algorithm(algorithm, key)
+    exp = datetime.fromtimestamp(int(time.time()) + 60, UTC)
+    claims = {"exp": exp, "sub": "12", "type": "access", "jti": "0123456789abcdef"}
+    issued = jwt.encode(claims, key, algorithm=algorithm)
+    token = codec.encode({**claims, "exp": int(exp.timestamp())})
+    assert token == issued
+    assert codec.decode(issued) == jwt.decode(token, key, algorithms=[algorithm])
+
+def test_codec_leaves_other_tokens_to_jose():
+    """Test tokens of another shape are decoded by jose, not rejected."""
+    key = settings.SECRET_KEY.get_secret_value()
+    algorithm = settings.SECURITY_ALGORITHM
+    codec = HMACCodec.for_algorithm(algorithm, key)
+    exp = int(time.time()) + 60
+    claims = {"exp": exp, "sub": "7", "type": "access"}
+    with_kid = jwt.encode(claims, key, algorithm=algorithm, headers={"kid": "1"})
+    with_iat = jwt.encode({**claims, "iat": exp - 60}, key, algorithm=algorithm)
+    float_exp = jwt.encode({**claims, "exp": exp + 0.5}, key, algorithm=algorithm)
+    for token in (with_kid, with_iat, float_exp):
+        assert codec.decode(token) is None
+        assert verify_token(token) == 7
+    assert HMACCodec.for_algorithm("RS256", key) is None
+    assert HMACCodec.for_algorithm(algorithm, "-----BEGIN PUBLIC KEY-----") is None
+
+def test_codec_rejects_tampered_and_expired_tokens():
+    """Test a bad signature, another key and an expired token are rejected."""
+    token = create_token(5)
+    header, payload, signature = token.split(".")
+    forged = jwt.encode(
+        {"exp": int(time.time()) + 60, "sub": "1", "type": "access"},
+        "another-secret",
+        algorithm=settings.SECURITY_ALGORITHM,
+    )
+    flipped = signature[:-2] + ("A" if signature[-2] != "A" else "B") + signature[-1]
+    for bad in (f"{header}.{payload}.{flipped}", forged):
+        with pytest.raises(InvalidTokenError):
+            jwt_utils.hmac_codec.decode(bad)
+        with pytest.raises(InvalidTokenError):
+            verify_token(bad)
+    expired = create_token(5, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(TokenExpiredError):
+        verify_token(expired)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        jwt.decode(
+            expired,
+            settings.SECRET_KEY.get_secret_value(),
+            algorithms=[settings.SECURITY_ALGORITHM],
+        )
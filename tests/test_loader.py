@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.utils.loader import BatchLoader
+
+
+@pytest.mark.asyncio
+async def test_keys_are_fetched_in_one_batch():
+    """Test concurrent loads share one fetch and missing keys load as None."""
+    calls = []
+
+    async def fetch(keys):
+        calls.append(keys)
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = BatchLoader(fetch)
+    assert await loader.load_many([1, 2, 3, 1]) == [10, 20, None, 10]
+    assert await loader.load(2) == 20
+    assert calls == [[1, 2, 3]]
+
+
+@pytest.mark.asyncio
+async def test_clear_while_pending():
+    """Test a key cleared before its batch runs still resolves its callers."""
+    calls = []
+
+    async def fetch(keys):
+        calls.append(keys)
+        return {key: key * 10 for key in keys}
+
+    loader = BatchLoader(fetch)
+    first = asyncio.create_task(loader.load(1))
+    await asyncio.sleep(0)  # first is pending, the batch not yet run
+    loader.clear(1)
+    second = asyncio.create_task(loader.load(1))
+    results = await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+    assert results == [10, 10]
+    # The cleared key is fetched again for the later load.
+    assert calls == [[1], [1]]
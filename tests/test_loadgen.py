@@ -0,0 +1,86 @@
+import pytest
+
+from app.loadgen.histogram import LatencyHistogram
+from app.loadgen.runner import LoadRunner, saturation
+from app.loadgen.scenario import LoadTest, render
+
+
+def test_histogram_percentiles_within_one_percent():
+    """Test recorded latencies come back within the bucket precision."""
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.record(ms / 1000)
+    assert histogram.total == 1000
+    for pct, expected in ((50, 500_000), (99, 990_000), (100, 1_000_000)):
+        assert abs(histogram.percentile(pct) - expected) <= expected / 100
+    copy = LatencyHistogram.from_buckets(histogram.buckets())
+    copy.merge(histogram)
+    assert copy.total == 2000
+    assert copy.percentile(99) == histogram.percentile(99)
+
+def test_render_substitutes_nested_values():
+    """Test placeholders are filled in strings nested in dicts and lists."""
+    body = {"email": "u{vu}@example.com", "tags": ["{run}", 1], "n": None}
+    assert render(body, {"vu": 7, "run": "r"}) == {
+        "email": "u7@example.com",
+        "tags": ["r", 1],
+        "n": None,
+    }
+    with pytest.raises(KeyError):
+        render("{missing}", {})
+
+@pytest.mark.asyncio
+async def test_runner_scenario_against_app(client, create_user):
+    """Test a run sends every step, saves variables and reports errors by step."""
+    await create_user("admin", superuser=True)
+    test = LoadTest.model_validate(
+        {
+            "random_seed": 1,
+            "setup": [
+                {
+                    "name": "login",
+                    "method": "POST",
+                    "path": "/api/v1/auth/login",
+                    "json": {
+                        "email": "admin@example.com",
+                        "password": "secret-password",
+                    },
+                    "save": {"token": "access_token"},
+                }
+            ],
+            "scenarios": [
+                {
+                    "name": "read",
+                    "steps": [
+                        {
+                            "name": "me",
+                            "path": "/api/v1/user/me",
+                            "headers": {"Authorization": "Bearer {token}"},
+                            "save": {"id": "id"},
+                        },
+                        {"name": "missing", "path": "/api/v1/user/{id}0"},
+                    ],
+                }
+            ],
+            "phases": [
+                {"name": "p", "duration": 0.2, "rate": 50, "arrival": "constant"}
+            ],
+            "slo": {"p99_ms": 60000, "max_error_rate": 0.5},
+        }
+    )
+    runner = LoadRunner(test, client)
+    await runner.setup()
+    (phase,) = await runner.run()
+
+    assert phase["sessions"] == {
+        "scheduled": 10,
+        "completed": 0,
+        "aborted": 10,
+        "dropped": 0,
+    }
+    assert phase["requests"] == 20
+    assert phase["error_rate"] == 0.5
+    assert phase["steps"]["read/me"]["errors"] == {}
+    assert phase["steps"]["read/missing"]["errors"] == {"status 401": 10}
+    assert phase["slo_met"] is True
+    assert saturation([phase])["sustained_rate"] == 50
@@ -0,0 +1,117 @@
+import io
+import json
+import logging
+from datetime import UTC, datetime
+
+import pytest
+from loguru import logger
+
+from app.common import logger as logger_module
+from app.common.logger import (
+    LOG_RECORDS_DROPPED,
+    FileLogWriter,
+    InterceptHandler,
+    LogPipeline,
+    LogRecord,
+    LogWriter,
+)
+
+
+def make_record(level="INFO", levelno=20, message="hello"):
+    """Record logged at 2024-01-02 03:04:05.678 UTC."""
+    return LogRecord(
+        time=datetime(2024, 1, 2, 3, 4, 5, 678000, tzinfo=UTC),
+        level=level,
+        levelno=levelno,
+        message=message,
+        name="tests",
+        function="test",
+        line=1,
+        extra={},
+        exception=None,
+    )
+
+@pytest.fixture
+def pipeline():
+    """Pipeline writing JSON lines to its stream attribute."""
+    stream = io.StringIO()
+    pipeline = LogPipeline(
+        [LogWriter(stream, level="DEBUG", serialize=True)],
+        maxsize=10,
+        flush_interval=0.01,
+    )
+    pipeline.stream = stream
+    yield pipeline
+    pipeline.stop()
+
+def test_text_format():
+    """Test LOG_FORMAT markup is stripped and time tokens are rendered."""
+    writer = LogWriter(
+        fmt="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level>"
+        " | {message}"
+    )
+    expected = "2024-01-02 03:04:05.678 | INFO     | hello\n"
+    assert writer.format(make_record()) == expected
+
+def test_loguru_records_are_batched(pipeline):
+    """Test loguru records are written by the background writer on stop."""
+    pipeline.start()
+    handler_id = logger.add(pipeline.sink, level="DEBUG", format="{message}")
+    try:
+        with logger.contextualize(request_id="abc"):
+            logger.info("first")
+            logger.debug("second")
+    finally:
+        logger.remove(handler_id)
+    pipeline.stop()
+
+    lines = [json.loads(line) for line in pipeline.stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["first", "second"]
+    assert lines[0]["extra"] == {"request_id": "abc"}
+    assert lines[0]["function"] == "test_loguru_records_are_batched"
+
+def test_debug_dropped_first(pipeline):
+    """Test DEBUG records are dropped once the queue is past its watermark."""
+    dropped = LOG_RECORDS_DROPPED.labels("DEBUG").value
+    for _ in range(8):
+        pipeline.put(make_record())
+    pipeline.put(make_record("DEBUG", 10))
+    pipeline.put(make_record())
+    assert LOG_RECORDS_DROPPED.labels("DEBUG").value == dropped + 1
+    assert pipeline._queue.qsize() == 9
+
+def test_full_queue_drops_below_error(pipeline):
+    """Test the drop policy drops records below ERROR when the queue is full."""
+    dropped = LOG_RECORDS_DROPPED.labels("INFO").value
+    for _ in range(11):
+        pipeline.put(make_record())
+    assert LOG_RECORDS_DROPPED.labels("INFO").value == dropped + 1
+    assert pipeline._queue.qsize() == 10
+
+def test_file_rotation(tmp_path):
+    """Test the log file is rotated once it reaches the configured size."""
+    writer = FileLogWriter(
+        str(tmp_path / "app.log"), rotation_bytes=100, retention_days=1
+    )
+    for _ in range(3):
+        writer.write([make_record(message="x" * 40)])
+    writer.close()
+    assert len(list(tmp_path.glob("app.*.log"))) == 2
+    assert (tmp_path / "app.log").read_text().count("\n") == 1
+
+def test_intercept_handler_queues_stdlib_records(pipeline, monkeypatch):
+    """Test stdlib records are queued with their own location."""
+    monkeypatch.setattr(logger_module, "log_pipeline", pipeline)
+    pipeline.start()
+    record = logging.LogRecord(
+        "uvicorn.error", logging.WARNING, "server.py", 42, "stdlib %s", ("record",),
+        None, func="serve",
+    )
+    InterceptHandler().emit(record)
+    pipeline.stop()
+
+    line = json.loads(pipeline.stream.getvalue())
+    assert line["message"] == "stdlib record"
+    assert line["name"] == "uvicorn.error"
+    assert line["function"] == "serve"
+    assert line["line"] == 42
@@ -0,0 +1,74 @@
+import httpx
+import pytest
+from loguru import logger
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.common.logger import request_id_ctx
+from app.middlewares.logging_middleware import AccessLogMiddleware
+
+
+async def echo_request_id(_request):
+    """Answer the request id of the current context."""
+    return PlainTextResponse(request_id_ctx.get())
+
+async def stream(_request):
+    """Stream a body in three chunks."""
+    async def body():
+        for chunk in (b"a", b"b", b"c"):
+            yield chunk
+
+    return StreamingResponse(body())
+
+def make_client(**kwargs):
+    """Client of an app wrapped in AccessLogMiddleware configured by kwargs."""
+    app = Starlette(routes=[Route("/id", echo_request_id), Route("/stream", stream)])
+    app = AccessLogMiddleware(app, **kwargs)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://test")
+
+@pytest.fixture
+def records():
+    """Log records emitted during the test."""
+    records = []
+    handler_id = logger.add(lambda message: records.append(message.record))
+    yield records
+    logger.remove(handler_id)
+
+@pytest.mark.asyncio
+async def test_generates_request_id(records):
+    """Test a request id is generated, bound to the context and returned."""
+    async with make_client(headers=["user-agent"]) as client:
+        response = await client.get("/id", headers={"User-Agent": "test-agent"})
+    request_id = response.headers["x-request-id"]
+    assert response.text == request_id
+    assert len(records) == 1
+    assert records[0]["extra"]["request_id"] == request_id
+    assert records[0]["extra"]["status_code"] == 200
+    assert records[0]["extra"]["headers"] == {"user-agent": "test-agent"}
+    assert records[0]["extra"]["db_statements"] == 0
+
+@pytest.mark.asyncio
+async def test_upstream_request_id(records):
+    """Test a request id sent by the upstream proxy is reused."""
+    async with make_client() as client:
+        response = await client.get("/id", headers={"X-Request-ID": "upstream-1"})
+    assert response.text == "upstream-1"
+    assert response.headers["x-request-id"] == "upstream-1"
+    assert records[0]["extra"]["request_id"] == "upstream-1"
+
+@pytest.mark.asyncio
+async def test_streaming_response(records):
+    """Test streaming responses pass through unbuffered."""
+    async with make_client() as client:
+        response = await client.get("/stream")
+    assert response.content == b"abc"
+    assert len(records) == 1
+
+@pytest.mark.asyncio
+async def test_sampling(records):
+    """Test per-route sampling rates."""
+    async with make_client(sample_rates={"/id": 0.0}) as client:
+        await client.get("/id")
+        await client.get("/stream")
+    assert [record["extra"]["path"] for record in records] == ["/stream"]
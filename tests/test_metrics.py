@@ -0,0 +1,97 @@
+import json
+import os
+
+import pytest
+
+from app.common.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MultiProcessStore,
+    Registry,
+    generate_latest,
+)
+
+
+def make_registry():
+    """Registry with one metric of each kind, returned with its metrics."""
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", ("path",), registry=registry)
+    in_flight = Gauge("in_flight", "In flight.", registry=registry)
+    lag = Gauge("lag_seconds", "Lag.", registry=registry, multiprocess_mode="max")
+    latency = Histogram(
+        "latency_seconds", "Latency.", buckets=(0.1, 1), registry=registry
+    )
+    return registry, requests, in_flight, lag, latency
+
+def test_generate_latest():
+    """Test the Prometheus text format of every metric type."""
+    registry, requests, in_flight, lag, latency = make_registry()
+    requests.labels('/a"b').inc(2)
+    in_flight.set(3)
+    latency.observe(0.1)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = generate_latest(registry.collect())
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{path="/a\\"b"} 2.0' in text
+    assert "in_flight 3.0" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_sum 5.6" in text
+    assert "latency_seconds_count 3" in text
+
+def write_snapshot(directory, pid, registry):
+    """Write the snapshot of registry as worker pid would."""
+    families = [
+        [m.name, m.type, m.documentation, getattr(m, "multiprocess_mode", None)]
+        + [m.collect()]
+        for m in registry
+    ]
+    with (directory / f"metrics-{pid}.json").open("w") as f:
+        json.dump({"pid": pid, "families": families}, f)
+
+def test_multiprocess_store_merges_workers(tmp_path):
+    """Test counters and histograms are summed and gauges combined by mode."""
+    registry, requests, in_flight, lag, latency = make_registry()
+    requests.labels("/").inc()
+    in_flight.set(1)
+    lag.set(1)
+    latency.observe(0.5)
+
+    other, other_requests, other_in_flight, other_lag, _ = make_registry()
+    other_requests.labels("/").inc(2)
+    other_in_flight.set(2)
+    other_lag.set(4)
+    write_snapshot(tmp_path, os.getppid(), other)
+
+    dead, dead_requests, dead_in_flight, _, _ = make_registry()
+    dead_requests.labels("/").inc(4)
+    dead_in_flight.set(100)
+    write_snapshot(tmp_path, 2**22 + 1, dead)
+
+    text = generate_latest(MultiProcessStore(str(tmp_path), registry).collect())
+    assert 'requests_total{path="/"} 7.0' in text
+    assert "in_flight 3.0" in text
+    assert "lag_seconds 4.0" in text
+    assert "latency_seconds_count 1" in text
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client, create_user, auth_headers):
+    """Test routes are labelled by template and DB and JWT timings are exposed."""
+    admin = await create_user("admin", superuser=True)
+    for user_id in (admin.id, 999):
+        await client.get(f"/api/v1/user/{user_id}", headers=auth_headers(admin))
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    route = 'method="GET",route="/api/v1/user/{user_id}"'
+    assert f'{route},status="200"}}' in text
+    assert f'{route},status="404"}}' in text
+    assert "/api/v1/user/999" not in text
+    assert 'db_statement_seconds_count{operation="SELECT"}' in text
+    assert 'jwt_seconds_count{operation="decode"}' in text
@@ -0,0 +1,176 @@
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.api.deps import get_current_user
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.schemas.user import UserUpdate
+from app.services.principal_cache import PrincipalCache, principal_cache
+from app.services.user import UserService
+from app.utils.jwt import create_token
+
+
+def make_user(user_id=1, **kwargs):
+    """User that was never saved, fields overridden by kwargs."""
+    now = datetime.now(UTC)
+    fields = {
+        "id": user_id,
+        "username": f"user{user_id}",
+        "email": f"user{user_id}@example.com",
+        "first_name": "",
+        "last_name": "",
+        "password": "hashed",
+        "is_superuser": False,
+        "is_staff": False,
+        "is_active": True,
+        "date_joined": now,
+        "last_login": None,
+        "create_at": now,
+        "updated_at": now,
+    }
+    fields.update(kwargs)
+    return User(**fields)
+
+class FailingSession:
+    """Session stand-in that fails on any database access."""
+
+    def __init__(self) -> None:
+        """Initialize session."""
+        self.info = {}
+
+    async def execute(self, *_args, **_kwargs):
+        """Fail the test."""
+        raise AssertionError("Unexpected database round trip")
+
+@pytest.fixture
+def server():
+    """Redis server shared by the clients of a test."""
+    return FakeServer()
+
+@pytest.mark.asyncio
+async def test_local_tier():
+    """Test users are cached in process without Redis."""
+    cache = PrincipalCache(ttl=60, maxsize=10, redis_getter=lambda: None)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return make_user()
+
+    first = await cache.get_or_load(1, loader)
+    second = await cache.get_or_load(1, loader)
+    assert calls == 1
+    assert second.username == first.username
+    assert second.password is None
+
+    await cache.invalidate(1)
+    await cache.get_or_load(1, loader)
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_invalidated_load_is_not_cached():
+    """Test a load racing with an invalidation does not repopulate the cache."""
+    cache = PrincipalCache(ttl=60, maxsize=10, redis_getter=lambda: None)
+
+    async def loader():
+        await cache.invalidate(1)
+        return make_user(is_active=True)
+
+    await cache.get_or_load(1, loader)
+    assert await cache.get(1) is None
+    # Nothing is remembered for users no longer being loaded.
+    for user_id in range(100):
+        await cache.invalidate(user_id)
+    assert cache._loading == {}
+
+@pytest.mark.asyncio
+async def test_redis_tier_shared_between_workers(server):
+    """Test a user cached by one worker is served to another from Redis."""
+    worker_a = PrincipalCache(60, 10, redis_getter=lambda: FakeRedis(server=server))
+    worker_b = PrincipalCache(60, 10, redis_getter=lambda: FakeRedis(server=server))
+
+    await worker_a.set(make_user(last_login=datetime(2024, 1, 1, tzinfo=UTC)))
+    user = await worker_b.get(1)
+    assert user.email == "user1@example.com"
+    assert user.last_login == datetime(2024, 1, 1, tzinfo=UTC)
+
+@pytest.mark.asyncio
+async def test_invalidation_fan_out(server):
+    """Test an invalidation on one worker drops the entry on the others."""
+    redis = FakeRedis(server=server)
+    worker_a = PrincipalCache(60, 10, redis_getter=lambda: redis)
+    worker_b = PrincipalCache(60, 10, redis_getter=lambda: FakeRedis(server=server))
+    worker_b.start()
+    try:
+        await worker_b.set(make_user())
+        await redis.delete("principal:1")
+        await asyncio.sleep(0.05)
+
+        await worker_a.invalidate(1)
+        for _ in range(50):
+            if await worker_b.get(1) is None:
+                break
+            await asyncio.sleep(0.01)
+        assert await worker_b.get(1) is None
+    finally:
+        await worker_b.stop()
+
+@pytest.mark.asyncio
+async def test_warm_authentication_skips_database(monkeypatch):
+    """Test get_current_user does no database round trip on a warm cache."""
+    cache = PrincipalCache(ttl=60, maxsize=10, redis_getter=lambda: None)
+    monkeypatch.setattr("app.api.deps.principal_cache", cache)
+    await cache.set(make_user(42))
+
+    token = SimpleNamespace(credentials=create_token(42))
+    user = await get_current_user(session=FailingSession(), token=token)
+    assert user.id == 42
+
+@pytest.mark.asyncio
+async def test_load_after_invalidation_does_not_join_older_read(
+    db, create_user, monkeypatch
+):
+    """Test a load started after an invalidation does not cache an older read.
+
+    The first load's query reads the user and stalls until the user has been
+    deactivated, a second load starting after that must query again.
+    """
+    user = await create_user("target")
+    select_in = UserService.select_in
+    read = asyncio.Event()
+    release = asyncio.Event()
+
+    async def stalled_select_in(self, column, values):
+        found = await select_in(self, column, values)
+        if not read.is_set():
+            read.set()
+            await release.wait()
+        return found
+
+    monkeypatch.setattr(UserService, "select_in", stalled_select_in)
+
+    async def authenticate():
+        async with AsyncSessionLocal() as session:
+            service = UserService(session)
+            return await principal_cache.get_or_load(
+                user.id, lambda: service.get_by_id(user.id)
+            )
+
+    first = asyncio.create_task(authenticate())
+    await read.wait()
+    await UserService(db).update(user.id, UserUpdate(is_active=False))
+    second = asyncio.create_task(authenticate())
+    await asyncio.sleep(0.05)
+    release.set()
+
+    stale, fresh = await asyncio.gather(first, second)
+    assert stale.is_active
+    assert not fresh.is_active
+    cached = await principal_cache.get(user.id)
+    assert cached is None or not cached.is_active
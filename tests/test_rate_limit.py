@@ -0,0 +1,116 @@
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services.rate_limit import credential_rate_limit
+from app.utils.hashing import password_hasher
+from app.utils.rate_limit import (
+    MemoryRateLimiter,
+    Rate,
+    RedisRateLimiter,
+    parse_rate,
+)
+
+
+class FakeClock:
+    """Clock that only moves when a test sets now."""
+
+    def __init__(self) -> None:
+        """Initialize clock at 1000."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return now."""
+        return self.now
+
+def test_parse_rate():
+    """Test rates are parsed into bucket capacity and refill per second."""
+    assert parse_rate("30/minute") == Rate(30, 0.5)
+    assert parse_rate("") is None
+    with pytest.raises(ValueError):
+        parse_rate("30 per minute")
+    # A zero rate would never refill the bucket.
+    with pytest.raises(ValueError):
+        parse_rate("0/minute")
+
+def test_memory_bucket_refills_and_takes_all_or_none():
+    """Test a burst up to capacity, refill over time and all-or-none takes."""
+    clock = FakeClock()
+    limiter = MemoryRateLimiter(clock=clock)
+    ip, email = ("ip", Rate(2, 1.0)), ("email", Rate(4, 1.0))
+    assert limiter.acquire_now([ip, email]) == 0
+    assert limiter.acquire_now([ip, email]) == 0
+    assert limiter.acquire_now([ip, email]) == pytest.approx(1.0)
+    # The denied request took nothing from the email bucket.
+    assert limiter.acquire_now([email]) == 0
+    assert limiter.acquire_now([email]) == 0
+    assert limiter.acquire_now([email]) == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert limiter.acquire_now([ip]) == pytest.approx(0.5)
+    clock.now += 0.5
+    assert limiter.acquire_now([ip]) == 0
+
+def test_memory_limiter_evicts_refilled_buckets():
+    """Test the bucket count stays bounded, refilled buckets going first."""
+    clock = FakeClock()
+    limiter = MemoryRateLimiter(maxsize=10, clock=clock)
+    for i in range(10):
+        limiter.acquire_now([(f"idle{i}", Rate(1, 1.0))])
+    clock.now += 5
+    limiter.acquire_now([("busy", Rate(1, 0.001))])
+    assert list(limiter._buckets) == ["busy"]
+
+@pytest.mark.asyncio
+async def test_redis_limit_shared_between_workers():
+    """Test buckets in Redis are shared by every worker."""
+    server = FakeServer()
+    worker_a = RedisRateLimiter(lambda: FakeRedis(server=server))
+    worker_b = RedisRateLimiter(lambda: FakeRedis(server=server))
+    limits = [("login:ip:10.0.0.1", Rate(2, 0.1))]
+    assert await worker_a.acquire(limits) == 0
+    assert await worker_b.acquire(limits) == 0
+    wait = await worker_a.acquire(limits)
+    assert 9 < wait <= 10
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_memory():
+    """Test a Redis outage limits per worker instead of failing requests."""
+    server = FakeServer()
+    server.connected = False
+    limiter = RedisRateLimiter(lambda: FakeRedis(server=server))
+    limits = [("key", Rate(1, 0.1))]
+    assert await limiter.acquire(limits) == 0
+    assert await limiter.acquire(limits) > 0
+    with pytest.raises(RedisConnectionError):
+        await FakeRedis(server=server).ping()
+
+@pytest.mark.asyncio
+async def test_login_rate_limited_before_password_check(
+    client, create_user, monkeypatch
+):
+    """Test excess logins get 429 with Retry-After and never reach bcrypt."""
+    await create_user("limited")
+    rate = parse_rate("2/minute")
+    monkeypatch.setitem(credential_rate_limit.per_email, "login", rate)
+    body = {"email": "limited@example.com", "password": "wrong-password"}
+    for _ in range(2):
+        response = await client.post("/api/v1/auth/login", json=body)
+        assert response.status_code == 401
+
+    async def fail(*args):
+        raise AssertionError("Password checked for a rate limited request")
+
+    monkeypatch.setattr(password_hasher, "verify", fail)
+    response = await client.post("/api/v1/auth/login", json=body)
+    assert response.status_code == 429
+    assert response.json()["code"] == "E0007"
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
+
+    # Another email from the same client is still allowed.
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "other@example.com", "password": "wrong-password"},
+    )
+    assert response.status_code == 401
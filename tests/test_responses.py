@@ -0,0 +1,61 @@
+from datetime import UTC, datetime
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+from app.schemas.user import user_serializer
+from app.utils.responses import ModelSerializer
+
+
+@pytest.mark.parametrize(
+    "last_login", [datetime.now(UTC), datetime(2024, 1, 2, 3, 4, 5), None]
+)
+def test_serializer_matches_schema_json(last_login):
+    """Test the serializer writes the same JSON as the validated schema."""
+    now = datetime.now(UTC)
+    user = User(
+        id=7,
+        username="fast",
+        email="fast@example.com",
+        first_name="Fäst",
+        last_name='"quoted"',
+        is_active=True,
+        is_superuser=False,
+        date_joined=now,
+        last_login=last_login,
+        create_at=now,
+        updated_at=now,
+    )
+    expected = UserSchema.model_validate(user).model_dump_json().encode()
+    assert user_serializer.dumps(user) == expected
+
+def test_serializer_rejects_nested_fields():
+    """Test schemas with fields that need validation are refused."""
+
+    class Nested(BaseModel):
+        tags: List[str]
+
+    with pytest.raises(TypeError):
+        ModelSerializer(Nested)
+
+@pytest.mark.asyncio
+async def test_user_routes_return_schema_json(
+    db, client, create_user, auth_headers
+):
+    """Test the routes skipping validation still answer the schema's JSON."""
+    admin = await create_user("admin", superuser=True)
+    await db.refresh(admin)
+    expected = UserSchema.model_validate(admin).model_dump(mode="json")
+
+    response = await client.get(
+        f"/api/v1/user/{admin.id}", headers=auth_headers(admin)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == expected
+
+    response = await client.get("/api/v1/user", headers=auth_headers(admin))
+    assert response.json()["items"] == [expected]
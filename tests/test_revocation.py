@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.utils.revocation import RevokedTokens
+
+
+class Clock:
+    """Clock that only moves when a test sets now."""
+
+    def __init__(self) -> None:
+        """Initialize clock at 1000."""
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        """Return now."""
+        return self.now
+
+@pytest.mark.asyncio
+async def test_buckets_dropped_once_their_tokens_expired():
+    """Test revocations are kept until every token of their bucket expired."""
+    clock = Clock()
+    revoked = RevokedTokens(100, redis_getter=lambda: None, clock=clock)
+    await revoked.revoke("a", 1050)
+    await revoked.revoke("b", 1150)
+    assert revoked.is_revoked("a", 1050)
+    assert not revoked.is_revoked("a", 1150)
+    assert not revoked.is_revoked("c", 1050)
+
+    clock.now = 1101
+    await revoked.revoke("c", 1250)
+    assert len(revoked) == 2
+    assert not revoked.is_revoked("a", 1050)
+    assert revoked.is_revoked("b", 1150)
+
+@pytest.mark.asyncio
+async def test_revocations_shared_between_workers():
+    """Test a revocation reaches running workers and workers started later."""
+    server = FakeServer()
+    worker_a = RevokedTokens(300, redis_getter=lambda: FakeRedis(server=server))
+    worker_b = RevokedTokens(300, redis_getter=lambda: FakeRedis(server=server))
+    worker_b.start()
+    try:
+        await asyncio.sleep(0.05)
+        await worker_a.revoke("jti", 4102444800)
+        for _ in range(50):
+            if worker_b.is_revoked("jti", 4102444800):
+                break
+            await asyncio.sleep(0.01)
+        assert worker_b.is_revoked("jti", 4102444800)
+    finally:
+        await worker_b.stop()
+
+    worker_c = RevokedTokens(300, redis_getter=lambda: FakeRedis(server=server))
+    await worker_c.load()
+    assert worker_c.is_revoked("jti", 4102444800)
+    ttl = await FakeRedis(server=server).ttl("revoked_tokens:13674816")
+    assert ttl > 0
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SINGLEFLIGHT_CALLS, SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_a_fetch():
+    """Test callers of a key in flight wait for its fetch, not their own."""
+    flights = SingleFlight("test")
+    calls = []
+    release = asyncio.Event()
+
+    async def fetch(keys):
+        calls.append(keys)
+        await release.wait()
+        return {key: key * 10 for key in keys if key != 3}
+
+    tasks = [
+        asyncio.create_task(flights.do_many(keys, fetch))
+        for keys in ([1, 2], [2, 3], [1])
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks)
+    assert calls == [[1, 2], [3]]
+    assert results == [{1: 10, 2: 20}, {2: 20, 3: None}, {1: 10}]
+    assert len(flights) == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_and_errors():
+    """Test a cancelled first caller leaves the fetch to the others.
+
+    Errors of the fetch reach every caller.
+    """
+    flights = SingleFlight("test")
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "value"
+
+    leader = asyncio.create_task(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.do("key", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+    assert await follower == "value"
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("database down")
+
+    results = await asyncio.gather(
+        flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+    )
+    assert [str(result) for result in results] == ["database down"] * 2
+    assert len(flights) == 0
+
+@pytest.mark.asyncio
+async def test_concurrent_user_reads_coalesced(
+    client, create_user, auth_headers, statements
+):
+    """Test 1,000 concurrent reads of a user issue a handful of queries."""
+    admin = await create_user("admin", superuser=True)
+    target = await create_user("popular")
+    headers = auth_headers(admin)
+    coalesced = SINGLEFLIGHT_CALLS.labels("user", "coalesced").value
+    statements.clear()
+    responses = await asyncio.gather(
+        *(
+            client.get(f"/api/v1/user/{target.id}", headers=headers)
+            for _ in range(1000)
+        )
+    )
+    assert all(response.status_code == 200 for response in responses)
+    # Both the admin, loading the principal, and the target are coalesced.
+    assert len(statements) <= 10
+    assert SINGLEFLIGHT_CALLS.labels("user", "coalesced").value - coalesced > 1900
@@ -0,0 +1,23 @@
+from app.common.config import settings
+from app.common.importtime import import_profile, measure_startup, over_budget
+
+
+def test_startup_within_budget():
+    """Test importing app.main and serving a first request stay within budget."""
+    timings = measure_startup(repeat=2)
+    assert over_budget(timings) == []
+    assert timings["import"] <= settings.STARTUP_IMPORT_BUDGET_SECONDS
+    assert timings["import"] < timings["first_response"]
+
+def test_import_defers_heavy_modules():
+    """Test the database drivers, Redis, passlib and jose load on first use."""
+    modules = {record.module for record in import_profile("app.main")}
+    assert "app.main" in modules
+    for deferred in (
+        "jose",
+        "passlib",
+        "redis",
+        "sqlalchemy.dialects.postgresql",
+        "aiosqlite",
+    ):
+        assert deferred not in modules
@@ -0,0 +1,334 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services.user import UserService
+from app.utils.pagination import encode_cursor
+
+
+@pytest.mark.asyncio
+async def test_list_users_keyset_pages(client, create_user, auth_headers):
+    """Test listing users page by page with an opaque cursor."""
+    admin = await create_user("admin", superuser=True)
+    for i in range(4):
+        await create_user(f"user{i}")
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = await client.get(
+            "/api/v1/user", params=params, headers=auth_headers(admin)
+        )
+        assert response.status_code == 200
+        page = response.json()
+        seen.extend(item["username"] for item in page["items"])
+        assert page["total"] is None
+        cursor = page["next_cursor"]
+        assert page["has_more"] == (cursor is not None)
+        if not cursor:
+            break
+
+    assert seen == ["admin", "user0", "user1", "user2", "user3"]
+
+@pytest.mark.asyncio
+async def test_list_users_total(client, create_user, auth_headers):
+    """Test the total is only counted when asked for."""
+    admin = await create_user("admin", superuser=True)
+    await create_user("other")
+    response = await client.get(
+        "/api/v1/user", params={"total": "estimated"}, headers=auth_headers(admin)
+    )
+    assert response.json()["total"] == 2
+    assert response.json()["has_more"] is False
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(client, create_user, auth_headers):
+    """Test a malformed cursor, or one with a non integer id, is rejected."""
+    admin = await create_user("admin", superuser=True)
+    for cursor in ("not-a-cursor", encode_cursor({"id": True})):
+        response = await client.get(
+            "/api/v1/user", params={"cursor": cursor}, headers=auth_headers(admin)
+        )
+        assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_users_requires_superuser(client, create_user, auth_headers):
+    """Test only superusers can list users."""
+    user = await create_user("user")
+    response = await client.get("/api/v1/user", headers=auth_headers(user))
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_import_users_ndjson(client, create_user, auth_headers):
+    """Test importing users reports created, duplicate and invalid rows."""
+    admin = await create_user("admin", superuser=True)
+    body = "\n".join(
+        [
+            '{"email": "a@example.com", "username": "alice", "password": "password1"}',
+            '{"email": "admin@example.com", "username": "admin2",'
+            ' "password": "pw123456"}',
+            '{"email": "b@example.com", "username": "bob"}',
+            "not json",
+            '{"email": "c@example.com", "username": "alice", "password": "password3"}',
+        ]
+    )
+    response = await client.post(
+        "/api/v1/user/import",
+        content=body,
+        headers={**auth_headers(admin), "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["line"], r["status"]) for r in results] == [
+        (3, "invalid"),
+        (4, "invalid"),
+        (1, "created"),
+        (2, "duplicate"),
+        (5, "duplicate"),
+    ]
+
+    login = await client.post(
+        "/api/v1/auth/login",
+        json={"email": "a@example.com", "password": "password1"},
+    )
+    assert login.status_code == 200
+
+@pytest.mark.asyncio
+async def test_import_users_csv(client, create_user, auth_headers):
+    """Test importing users from CSV."""
+    admin = await create_user("admin", superuser=True)
+    body = (
+        "email,username,password,first_name,is_active\n"
+        "a@example.com,alice,password1,Alice,\n"
+        '"b@example.com",bob,password2,"Bob, Jr",false\n'
+        'c@example.com,carol,password3,"Carol\nAnn ""CJ""",\n'
+        "d@example.com,dave,password4\n"
+    )
+    response = await client.post(
+        "/api/v1/user/import",
+        content=body,
+        headers={**auth_headers(admin), "Content-Type": "text/csv"},
+    )
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((r["line"], r["status"]) for r in results) == [
+        (2, "created"),
+        (3, "created"),
+        (4, "created"),
+        (6, "invalid"),
+    ]
+
+    users = await client.get("/api/v1/user", headers=auth_headers(admin))
+    by_name = {user["username"]: user for user in users.json()["items"]}
+    assert by_name["alice"]["is_active"] is True
+    assert by_name["bob"]["first_name"] == "Bob, Jr"
+    assert by_name["bob"]["is_active"] is False
+    assert by_name["carol"]["first_name"] == 'Carol\nAnn "CJ"'
+
+@pytest.mark.asyncio
+async def test_import_users_csv_quote_in_unquoted_field(
+    client, create_user, auth_headers
+):
+    """Test a quote inside an unquoted CSV field does not join later rows."""
+    admin = await create_user("admin", superuser=True)
+    body = (
+        "email,username,password\n"
+        'a@x.com,O"Brien,password1\n'
+        "b@x.com,bob,password2\n"
+        "c@x.com,carol,password3\n"
+    )
+    response = await client.post(
+        "/api/v1/user/import",
+        content=body,
+        headers={**auth_headers(admin), "Content-Type": "text/csv"},
+    )
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted((r["line"], r["status"]) for r in results) == [
+        (2, "created"),
+        (3, "created"),
+        (4, "created"),
+    ]
+
+    users = await client.get("/api/v1/user", headers=auth_headers(admin))
+    usernames = {user["username"] for user in users.json()["items"]}
+    assert 'O"Brien' in usernames
+
+@pytest.mark.asyncio
+async def test_insert_without_on_conflict(db, create_user, monkeypatch):
+    """Test inserts skip taken users on a dialect without ON CONFLICT."""
+    await create_user("taken")
+    monkeypatch.setattr(UserService, "_insert_ignoring_conflicts", lambda _self: None)
+    service = UserService(db)
+    row = {"email": "new@example.com", "username": "new", "password": "x"}
+    assert await service.insert({**row, "email": "taken@example.com"}) is None
+    assert (await service.insert(row)).username == "new"
+    inserted = await service.bulk_create(
+        [
+            {**row, "email": "other@example.com"},
+            {**row, "email": "free@example.com", "username": "free"},
+        ]
+    )
+    assert [email for _, email in inserted] == ["free@example.com"]
+
+@pytest.mark.asyncio
+async def test_import_users_unsupported_content_type(client, create_user, auth_headers):
+    """Test the body format must be NDJSON or CSV."""
+    admin = await create_user("admin", superuser=True)
+    response = await client.post(
+        "/api/v1/user/import", json=[], headers=auth_headers(admin)
+    )
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_users_ndjson(client, create_user, auth_headers):
+    """Test exporting users as NDJSON with a column projection."""
+    admin = await create_user("admin", superuser=True)
+    await create_user("other")
+    response = await client.get(
+        "/api/v1/user/export",
+        params={"fields": "id,username"},
+        headers=auth_headers(admin),
+    )
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [
+        {"id": admin.id, "username": "admin"},
+        {"id": admin.id + 1, "username": "other"},
+    ]
+
+@pytest.mark.asyncio
+async def test_export_users_csv(client, create_user, auth_headers):
+    """Test exporting users as CSV."""
+    admin = await create_user("admin", superuser=True)
+    response = await client.get(
+        "/api/v1/user/export", params={"format": "csv"}, headers=auth_headers(admin)
+    )
+    header, row = response.text.splitlines()
+    assert header.split(",")[:3] == ["id", "email", "username"]
+    assert "password" not in header
+    assert row.startswith(f"{admin.id},admin@example.com,admin,")
+
+@pytest.mark.asyncio
+async def test_export_users_unknown_field(client, create_user, auth_headers):
+    """Test the password column can not be exported."""
+    admin = await create_user("admin", superuser=True)
+    response = await client.get(
+        "/api/v1/user/export",
+        params={"fields": "id,password"},
+        headers=auth_headers(admin),
+    )
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_create_user_single_statement(
+    client, create_user, auth_headers, statements
+):
+    """Test creating a user costs one INSERT ... RETURNING."""
+    admin = await create_user("admin", superuser=True)
+    headers = auth_headers(admin)
+    await client.get("/api/v1/user/me", headers=headers)
+    new_user = {
+        "email": "new@example.com",
+        "username": "new",
+        "password": "new-password",
+        "first_name": "",
+        "last_name": "",
+        "is_active": True,
+        "is_superuser": False,
+        "date_joined": "2024-01-01T00:00:00Z",
+        "last_login": None,
+    }
+    statements.clear()
+    response = await client.post("/api/v1/user", json=new_user, headers=headers)
+    assert response.status_code == 201
+    assert len(statements) == 1
+    response = await client.post(
+        "/api/v1/user", json={**new_user, "username": "new2"}, headers=headers
+    )
+    assert response.json()["code"] == "E0101"
+
+@pytest.mark.asyncio
+async def test_update_user_me_single_statement(
+    client, create_user, auth_headers, statements
+):
+    """Test updating the current user costs one UPDATE ... RETURNING."""
+    user = await create_user("user")
+    await create_user("other")
+    headers = auth_headers(user)
+    await client.get("/api/v1/user/me", headers=headers)
+    statements.clear()
+    response = await client.patch(
+        "/api/v1/user/me", json={"first_name": "First"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "First"
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE")
+
+    response = await client.patch(
+        "/api/v1/user/me", json={"email": "other@example.com"}, headers=headers
+    )
+    assert response.json()["code"] == "E0101"
+
+@pytest.mark.asyncio
+async def test_update_user_me_rejects_null(client, create_user, auth_headers):
+    """Test an explicit null for a required column is rejected, not stored."""
+    user = await create_user("user")
+    headers = auth_headers(user)
+    for field in ("email", "username", "password", "is_active"):
+        response = await client.patch(
+            "/api/v1/user/me", json={field: None}, headers=headers
+        )
+        assert response.status_code == 422
+    response = await client.patch(
+        "/api/v1/user/me", json={"first_name": None}, headers=headers
+    )
+    assert response.status_code == 200
+    me = await client.get("/api/v1/user/me", headers=headers)
+    assert me.json()["email"] == "user@example.com"
+
+@pytest.mark.asyncio
+async def test_batch_users_single_statement(
+    client, create_user, auth_headers, statements
+):
+    """Test a batch lookup is one query, in request order, reporting missing."""
+    admin = await create_user("admin", superuser=True)
+    users = [await create_user(f"user{i}") for i in range(3)]
+    headers = auth_headers(admin)
+    await client.get("/api/v1/user/me", headers=headers)
+    ids = [users[2].id, 999, users[0].id, users[2].id]
+    statements.clear()
+    response = await client.post(
+        "/api/v1/user/batch", json={"ids": ids}, headers=headers
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["username"] for item in body["items"]] == ["user2", "user0"]
+    assert body["missing"] == [999]
+    assert len(statements) == 1
+
+    response = await client.post(
+        "/api/v1/user/batch", json={"ids": list(range(101))}, headers=headers
+    )
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_get_by_id_coalesced_per_session(db, create_user, statements):
+    """Test concurrent and repeated get_by_id calls cost one query."""
+    first, second = await create_user("first"), await create_user("second")
+    user_service = UserService(db)
+    statements.clear()
+    found = await asyncio.gather(
+        user_service.get_by_id(first.id),
+        UserService(db).get_by_id(second.id),
+        user_service.get_by_id(first.id),
+        user_service.get_by_id(999),
+    )
+    assert [user and user.username for user in found] == [
+        "first", "second", "first", None
+    ]
+    assert await user_service.get_by_id(second.id) is found[1]
+    assert len(statements) == 1
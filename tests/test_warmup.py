@@ -0,0 +1,42 @@
+import pytest
+
+from app.db.session import get_db_router
+from app.main import app
+from app.services.warmup import WarmUp, warmup
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_warm_up(client, monkeypatch):
+    """Test readiness fails until warm-up finished and liveness never does."""
+    monkeypatch.setattr(warmup, "ready", False)
+    assert (await client.get("/api/v1/health")).status_code == 200
+    assert (await client.get("/api/v1/health/ready")).status_code == 503
+
+    await warmup.run(get_db_router(), app)
+    response = await client.get("/api/v1/health/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+    assert app.openapi_schema is not None
+
+@pytest.mark.asyncio
+async def test_warm_engine_fills_pool_and_primes_statements(db, statements):
+    """Test warm-up leaves connections in the pool and runs the user queries."""
+    engine = get_db_router().primary
+    await engine.dispose()
+    await WarmUp(connections=3).warm_engine(engine)
+    assert engine.sync_engine.pool.checkedin() == 3
+    assert any(statement.startswith("UPDATE users") for statement in statements)
+    assert any(statement.startswith("DELETE FROM users") for statement in statements)
+
+@pytest.mark.asyncio
+async def test_warm_up_failures_do_not_block_readiness(monkeypatch):
+    """Test a failing step is logged and the worker still becomes ready."""
+
+    async def fail(*args):
+        raise RuntimeError("database down")
+
+    warm_up = WarmUp(connections=1)
+    monkeypatch.setattr(warm_up, "warm_engine", fail)
+    monkeypatch.setattr(warm_up, "warm_hashing", fail)
+    await warm_up.run(get_db_router())
+    assert warm_up.ready